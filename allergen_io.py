@@ -0,0 +1,235 @@
+# allergen_io.py
+"""
+알레르기 성분 규칙(allergen, risk_level) 파일 일괄 등록과 내보내기
+
+사용법:
+    python allergen_io.py import allergens.csv --dry-run       # 변경 내용만 확인
+    python allergen_io.py import allergens.xlsx --delete-missing
+    python allergen_io.py export -o allergens.csv
+
+파일 형식: 첫 줄은 머리글 (allergen,risk_level 또는 알레르기 성분,위험 그룹)
+위험 그룹은 'High Risk Group' 등 표준 표기나 '고위험', '위험', '주의'로 쓸 수 있습니다.
+Excel(.xlsx) 파일을 읽으려면 pandas와 openpyxl이 필요합니다.
+"""
+import argparse
+import csv
+import io
+import re
+import sys
+
+from db_utils import upsert_allergy_infos, delete_allergy_infos, iter_allergy_info
+from risk_levels import normalize_risk_level
+
+# 머리글로 인식하는 열 이름
+ALLERGEN_COLUMNS = ("allergen", "알레르기 성분", "성분")
+RISK_LEVEL_COLUMNS = ("risk_level", "위험 그룹", "위험도", "위험 수준")
+
+UPSERT_BATCH_SIZE = 200  # upsert 한 번에 보내는 행 수 (요청 본문)
+DELETE_BATCH_SIZE = 100  # 삭제 한 번에 보내는 성분 수 (URL 길이 제한)
+EXPORT_CHUNK_ROWS = 200  # 내보내기 시 한 번에 돌려주는 행 수
+
+
+# 입력값 검증 함수
+def validate_allergen(allergen):
+    pattern = re.compile(r'^[A-Za-z가-힣\s\-\/]+$')
+    return bool(pattern.match(allergen))
+
+
+def _column_index(header, names):
+    normalized = [str(column).strip().lower() for column in header]
+    for name in names:
+        if name in normalized:
+            return normalized.index(name)
+    return None
+
+
+def read_rows(source, filename=None):
+    """
+    CSV 또는 Excel 파일에서 (줄 번호, allergen, risk_level)을 한 줄씩 읽습니다.
+    source: 파일 경로 또는 파일 객체 (Streamlit 업로드 파일 포함)
+    """
+    filename = filename or getattr(source, "name", None) or str(source)
+
+    if filename.lower().endswith((".xlsx", ".xls")):
+        import pandas as pd
+
+        frame = pd.read_excel(source, dtype=str).fillna("")
+        header = list(frame.columns)
+        records = frame.values.tolist()
+    else:
+        if isinstance(source, str):
+            with open(source, "rb") as file:
+                data = file.read()
+        else:
+            data = source.read()
+        # Excel에서 저장한 CSV의 BOM 처리
+        text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+        reader = csv.reader(io.StringIO(text))
+        header = next(reader, [])
+        records = list(reader)
+
+    allergen_index = _column_index(header, ALLERGEN_COLUMNS)
+    risk_level_index = _column_index(header, RISK_LEVEL_COLUMNS)
+    if allergen_index is None or risk_level_index is None:
+        raise ValueError(
+            f"머리글에 알레르기 성분 열({', '.join(ALLERGEN_COLUMNS)})과 "
+            f"위험 그룹 열({', '.join(RISK_LEVEL_COLUMNS)})이 필요합니다."
+        )
+
+    for line, record in enumerate(records, start=2):
+        cells = [str(cell).strip() for cell in record]
+        if not any(cells):
+            continue
+        allergen = cells[allergen_index] if allergen_index < len(cells) else ""
+        risk_level = cells[risk_level_index] if risk_level_index < len(cells) else ""
+        yield line, allergen, risk_level
+
+
+def validate_rows(rows):
+    """
+    파일의 모든 행을 검증합니다.
+    반환: ({allergen: RiskLevel}, [(줄 번호, 오류 메시지)])
+    """
+    desired = {}
+    first_lines = {}
+    errors = []
+
+    for line, allergen, risk_level in rows:
+        if not allergen or not validate_allergen(allergen):
+            errors.append((line, f"유효하지 않은 알레르기 성분: '{allergen}'"))
+            continue
+        level = normalize_risk_level(risk_level)
+        if level is None:
+            errors.append((line, f"알 수 없는 위험 그룹: '{risk_level}'"))
+            continue
+        if allergen in desired and desired[allergen] != level:
+            errors.append((line, f"'{allergen}'의 위험 그룹이 {first_lines[allergen]}번째 줄과 다릅니다."))
+            continue
+        desired[allergen] = level
+        first_lines.setdefault(allergen, line)
+
+    return desired, errors
+
+
+def diff_allergens(current, desired, delete_missing=False):
+    """
+    현재 테이블({allergen: 저장된 risk_level})과 파일 내용({allergen: RiskLevel})을 비교합니다.
+    저장된 표기가 표준 표기와 다른 행(예: 'High risk group')도 변경으로 처리합니다.
+    반환: {"insert": [(allergen, RiskLevel)], "update": [...], "delete": [allergen], "unchanged": 개수}
+    """
+    inserts = []
+    updates = []
+    unchanged = 0
+    for allergen, level in desired.items():
+        if allergen not in current:
+            inserts.append((allergen, level))
+        elif current[allergen] != level.value:
+            updates.append((allergen, level))
+        else:
+            unchanged += 1
+
+    deletes = sorted(allergen for allergen in current if allergen not in desired) if delete_missing else []
+    return {"insert": inserts, "update": updates, "delete": deletes, "unchanged": unchanged}
+
+
+def apply_diff(diff, progress=None):
+    """
+    비교 결과를 몇 번의 일괄 요청으로 반영합니다. progress(완료 수, 전체 수)가 주어지면 요청마다 호출합니다.
+    반환: 반영한 행 수
+    """
+    upserts = diff["insert"] + diff["update"]
+    deletes = diff["delete"]
+    total = len(upserts) + len(deletes)
+    done = 0
+
+    for start in range(0, len(upserts), UPSERT_BATCH_SIZE):
+        batch = upserts[start:start + UPSERT_BATCH_SIZE]
+        upsert_allergy_infos(batch)
+        done += len(batch)
+        if progress:
+            progress(done, total)
+
+    for start in range(0, len(deletes), DELETE_BATCH_SIZE):
+        batch = deletes[start:start + DELETE_BATCH_SIZE]
+        delete_allergy_infos(batch)
+        done += len(batch)
+        if progress:
+            progress(done, total)
+
+    return done
+
+
+def iter_csv(rows):
+    """
+    {allergen, risk_level} 행을 받아 CSV 텍스트를 EXPORT_CHUNK_ROWS행씩 돌려줍니다. (전체를 메모리에 모으지 않음)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["allergen", "risk_level"])
+
+    count = 0
+    for row in rows:
+        level = normalize_risk_level(row['risk_level'])
+        writer.writerow([row['allergen'], level.value if level is not None else row['risk_level']])
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def import_file(path, delete_missing=False, dry_run=False):
+    desired, errors = validate_rows(read_rows(path))
+    if errors:
+        for line, message in errors:
+            print(f"{line}번째 줄: {message}")
+        print(f"오류 {len(errors)}건이 있어 반영하지 않았습니다.")
+        return False
+
+    current = {row['allergen']: row['risk_level'] for row in iter_allergy_info()}
+    diff = diff_allergens(current, desired, delete_missing)
+    print(
+        f"추가 {len(diff['insert'])}개, 변경 {len(diff['update'])}개, "
+        f"삭제 {len(diff['delete'])}개, 변경 없음 {diff['unchanged']}개"
+    )
+    if dry_run:
+        return True
+
+    apply_diff(diff, progress=lambda done, total: print(f"반영: {done}/{total}"))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="알레르기 성분 규칙 파일 가져오기/내보내기")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="CSV/Excel 파일 내용을 테이블에 반영")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--delete-missing", action="store_true", help="파일에 없는 성분은 테이블에서 삭제")
+    import_parser.add_argument("--dry-run", action="store_true", help="반영하지 않고 변경 내용만 출력")
+
+    export_parser = subparsers.add_parser("export", help="현재 테이블을 CSV로 저장")
+    export_parser.add_argument("-o", "--output", default="-", help="저장할 파일 (표준 출력은 '-')")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        if not import_file(args.path, args.delete_missing, args.dry_run):
+            sys.exit(1)
+        return
+
+    # 한 페이지씩 읽어 바로 기록 (Excel에서 한글이 깨지지 않도록 파일은 BOM 포함 UTF-8)
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8-sig", newline="")
+    try:
+        for chunk in iter_csv(iter_allergy_info()):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
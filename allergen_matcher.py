@@ -0,0 +1,247 @@
+# allergen_matcher.py
+import threading
+import unicodedata
+from collections import deque
+
+import metrics
+from db_utils import get_allergen_snapshot
+
+# 표기가 다른 같은 성분 (등록된 알레르기 성분 -> 다른 표기)
+# 다른 표기가 그 자체로 테이블에 등록되어 있으면 등록된 성분이 우선합니다.
+ALLERGEN_SYNONYMS = {
+    "계란": ["달걀", "난류", "난백", "난황", "전란"],
+    "우유": ["유청", "탈지분유", "전지분유", "혼합분유", "연유", "카제인"],
+    "대두": ["대두유", "대두단백", "탈지대두"],
+    # 한 글자 성분은 단어 경계나 COMPOUND_SUFFIXES가 뒤에 있어야 하므로 그 밖의 붙여 쓰는 표기를 따로 등록
+    "밀": ["소맥", "글루텐", "밀가루", "통밀", "밀전분"],
+    "게": ["꽃게", "대게", "홍게", "게살", "게장", "게맛살"],
+    "잣": ["잣가루", "잣즙", "잣죽"],
+    # '아황산나트륨', '메타중아황산칼륨', '무수아황산' 등
+    "아황산류": ["아황산", "이산화황"],
+    "땅콩": ["낙화생"],
+    "쇠고기": ["소고기", "우육"],
+    "돼지고기": ["돈육"],
+    "닭고기": ["계육"],
+    "조개류": ["굴", "굴소스", "홍합", "전복", "바지락"],
+}
+
+# 알레르기 성분 표기를 포함하지만 그 성분이 아닌 단어 (이 단어와 겹치는 위치에서 찾은 다른 성분은 무시)
+EXCLUDED_WORDS = ["땅콩", "강낭콩", "완두콩", "무게", "바게트", "불포화", "호밀", "메밀", "밀크"]
+
+# 한 글자 성분 바로 뒤에 붙어 원료를 나타내는 말 ('게추출물', '밀단백')
+COMPOUND_SUFFIXES = ("추출물", "추출액", "농축액", "엑기스", "분말", "가루", "단백", "전분", "육수", "소스", "페이스트")
+
+# 제외 단어의 강도 (다른 표기는 길이가 강도이며, 겹치면 더 강한 표기만 인정)
+_EXCLUDED_STRENGTH = 1 << 16
+
+# 패턴 끝에 붙어 있어도 무시하는 표현
+IGNORED_SUFFIXES = ("함유", "포함")
+
+# 여러 필드를 한 번에 검사할 때 필드 사이에 넣는 구분 문자 (패턴에 나타나지 않음)
+FIELD_SEPARATOR = "\x00"
+
+
+def normalize_text(text):
+    """
+    공백을 제거하고 전각 문자/대소문자를 통일한 문자열과, 각 글자의 원본 위치 목록을 반환합니다.
+    """
+    normalized = []
+    positions = []
+    for index, char in enumerate(text):
+        # 대부분을 차지하는 한글 음절은 정규화가 필요 없으므로 바로 추가
+        if "\uac00" <= char <= "\ud7a3":
+            normalized.append(char)
+            positions.append(index)
+            continue
+        for normalized_char in unicodedata.normalize("NFKC", char).lower():
+            if normalized_char.isspace():
+                continue
+            normalized.append(normalized_char)
+            positions.append(index)
+    return "".join(normalized), positions
+
+
+def normalize_pattern(pattern):
+    normalized, _ = normalize_text(pattern)
+    for suffix in IGNORED_SUFFIXES:
+        if normalized.endswith(suffix) and len(normalized) > len(suffix):
+            normalized = normalized[:-len(suffix)]
+    return normalized.strip("()[]")
+
+
+def _is_boundary(text, index):
+    # 문자열 끝, 공백, 쉼표, 괄호 등 글자/숫자가 아닌 문자는 단어 경계
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class AllergenMatcher:
+    """
+    등록된 알레르기 성분(과 다른 표기)으로 만든 Aho-Corasick 오토마톤
+    allergy/rawmtrl 문자열을 한 번씩만 훑어서 포함된 성분을 모두 찾습니다.
+    제외 단어(EXCLUDED_WORDS)나 더 긴 다른 성분과 겹치는 것은 버리고
+    (예: '땅콩' 안의 '콩', '무게' 안의 '게', '메밀가루'의 '밀가루'),
+    한 글자 표기는 앞이 단어 경계(공백, 쉼표, 괄호 등)이고 뒤가 단어 경계나 COMPOUND_SUFFIXES인 경우만 인정합니다.
+    """
+
+    def __init__(self, risk_levels, synonyms=ALLERGEN_SYNONYMS, excluded_words=EXCLUDED_WORDS):
+        self.risk_levels = dict(risk_levels)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # 노드별 (성분, 정규화된 패턴 길이, 강도)
+        # 등록된 성분이 제외 단어이기도 하면 ('메밀') 그 성분으로 찾되 제외 단어의 강도로 다른 표기를 거름
+        self._excluded = {normalize_pattern(word) for word in excluded_words}
+
+        for allergen in self.risk_levels:
+            self._add_pattern(normalize_pattern(allergen), allergen)
+
+        registered = {normalize_pattern(allergen) for allergen in self.risk_levels}
+        for allergen, alternatives in synonyms.items():
+            if allergen not in self.risk_levels:
+                continue
+            for alternative in alternatives:
+                pattern = normalize_pattern(alternative)
+                if pattern not in registered:
+                    self._add_pattern(pattern, allergen)
+
+        # 제외 단어는 성분 없이(None) 등록하고 검색 결과를 거를 때만 사용
+        for pattern in self._excluded - registered:
+            self._add_pattern(pattern, None)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern, allergen):
+        if not pattern:
+            return
+        strength = _EXCLUDED_STRENGTH if pattern in self._excluded else len(pattern)
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        if (allergen, len(pattern), strength) not in self._output[node]:
+            self._output[node].append((allergen, len(pattern), strength))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                # 실패 링크가 가리키는 노드의 출력을 미리 합쳐 두어 검색 시 따라가지 않도록 함
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def match(self, allergy="", rawmtrl=""):
+        """
+        두 필드를 한 번에 검사하여 발견된 모든 위치를 반환합니다.
+        반환: [{"allergen", "risk_level", "field", "start", "end", "text"}] (원본 문자열 기준 위치)
+        """
+        if allergy == "알레르기 정보 없음":
+            allergy = ""
+        fields = [("allergy", allergy or ""), ("rawmtrl", rawmtrl or "")]
+        text = FIELD_SEPARATOR.join(value for _, value in fields)
+        normalized, positions = normalize_text(text)
+
+        # 필드별 시작 위치 (원본 문자열 기준)
+        field_starts = []
+        offset = 0
+        for name, value in fields:
+            field_starts.append((offset, name))
+            offset += len(value) + len(FIELD_SEPARATOR)
+
+        hits = []
+        goto = self._goto
+        fail = self._fail
+        node = 0
+        for index, char in enumerate(normalized):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for allergen, length, strength in self._output[node]:
+                hits.append((allergen, length, strength, index + 1))
+
+        # 정규화된 문자열의 위치마다 그 위치를 덮는 가장 강한 표기의 (강도, 성분)을 기록
+        # 표기 길이만큼만 기록하고 검사하므로 찾은 표기 수에 비례하는 시간에 겹치는 표기를 거름
+        strongest = [(0, None)] * len(normalized)
+        for allergen, length, strength, end in hits:
+            for index in range(end - length, end):
+                if strength > strongest[index][0]:
+                    strongest[index] = (strength, allergen)
+
+        matches = []
+        for allergen, length, strength, end in hits:
+            if allergen is None:
+                continue
+            # 제외 단어나 더 긴 다른 성분과 겹치면 제외 (예: '땅콩' 안의 '콩', '메밀가루'의 '밀가루')
+            if any(other_strength > strength and other != allergen
+                   for other_strength, other in strongest[end - length:end]):
+                continue
+            start = positions[end - length]
+            end = positions[end - 1] + 1
+            # 한 글자 표기는 앞이 단어 경계이고 뒤가 단어 경계나 원료를 나타내는 말인 경우만
+            # (예: '밀(국산)', '게추출물'은 인정, '무게'는 제외)
+            if length == 1 and not (
+                _is_boundary(text, start - 1) and (_is_boundary(text, end) or text.startswith(COMPOUND_SUFFIXES, end))
+            ):
+                continue
+            field_offset, field = next(
+                (start_offset, name) for start_offset, name in reversed(field_starts) if start_offset <= start
+            )
+            matches.append({
+                "allergen": allergen,
+                "risk_level": self.risk_levels[allergen],
+                "field": field,
+                "start": start - field_offset,
+                "end": end - field_offset,
+                "text": text[start:end]
+            })
+        return matches
+
+    def find_allergens(self, allergy="", rawmtrl=""):
+        """
+        포함된 알레르기 성분과 위험 수준을 처음 발견된 순서대로 반환합니다.
+        반환: 딕셔너리 {allergen: risk_level}
+        """
+        found = {}
+        for match in self.match(allergy, rawmtrl):
+            found.setdefault(match["allergen"], match["risk_level"])
+        return found
+
+
+_matcher = None
+_matcher_version = None
+_matcher_lock = threading.Lock()
+
+
+def get_allergen_matcher():
+    """
+    알레르기 위험도 스냅샷으로 만든 매처를 반환합니다. 스냅샷이 바뀐 경우에만 다시 만듭니다.
+    """
+    global _matcher, _matcher_version
+    snapshot = get_allergen_snapshot()
+    # 갱신 도중 버전이 바뀌면 다음 호출에서 한 번 더 만들도록 버전을 먼저 읽음
+    version = snapshot.version
+    risk_levels = snapshot.get()
+    with _matcher_lock:
+        if _matcher is None or _matcher_version != version:
+            _matcher = AllergenMatcher(risk_levels)
+            _matcher_version = version
+        return _matcher
+
+
+def find_allergens(allergy="", rawmtrl=""):
+    """
+    allergy/rawmtrl 문자열에서 등록된 알레르기 성분을 찾아 {allergen: risk_level}로 반환합니다.
+    """
+    with metrics.span("allergen_lookup"):
+        return get_allergen_matcher().find_allergens(allergy, rawmtrl)
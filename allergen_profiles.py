@@ -0,0 +1,337 @@
+# allergen_profiles.py
+"""
+고객별 알레르기 프로필과 제품의 알레르기 성분을 비트셋으로 비교
+
+알레르기 성분 어휘(vocabulary)의 순서가 곧 비트 번호입니다. 새 성분은 항상 끝에 추가되므로
+이미 저장된 비트셋의 의미는 바뀌지 않고, 어휘가 커진 뒤에는 더 작은 어휘로 만든 비트셋만 다시 계산합니다.
+제품 비트셋은 제품 캐시(product_cache.py)와 로컬 저장소(product_store.py)에 함께 저장합니다.
+
+사용법:
+    python allergen_profiles.py index                                   # 로컬 저장소의 모든 제품 비트셋 계산
+    python allergen_profiles.py safe --profile 땅콩,우유 barcodes.txt    # 프로필에 안전한 제품만 출력
+    cat report_nos.txt | python allergen_profiles.py safe --profile 계란 --report-no -
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+from allergen_matcher import AllergenMatcher, ALLERGEN_SYNONYMS
+from product_cache import get_product_cache, ALLERGEN_BITS
+from file_utils import atomic_write
+
+# 환경 변수 로드
+load_dotenv()
+
+VOCABULARY_PATH = os.getenv('ALLERGEN_VOCABULARY_PATH', 'allergen_vocabulary.json')
+
+# 기본 어휘 (알레르기 유발물질 표시 대상, 순서를 바꾸면 저장된 비트셋이 모두 무효가 되므로 끝에만 추가)
+BASE_ALLERGENS = [
+    "계란", "우유", "메밀", "땅콩", "대두", "밀", "고등어", "게", "새우", "돼지고기",
+    "복숭아", "토마토", "아황산류", "호두", "닭고기", "쇠고기", "오징어", "조개류", "잣",
+]
+
+# 다른 표기 -> 어휘의 성분 이름 (예: 달걀 -> 계란)
+_CANONICAL = {
+    alternative: allergen for allergen, alternatives in ALLERGEN_SYNONYMS.items() for alternative in alternatives
+}
+
+
+def canonical_allergen(name):
+    name = str(name).strip()
+    return _CANONICAL.get(name, name)
+
+
+def to_hex(bits):
+    return format(bits, "x")
+
+
+def from_hex(text):
+    return int(text, 16) if text else 0
+
+
+class AllergenVocabulary:
+    """
+    알레르기 성분 이름 <-> 비트 번호
+    기본 어휘 뒤에 등록된 알레르기 성분(allergy_info)을 차례로 추가하고, 추가할 때마다 파일에 저장합니다.
+    고객 프로필처럼 외부에서 들어온 이름으로는 어휘를 늘리지 않습니다. (늘어날 때마다 저장된 비트셋을 다시 계산해야 함)
+    """
+
+    def __init__(self, path=VOCABULARY_PATH):
+        self.path = path
+        self.names = list(BASE_ALLERGENS)
+        self._lock = threading.Lock()
+        self._load()
+        self.index = {name: bit for bit, name in enumerate(self.names)}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                saved = json.load(file).get("names", [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        # 저장된 순서가 기준 (기본 어휘가 나중에 늘어난 경우 없는 이름만 뒤에 붙임)
+        self.names = saved + [name for name in self.names if name not in saved]
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, names):
+        """
+        어휘에 없는 성분을 끝에 추가합니다. 반환: 추가한 수
+        """
+        new = []
+        for name in names:
+            name = canonical_allergen(name)
+            if name and name not in self.index and name not in new:
+                new.append(name)
+        if not new:
+            return 0
+        with self._lock:
+            new = [name for name in new if name not in self.index]
+            for name in new:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+            data = json.dumps({"names": self.names}, ensure_ascii=False, indent=2)
+            atomic_write(self.path, data.encode('utf-8'))
+        return len(new)
+
+    def known(self, name):
+        """
+        어휘에 있는 성분이면 어휘의 이름을, 아니면 None을 반환합니다.
+        """
+        name = canonical_allergen(name)
+        return name if name in self.index else None
+
+    def encode(self, names):
+        """
+        성분 이름 목록을 비트셋(int)으로 바꿉니다. 어휘에 없는 성분은 무시합니다.
+        """
+        bits = 0
+        for name in names:
+            name = self.known(name)
+            if name is not None:
+                bits |= 1 << self.index[name]
+        return bits
+
+    def decode(self, bits):
+        """
+        비트셋을 어휘 순서의 성분 이름 목록으로 바꿉니다.
+        """
+        names = []
+        bit = 0
+        while bits:
+            if bits & 1:
+                names.append(self.names[bit])
+            bits >>= 1
+            bit += 1
+        return names
+
+
+_vocabulary = None
+_vocabulary_lock = threading.Lock()
+_matcher = None
+_matcher_size = None
+_matcher_lock = threading.Lock()
+
+
+def get_vocabulary():
+    """
+    프로세스 전체에서 공유하는 어휘를 반환합니다. 처음 만들 때 등록된 알레르기 성분(allergy_info)도 추가합니다.
+    """
+    global _vocabulary
+    if _vocabulary is None:
+        with _vocabulary_lock:
+            if _vocabulary is None:
+                from db_utils import get_all_allergens_risk_levels
+
+                vocabulary = AllergenVocabulary()
+                try:
+                    vocabulary.add(get_all_allergens_risk_levels())
+                except Exception as e:
+                    print(f"등록된 알레르기 성분을 어휘에 추가하지 못했습니다: {e}")
+                _vocabulary = vocabulary
+    return _vocabulary
+
+
+def _get_matcher(vocabulary):
+    # 전체 어휘(와 다른 표기)로 만든 매처 (어휘가 커진 경우에만 다시 만듦)
+    global _matcher, _matcher_size
+    size = len(vocabulary)
+    with _matcher_lock:
+        if _matcher is None or _matcher_size != size:
+            _matcher = AllergenMatcher({name: None for name in vocabulary.names[:size]})
+            _matcher_size = size
+        return _matcher
+
+
+def detect_bits(allergy="", rawmtrl=""):
+    """
+    allergy/rawmtrl 문자열에서 어휘의 성분을 찾아 (비트셋, 어휘 크기)를 반환합니다.
+    """
+    vocabulary = get_vocabulary()
+    matcher = _get_matcher(vocabulary)
+    bits = 0
+    for name in matcher.find_allergens(allergy, rawmtrl):
+        bits |= 1 << vocabulary.index[name]
+    return bits, len(matcher.risk_levels)
+
+
+def get_product_bits(report_no, allergy="", rawmtrl=""):
+    """
+    제품의 알레르기 성분 비트셋을 반환합니다. 현재 어휘로 만든 값이 캐시에 있으면 다시 찾지 않습니다.
+    """
+    cache = get_product_cache()
+    cached = cache.get(ALLERGEN_BITS, report_no)
+    if isinstance(cached, dict) and cached.get("vocab") == len(get_vocabulary()):
+        return from_hex(cached["bits"])
+
+    bits, vocab = detect_bits(allergy, rawmtrl)
+    cache.set(ALLERGEN_BITS, report_no, {"bits": to_hex(bits), "vocab": vocab})
+    return bits
+
+
+class AllergenProfile:
+    """
+    고객 한 명의 알레르기 프로필 (예: 멤버십 카드에서 읽은 성분 목록)
+    제품 비트셋과 AND 한 번으로 비교하므로 프로필에 성분이 많아도 비교 비용은 같습니다.
+    어휘(기본 성분과 등록된 알레르기 성분)에 없는 성분은 비교할 수 없으므로 unknown에 따로 모아 둡니다.
+    """
+
+    def __init__(self, allergens, customer_id=None, vocabulary=None):
+        self.vocabulary = vocabulary or get_vocabulary()
+        self.customer_id = customer_id
+        self.unknown = []
+        for name in allergens:
+            name = str(name).strip()
+            if name and self.vocabulary.known(name) is None and name not in self.unknown:
+                self.unknown.append(name)
+        self.bits = self.vocabulary.encode(allergens)
+
+    @classmethod
+    def from_string(cls, text, customer_id=None):
+        """
+        '땅콩,우유' 형태의 문자열로 프로필을 만듭니다.
+        """
+        return cls([name for name in text.split(",") if name.strip()], customer_id)
+
+    def is_safe(self, product_bits):
+        return not product_bits & self.bits
+
+    def conflicts(self, product_bits):
+        """
+        제품에 들어 있는 프로필 성분 목록
+        """
+        return self.vocabulary.decode(product_bits & self.bits)
+
+    @property
+    def allergens(self):
+        return self.vocabulary.decode(self.bits)
+
+
+def load_product_bits(report_nos, store):
+    """
+    로컬 저장소에서 여러 제품의 비트셋을 한 번에 읽습니다. 없거나 이전 어휘로 만든 비트셋은 다시 계산하여 저장합니다.
+    반환: {report_no: 비트셋} (저장소에 없는 제품은 빠짐)
+    """
+    vocab_size = len(get_vocabulary())
+    found = {}
+    updates = []
+    for report_no, (bits, vocab) in store.get_allergen_bits(report_nos).items():
+        if bits is None or vocab != vocab_size:
+            # 원본 문자열은 다시 계산할 때만 읽음
+            detail = store.get_detail(report_no)
+            value, vocab = detect_bits(detail["allergy"], detail["rawmtrl"])
+            bits = to_hex(value)
+            updates.append((report_no, bits, vocab))
+        found[report_no] = from_hex(bits)
+    if updates:
+        store.set_allergen_bits(updates)
+    return found
+
+
+def safe_products(profile, report_nos, store=None):
+    """
+    프로필에 안전한(프로필 성분이 하나도 없는) 제품 번호를 입력 순서대로 반환합니다.
+    저장소에 없어 성분을 알 수 없는 제품은 안전하지 않은 것으로 봅니다.
+    """
+    if store is None:
+        from product_store import get_product_store
+
+        store = get_product_store()
+        if store is None:
+            raise RuntimeError("로컬 저장소가 없습니다. 먼저 product_store.py sync를 실행하세요.")
+
+    report_nos = list(report_nos)
+    product_bits = load_product_bits(report_nos, store)
+    mask = profile.bits
+    return [report_no for report_no in report_nos if report_no in product_bits and not product_bits[report_no] & mask]
+
+
+def index_store(store, batch_size=1000):
+    """
+    로컬 저장소에서 비트셋이 없거나 이전 어휘로 만든 제품을 모두 계산하여 저장합니다. 반환: 계산한 제품 수
+    """
+    vocab_size = len(get_vocabulary())
+    indexed = 0
+    for rows in store.iter_outdated_allergen_rows(vocab_size, batch_size):
+        updates = []
+        for report_no, allergy, rawmtrl in rows:
+            bits, vocab = detect_bits(allergy or "", rawmtrl or "")
+            updates.append((report_no, to_hex(bits), vocab))
+        store.set_allergen_bits(updates)
+        indexed += len(updates)
+    return indexed
+
+
+def _read_keys(source):
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        return [line.strip() for line in stream if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main():
+    from product_store import get_product_store
+
+    parser = argparse.ArgumentParser(description="알레르기 프로필 비트셋 비교")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("index", help="로컬 저장소의 제품 비트셋 계산")
+    safe_parser = subparsers.add_parser("safe", help="프로필에 안전한 제품 출력")
+    safe_parser.add_argument("source", help="바코드(또는 --report-no이면 제품 번호) 목록 파일, 표준 입력은 '-'")
+    safe_parser.add_argument("--profile", required=True, help="쉼표로 구분한 알레르기 성분 (예: 땅콩,우유)")
+    safe_parser.add_argument("--report-no", action="store_true", help="목록이 제품 번호인 경우")
+    args = parser.parse_args()
+
+    store = get_product_store()
+    if store is None:
+        print("로컬 저장소가 없습니다. 먼저 product_store.py sync를 실행하세요.")
+        sys.exit(1)
+
+    if args.command == "index":
+        print(f"비트셋 계산: {index_store(store)}개 제품 (어휘 {len(get_vocabulary())}개)")
+        return
+
+    profile = AllergenProfile.from_string(args.profile)
+    if profile.unknown:
+        print(f"알 수 없는 알레르기 성분은 제외합니다: {', '.join(profile.unknown)}")
+    keys = _read_keys(args.source)
+    if args.report_no:
+        for report_no in safe_products(profile, keys, store):
+            print(report_no)
+        return
+
+    report_nos = store.get_report_nos(keys)
+    safe = set(safe_products(profile, [report_nos[barcode] for barcode in keys if barcode in report_nos], store))
+    for barcode in keys:
+        if report_nos.get(barcode) in safe:
+            print(barcode)
+
+
+if __name__ == "__main__":
+    main()
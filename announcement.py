@@ -0,0 +1,151 @@
+# announcement.py
+"""
+알레르기 경고 안내를 한 번에 재생하는 음성 하나로 만들기
+
+성분마다 '성분 이름' + '위험도 메시지'를 따로 재생하면 성분이 다섯 개일 때 음성이 열 개가 되고
+음성 사이마다 플레이어를 새로 시작하는 공백이 생깁니다.
+대신 같은 위험도의 성분을 한 문장으로 묶고 (예: '땅콩, 우유, 주의! 고위험 알레르기 성분이 포함되어 있습니다.')
+위험도가 높은 문장부터 이어 붙인 안내 전체를 하나의 MP3로 준비합니다.
+
+    1. 안내 전체가 캐시에 있으면 그대로 사용
+    2. 성분 이름과 위험도 메시지 음성이 모두 캐시에 있으면 (warm_up_tts_cache로 미리 합성) MP3를 이어 붙임
+    3. 하나라도 없으면 안내 전체를 SSML 한 번으로 합성
+"""
+from html import escape
+
+import metrics
+from audio_player import priority_for_risk
+from risk_levels import normalize_risk_level
+from singleflight import SingleFlight
+from tts_cache import get_tts_cache, make_cache_key
+from ttsAdvanced import VOICE_ID, ENGINE, OUTPUT_FORMAT, get_risk_message, prepare_speech
+
+ANNOUNCEMENT_CATEGORY = "announcement"
+NAME_BREAK = "150ms"  # SSML로 합성할 때 성분 이름 사이의 쉼
+GROUP_BREAK = "300ms"  # SSML로 합성할 때 위험도 문장 사이의 쉼
+
+# 여러 계산대에서 같은 안내를 동시에 만들지 않도록 안내별로 요청을 합침
+_announcement_flight = SingleFlight("announcement")
+
+
+class AnnouncementGroup:
+    """
+    같은 위험도의 알레르기 성분 묶음 (안내의 한 문장)
+    """
+
+    def __init__(self, risk_level, allergens):
+        self.risk_level = risk_level
+        self.allergens = allergens
+        self.priority = priority_for_risk(risk_level)
+
+    @property
+    def message(self):
+        return get_risk_message(self.risk_level)
+
+    @property
+    def text(self):
+        return f"{', '.join(self.allergens)}, {self.message}"
+
+    def segments(self):
+        """
+        이 문장을 이루는 캐시된 음성 단위 [(문장, 분류)] (성분 이름들, 위험도 메시지 순)
+        """
+        return [(allergen, "allergy") for allergen in self.allergens] + [(self.message, "risk_level")]
+
+
+def plan_announcement(allergens):
+    """
+    {성분: 위험도}를 위험도별로 묶어 재생 순서(위험도가 높은 순)대로 AnnouncementGroup 목록을 반환합니다.
+    같은 위험도 안에서는 성분이 들어온 순서를 유지합니다.
+    """
+    groups = {}
+    for allergen, risk_level in allergens.items():
+        level = normalize_risk_level(risk_level)
+        groups.setdefault(level, []).append(allergen)
+    planned = [AnnouncementGroup(level, names) for level, names in groups.items()]
+    planned.sort(key=lambda group: group.priority)
+    return planned
+
+
+def announcement_text(groups):
+    return " ".join(group.text for group in groups)
+
+
+def announcement_ssml(groups):
+    """
+    안내 전체를 한 번에 합성할 SSML (성분 이름과 문장 사이에 짧은 쉼)
+    """
+    sentences = []
+    group_break = f'<break time="{GROUP_BREAK}"/>'
+    for group in groups:
+        names = f'<break time="{NAME_BREAK}"/>'.join(escape(allergen) for allergen in group.allergens)
+        sentences.append(f'{names}<break time="{NAME_BREAK}"/>{escape(group.message)}')
+    return f"<speak>{group_break.join(sentences)}</speak>"
+
+
+def announcement_priority(groups):
+    """
+    안내 전체의 재생 우선순위 (가장 높은 위험도 기준)
+    """
+    return min(group.priority for group in groups)
+
+
+def _strip_id3(data):
+    # 이어 붙일 때 중간에 태그가 끼지 않도록 앞의 ID3v2 태그와 끝의 ID3v1 태그를 제거
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        data = data[10 + size:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def join_mp3(parts):
+    """
+    MP3 데이터 목록을 이어 붙입니다. (같은 음성/포맷으로 합성한 MP3는 프레임을 그대로 이어 붙여도 재생됨)
+    """
+    return b"".join(_strip_id3(part) for part in parts)
+
+
+def _cached_segments(groups):
+    # 모든 음성 단위의 캐시 파일 경로 (하나라도 없으면 None)
+    cache = get_tts_cache()
+    keys = [make_cache_key(text, VOICE_ID, ENGINE, OUTPUT_FORMAT) for group in groups for text, _ in group.segments()]
+    if not all(cache.contains(key) for key in keys):
+        return None
+    paths = [cache.get(key) for key in keys]
+    # 확인한 뒤 정리(eviction)된 경우
+    return None if None in paths else paths
+
+
+def _compose(groups, ssml, key):
+    paths = _cached_segments(groups)
+    if paths is not None:
+        with metrics.span("announcement_compose", source="segments"):
+            parts = []
+            for path in paths:
+                with open(path, "rb") as file:
+                    parts.append(file.read())
+            return get_tts_cache().put(key, join_mp3(parts), ANNOUNCEMENT_CATEGORY, OUTPUT_FORMAT)
+
+    # 캐시에 없는 성분이 있으면 음성 단위를 하나씩 합성하지 않고 안내 전체를 한 번에 합성
+    with metrics.span("announcement_compose", source="ssml"):
+        return prepare_speech(ssml, ANNOUNCEMENT_CATEGORY, text_type="ssml")
+
+
+def prepare_announcement(allergens):
+    """
+    {성분: 위험도}의 경고 안내를 음성 파일 하나로 준비하고 재생할 파일 경로 목록을 반환합니다. (성분이 없으면 빈 목록)
+    """
+    groups = plan_announcement(allergens)
+    if not groups:
+        return []
+
+    ssml = announcement_ssml(groups)
+    # SSML 문장으로 만든 키이므로 이어 붙인 음성과 SSML로 합성한 음성이 같은 캐시 항목을 사용
+    key = make_cache_key(ssml, VOICE_ID, ENGINE, OUTPUT_FORMAT)
+    path = get_tts_cache().get(key)
+    if path is not None:
+        metrics.debug(f"캐시된 안내 사용: {announcement_text(groups)}")
+        return [path]
+    return [_announcement_flight.do(key, _compose, groups, ssml, key)]
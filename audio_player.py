@@ -0,0 +1,215 @@
+# audio_player.py
+import itertools
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future
+
+import metrics
+from risk_levels import RiskLevel, normalize_risk_level
+
+# 재생 우선순위 (숫자가 작을수록 먼저 재생)
+PRIORITY_HIGH_RISK = 0
+PRIORITY_RISK = 1
+PRIORITY_CAUTION = 2
+PRIORITY_UNKNOWN_RISK = 3
+PRIORITY_PRODUCT = 5
+
+# 이 우선순위 이하의 안내는 재생 중인 낮은 우선순위 안내를 중단시키고 먼저 재생됨
+PREEMPT_PRIORITY = PRIORITY_HIGH_RISK
+
+# 파일 경로 또는 표준 입력('-')을 받아 재생하는 외부 플레이어 (스트리밍 재생과 중단에 사용)
+KNOWN_PLAYERS = {
+    "mpg123": ["mpg123", "-q"],
+    "ffplay": ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet"],
+}
+
+# 음원 Future를 기다리는 동안 먼저 재생할 경고가 들어온 경우
+_PREEMPTED = object()
+
+
+def priority_for_risk(risk_level):
+    return {
+        RiskLevel.HIGH_RISK: PRIORITY_HIGH_RISK,
+        RiskLevel.RISK: PRIORITY_RISK,
+        RiskLevel.CAUTION: PRIORITY_CAUTION,
+    }.get(normalize_risk_level(risk_level), PRIORITY_UNKNOWN_RISK)
+
+
+def should_preempt(priority, current_priority):
+    """
+    priority의 안내가 current_priority의 안내를 중단시키고 먼저 재생되어야 하는지
+    """
+    return (
+        priority is not None
+        and current_priority is not None
+        and priority <= PREEMPT_PRIORITY
+        and priority < current_priority
+    )
+
+
+def find_player_command():
+    """
+    AUDIO_PLAYER 환경 변수 또는 설치된 외부 플레이어 명령을 반환합니다. 없으면 None (playsound 사용)
+    """
+    command = os.getenv('AUDIO_PLAYER')
+    if command:
+        return shlex.split(command)
+    for name, args in KNOWN_PLAYERS.items():
+        if shutil.which(name):
+            return list(args)
+    return None
+
+
+class AudioPlayer:
+    """
+    우선순위 큐를 가진 전용 재생 스레드
+    play()는 바로 반환되므로 스캔 스레드는 재생을 기다리지 않습니다.
+    항목은 재생할 음원 목록(파일 경로 또는 SpeechStream)이며, Future를 넘기면 결과가 준비되는 대로 재생합니다.
+    외부 플레이어가 있으면 새로 합성 중인 음성을 받는 즉시 스트리밍으로 재생하고,
+    높은 위험도의 경고가 들어오면 재생 중이거나 합성을 기다리는 제품 안내를 중단한 뒤 경고 후에 다시 재생합니다.
+    """
+
+    def __init__(self, player_command=None):
+        self.player_command = player_command if player_command is not None else find_player_command()
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._current_priority = None
+        self._current_process = None
+        self._preempted = False
+        self._waiting_priority = None
+        self._waiting_event = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def play(self, sources, priority=PRIORITY_PRODUCT):
+        """
+        재생 대기열에 추가합니다. sources: 음원 또는 음원 목록, 또는 그 목록을 돌려주는 Future
+        """
+        with self._lock:
+            self._queue.put((priority, next(self._counter), sources))
+            if self._current_process is not None and should_preempt(priority, self._current_priority):
+                self._preempted = True
+                self._current_process.terminate()
+            elif self._waiting_event is not None and should_preempt(priority, self._waiting_priority):
+                self._waiting_event.set()
+
+    def close(self, wait=True):
+        """
+        재생 스레드를 종료합니다. wait=True이면 대기 중인 안내를 모두 재생한 뒤 종료합니다.
+        """
+        if not wait:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                except queue.Empty:
+                    break
+        self._queue.put((float('inf'), next(self._counter), None))
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            priority, order, sources = self._queue.get()
+            try:
+                if sources is None:
+                    return
+                if isinstance(sources, Future):
+                    future = sources
+                    sources = self._wait_for_sources(future, priority)
+                    if sources is _PREEMPTED:
+                        # 합성을 기다리는 동안 먼저 재생할 경고가 들어온 경우, 경고를 재생한 뒤 다시 기다림
+                        self._queue.put((priority, order, future))
+                        continue
+                if not isinstance(sources, (list, tuple)):
+                    sources = [sources]
+
+                for index, source in enumerate(sources):
+                    if not self._play_source(source, priority):
+                        # 높은 우선순위 경고에 밀려 중단된 경우, 남은 음원을 같은 순서로 다시 대기열에 넣음
+                        self._queue.put((priority, order, list(sources[index:])))
+                        break
+            except Exception as e:
+                print(f"음성 재생 중 오류 발생: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _peek_priority(self):
+        # 대기열 맨 앞 항목의 우선순위 (비어 있으면 None)
+        with self._queue.mutex:
+            return self._queue.queue[0][0] if self._queue.queue else None
+
+    def _wait_for_sources(self, future, priority):
+        """
+        음원 Future의 결과를 기다립니다.
+        기다리기 전이나 기다리는 동안 먼저 재생할 경고가 대기열에 들어오면 _PREEMPTED를 반환합니다.
+        """
+        event = threading.Event()
+        with self._lock:
+            # play()는 self._lock 안에서 대기열에 넣으므로 여기서 확인한 뒤 들어온 경고는 event로 알림
+            if should_preempt(self._peek_priority(), priority):
+                return _PREEMPTED
+            self._waiting_priority = priority
+            self._waiting_event = event
+        future.add_done_callback(lambda _: event.set())
+        event.wait()
+        with self._lock:
+            self._waiting_priority = None
+            self._waiting_event = None
+            # 합성이 끝난 것과 동시에 경고가 들어왔더라도 경고를 먼저 재생
+            if should_preempt(self._peek_priority(), priority):
+                return _PREEMPTED
+        return future.result()
+
+    def _play_source(self, source, priority):
+        """
+        음원 하나를 재생합니다. 중단되었으면 False를 반환합니다.
+        """
+        path = source if isinstance(source, str) else source.path
+
+        with metrics.span("playback", source="file" if path is not None else "stream"):
+            return self._play(source, path, priority)
+
+    def _play(self, source, path, priority):
+        if self.player_command is None:
+            # 외부 플레이어가 없으면 파일로 저장한 뒤 playsound로 재생 (중단 불가)
+            from playsound import playsound
+
+            playsound(path if path is not None else source.save())
+            return True
+
+        if path is not None:
+            process = subprocess.Popen(self.player_command + [path])
+        else:
+            process = subprocess.Popen(self.player_command + ["-"], stdin=subprocess.PIPE)
+
+        with self._lock:
+            self._current_process = process
+            self._current_priority = priority
+            self._preempted = False
+
+        try:
+            if path is None:
+                # Polly에서 받는 즉시 플레이어로 전달 (SpeechStream이 캐시 저장도 함께 처리)
+                try:
+                    for chunk in source:
+                        process.stdin.write(chunk)
+                    process.stdin.close()
+                except (BrokenPipeError, OSError):
+                    pass
+                finally:
+                    # 중단되었더라도 나머지를 받아 캐시에 저장
+                    source.save()
+            process.wait()
+        finally:
+            with self._lock:
+                preempted = self._preempted
+                self._current_process = None
+                self._current_priority = None
+                self._preempted = False
+
+        return not preempted
@@ -0,0 +1,282 @@
+# batch_scan.py
+"""
+바코드 목록을 한 번에 조회하여 제품별 결과를 JSON Lines로 저장하는 일괄 처리 모드
+
+사용법:
+    python batch_scan.py barcodes.txt -o results.jsonl
+    cat barcodes.txt | python batch_scan.py - -o results.jsonl
+
+이미 결과 파일에 기록된 바코드는 건너뛰므로, 중단된 작업은 같은 명령으로 다시 실행하면 이어서 처리됩니다.
+API 장애 등 일시적인 오류로 기록된 바코드("retryable": true)는 다시 실행할 때 다시 조회합니다.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+import http_client
+from allergen_matcher import get_allergen_matcher
+from product_info import ApiUnavailableError, get_product_info_by_barcode, get_nutrition_info_by_report_no
+from file_utils import atomic_write
+
+
+class TokenBucket:
+    """
+    초당 rate개의 토큰이 채워지고 최대 capacity개까지 쌓이는 토큰 버킷
+    acquire()는 토큰을 얻을 때까지 대기합니다.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ApiLimiter:
+    """
+    API별 동시 요청 수(세마포어)와 요청 속도(토큰 버킷)를 함께 제한합니다.
+    http_client.set_rate_limiter로 등록하여 실제 HTTP 요청에만 적용합니다. (재시도도 요청마다 토큰을 얻음)
+    """
+
+    def __init__(self, concurrency, rate):
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._bucket = TokenBucket(rate)
+
+    def call(self, func, *args):
+        with self._semaphore:
+            self._bucket.acquire()
+            return func(*args)
+
+
+def read_barcodes(source):
+    """
+    파일 또는 표준 입력('-')에서 바코드를 한 줄씩 읽습니다. 빈 줄과 중복은 건너뜁니다.
+    """
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    seen = set()
+    try:
+        for line in stream:
+            barcode = line.strip()
+            if barcode and barcode not in seen:
+                seen.add(barcode)
+                yield barcode
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def is_completed(record, retry_errors=False):
+    """
+    결과 레코드를 다시 조회하지 않아도 되는지 반환합니다.
+    일시적인 오류(retryable)는 항상, retry_errors이면 모든 오류를 다시 조회합니다.
+    """
+    if "error" not in record:
+        return True
+    return not (retry_errors or record.get("retryable"))
+
+
+def load_completed(output_path, retry_errors=False):
+    """
+    결과 파일에서 완료된 바코드 -> 레코드(같은 바코드가 여러 줄이면 마지막 줄)와
+    다시 조회하거나 중복되어 정리할 줄이 있는지를 반환합니다. (재개용)
+    """
+    completed = {}
+    stale_lines = False
+    if not os.path.exists(output_path):
+        return completed, stale_lines
+
+    with open(output_path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 중단 시 마지막 줄이 잘렸을 수 있음
+                stale_lines = True
+                continue
+            barcode = record.get("barcode")
+            if not is_completed(record, retry_errors):
+                stale_lines = True
+                continue
+            if barcode in completed:
+                stale_lines = True
+            completed[barcode] = record
+    return completed, stale_lines
+
+
+def rewrite_results(output_path, completed, retry_barcodes):
+    """
+    결과 파일에서 다시 조회할 바코드의 이전 줄과 중복 줄을 지워 다시 씁니다.
+    이어서 기록해도 바코드마다 한 줄만 남고, 완료된 바코드는 load_completed가 고른 레코드를 남깁니다.
+    """
+    records = {}
+    with open(output_path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            barcode = record.get("barcode")
+            if barcode not in retry_barcodes:
+                records[barcode] = completed.get(barcode, record)
+    data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records.values())
+    atomic_write(output_path, data.encode("utf-8"))
+
+
+def ensure_trailing_newline(output_path):
+    # 중단으로 마지막 줄이 잘린 경우, 이어서 쓰는 레코드가 붙지 않도록 줄바꿈을 추가
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return
+    with open(output_path, "rb+") as file:
+        file.seek(-1, os.SEEK_END)
+        if file.read(1) != b"\n":
+            file.write(b"\n")
+
+
+def resolve_barcode(barcode, api_key_name, api_key_detail, matcher):
+    """
+    바코드 하나를 조회하여 결과 레코드를 반환합니다.
+    API 장애로 조회하지 못하면 다시 조회할 수 있도록 "retryable" 오류로 기록합니다.
+    """
+    if not barcode.isdigit():
+        return {"barcode": barcode, "error": "invalid_barcode"}
+
+    try:
+        product_info = get_product_info_by_barcode(barcode, api_key_name, raise_unavailable=True)
+    except ApiUnavailableError:
+        return {"barcode": barcode, "error": "product_api_unavailable", "retryable": True}
+    if product_info is None:
+        return {"barcode": barcode, "error": "product_not_found"}
+
+    product_name = product_info.get("PRDLST_NM", "이름 정보 없음")
+    report_no = product_info.get("PRDLST_REPORT_NO", "번호 없음")
+
+    try:
+        detail_info = get_nutrition_info_by_report_no(report_no, api_key_detail, raise_unavailable=True)
+    except ApiUnavailableError:
+        return {
+            "barcode": barcode,
+            "product_name": product_name,
+            "report_no": report_no,
+            "error": "nutrition_api_unavailable",
+            "retryable": True
+        }
+    if detail_info is None:
+        return {
+            "barcode": barcode,
+            "product_name": product_name,
+            "report_no": report_no,
+            "error": "nutrition_not_found"
+        }
+
+    allergy_info = detail_info.get("allergy", "알레르기 정보 없음")
+    rawmtrl = detail_info.get("rawmtrl", "")
+    allergens = matcher.find_allergens(allergy_info, rawmtrl)
+
+    return {
+        "barcode": barcode,
+        "product_name": product_name,
+        "report_no": report_no,
+        "nutrient": detail_info.get("nutrient", {}),
+        "allergy": allergy_info,
+        "allergens": allergens
+    }
+
+
+def run_batch(source, output_path, workers=8, name_concurrency=4, detail_concurrency=4,
+              name_rate=5.0, detail_rate=5.0, retry_errors=False):
+    # 환경 변수 로드
+    load_dotenv()
+
+    api_key_name = os.getenv('API_KEY_NAME')  # 식품안전나라 API 키
+    api_key_detail = os.getenv('API_KEY_DETAIL')  # 성분 정보 API 키
+
+    completed, stale_lines = load_completed(output_path, retry_errors) if output_path != "-" else ({}, False)
+    barcodes = [barcode for barcode in read_barcodes(source) if barcode not in completed]
+    print(f"처리할 바코드: {len(barcodes)}개 (완료된 바코드 {len(completed)}개 건너뜀)", file=sys.stderr)
+    if not barcodes:
+        return
+
+    # 다시 조회할 바코드의 이전 줄을 지운 뒤 이어서 기록
+    if stale_lines:
+        rewrite_results(output_path, completed, set(barcodes))
+
+    # 알레르기 성분 매처는 한 번만 만들어 모든 바코드에 사용
+    matcher = get_allergen_matcher()
+
+    # 캐시나 로컬 저장소에 있는 제품은 제한 없이 처리하고, API로 보내는 요청만 제한
+    http_client.set_rate_limiter("barcode_api", ApiLimiter(name_concurrency, name_rate))
+    http_client.set_rate_limiter("nutrition_api", ApiLimiter(detail_concurrency, detail_rate))
+
+    if output_path != "-":
+        ensure_trailing_newline(output_path)
+    output = sys.stdout if output_path == "-" else open(output_path, "a", encoding="utf-8")
+    write_lock = threading.Lock()
+    done = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(resolve_barcode, barcode, api_key_name, api_key_detail, matcher): barcode
+                for barcode in barcodes
+            }
+            for future in as_completed(futures):
+                barcode = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {"barcode": barcode, "error": str(e), "retryable": True}
+
+                # 한 줄씩 바로 기록하여 중단되어도 결과가 남도록 함
+                with write_lock:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    done += 1
+                if done % 100 == 0:
+                    print(f"진행: {done}/{len(barcodes)}", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        http_client.set_rate_limiter("barcode_api", None)
+        http_client.set_rate_limiter("nutrition_api", None)
+
+    print(f"완료: {done}/{len(barcodes)}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="바코드 일괄 조회")
+    parser.add_argument("input", help="바코드 목록 파일 (표준 입력은 '-')")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="결과 JSONL 파일 (표준 출력은 '-')")
+    parser.add_argument("--workers", type=int, default=8, help="동시에 처리할 바코드 수")
+    parser.add_argument("--name-concurrency", type=int, default=4, help="바코드 API 동시 요청 수")
+    parser.add_argument("--detail-concurrency", type=int, default=4, help="성분 정보 API 동시 요청 수")
+    parser.add_argument("--name-rate", type=float, default=5.0, help="바코드 API 초당 요청 수")
+    parser.add_argument("--detail-rate", type=float, default=5.0, help="성분 정보 API 초당 요청 수")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="제품 없음 등 모든 오류로 기록된 바코드를 다시 조회 (일시적인 오류는 항상 다시 조회)")
+    args = parser.parse_args()
+
+    run_batch(args.input, args.output, args.workers, args.name_concurrency, args.detail_concurrency,
+              args.name_rate, args.detail_rate, args.retry_errors)
+
+
+if __name__ == "__main__":
+    main()
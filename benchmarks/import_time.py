@@ -0,0 +1,126 @@
+# benchmarks/import_time.py
+"""
+프로그램 시작(모듈 불러오기) 시간 측정
+새 파이썬 프로세스에서 `python -X importtime -c "import main4"`를 여러 번 실행하여 불러오기 시간의 중앙값과
+가장 오래 걸린 모듈을 출력합니다. 시작할 때 불러오면 안 되는 무거운 SDK가 불러와졌는지도 확인합니다.
+
+사용법 (저장소 최상위 폴더에서):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module main4 --module scan_service --repeat 10
+    python -m benchmarks.import_time --budget-ms 150    # 중앙값이 예산을 넘거나 금지 모듈이 불러와지면 종료 코드 1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["main4", "scan_service"]
+
+# 첫 사용 때 불러오도록 바꾼 모듈 (시작할 때 불러오면 안 됨)
+FORBIDDEN_MODULES = ["streamlit", "requests", "boto3", "botocore", "supabase", "playsound", "pandas"]
+
+
+def run_importtime(module):
+    """
+    새 프로세스에서 모듈 하나를 불러오고 [(깊이, 모듈 이름, 자체 시간, 누적 시간)](마이크로초)를 반환합니다.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} 불러오기 실패:\n{completed.stderr[-2000:]}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def loaded_modules(module, names):
+    """
+    모듈을 불러온 뒤 names 중 함께 불러와진 모듈 목록을 반환합니다.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    code = f"import json, sys, {module}; print(json.dumps([name for name in {names!r} if name in sys.modules]))"
+    completed = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} 불러오기 실패:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(module, repeat, top):
+    """
+    반환: {"module", "median_ms", "min_ms", "max_ms", "slowest": [(모듈, 누적 밀리초)], "forbidden": [...]}
+    """
+    totals = []
+    cumulative = {}
+    for _ in range(repeat):
+        entries = run_importtime(module)
+        index = max(i for i, (depth, name, _, _) in enumerate(entries) if depth == 0 and name == module)
+        totals.append(entries[index][3] / 1000)
+        # 측정 모듈이 불러오는 모듈(깊이 2까지)의 누적 시간 (importtime은 하위 모듈을 먼저 출력하므로 앞쪽으로 거슬러 올라감)
+        for depth, name, _, us in reversed(entries[:index]):
+            if depth == 0:
+                break
+            if depth <= 2:
+                cumulative.setdefault(name, []).append(us / 1000)
+
+    slowest = sorted(
+        ((name, statistics.median(values)) for name, values in cumulative.items()),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+    return {
+        "module": module,
+        "median_ms": statistics.median(totals),
+        "min_ms": min(totals),
+        "max_ms": max(totals),
+        "slowest": slowest,
+        "forbidden": loaded_modules(module, FORBIDDEN_MODULES),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모듈 불러오기 시간 측정")
+    parser.add_argument("--module", action="append", help=f"측정할 모듈 (여러 번 지정 가능, 기본값: {', '.join(DEFAULT_MODULES)})")
+    parser.add_argument("--repeat", type=int, default=5, help="모듈별 반복 횟수")
+    parser.add_argument("--top", type=int, default=8, help="출력할 느린 모듈 수")
+    parser.add_argument("--budget-ms", type=float, help="불러오기 시간 중앙값 상한 (넘으면 종료 코드 1)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for module in args.module or DEFAULT_MODULES:
+        result = measure(module, args.repeat, args.top)
+        results.append(result)
+
+        print(f"{module}: 중앙값 {result['median_ms']:.1f}ms (최소 {result['min_ms']:.1f}ms, 최대 {result['max_ms']:.1f}ms)")
+        for name, ms in result["slowest"]:
+            print(f"    {name:<32} {ms:8.1f}ms")
+        if result["forbidden"]:
+            print(f"    시작할 때 불러오면 안 되는 모듈: {', '.join(result['forbidden'])}")
+            failed = True
+        if args.budget_ms is not None and result["median_ms"] > args.budget_ms:
+            print(f"    예산 초과: {result['median_ms']:.1f}ms > {args.budget_ms:.1f}ms")
+            failed = True
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/nutrient_parser_bench.py
+"""
+영양성분 파서 처리량 측정
+측정 전에 라벨별 기대값 파일(한 줄에 JSON 하나, 라벨과 같은 순서)과 파싱 결과를 비교하고, 다르면 종료 코드 1로 끝냅니다.
+
+사용법 (저장소 최상위 폴더에서):
+    python -m benchmarks.nutrient_parser_bench
+    python -m benchmarks.nutrient_parser_bench --corpus labels.txt --expected labels_expected.jsonl --repeat 2000
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+
+from nutrient_parser import _TOKEN_PATTERN, parse_nutrient_string
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "nutrient_labels.txt")
+DEFAULT_EXPECTED = os.path.join(os.path.dirname(__file__), "nutrient_labels_expected.jsonl")
+
+
+def legacy_parse_nutrient_string(nutrient_str):
+    # 비교용: 영양성분마다 정규식을 따로 만들어 검색하던 이전 파서
+    nutrient_dict = {}
+    key_mapping = {
+        "열량": "energy_kcal",
+        "탄수화물": "carbohydrates",
+        "단백질": "proteins",
+        "지방": "fat",
+        "나트륨": "sodium",
+        "포화지방": "saturated_fat"
+    }
+
+    for korean, english in key_mapping.items():
+        pattern = rf"{korean}\s+([\d,]+(?:\.\d+)?)\s*([kK][cC][aA][lL]|[gG]|[mM][gG])"
+        match = re.search(pattern, nutrient_str)
+        if match:
+            number = match.group(1).replace(',', '')
+            unit = match.group(2)
+            nutrient_dict[english] = f"{number}{unit}"
+        else:
+            nutrient_dict[english] = "정보 없음"
+
+    return nutrient_dict
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def load_expected(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def check_expected(labels, expected):
+    """
+    라벨별 파싱 결과를 기대값과 비교하고 [(라벨 번호, 키, 기대값, 결과)] 목록을 반환합니다.
+    """
+    if len(labels) != len(expected):
+        raise ValueError(f"라벨 수({len(labels)})와 기대값 수({len(expected)})가 다릅니다.")
+    mismatches = []
+    for line_no, (label, values) in enumerate(zip(labels, expected), start=1):
+        parsed = parse_nutrient_string(label)
+        for key, value in values.items():
+            actual = parsed.get(key)
+            if value is None or actual is None:
+                same = value is None and actual is None
+            else:
+                same = math.isclose(actual, value, rel_tol=1e-6)
+            if not same:
+                mismatches.append((line_no, key, value, actual))
+    return mismatches
+
+
+def measure(parse, labels, repeat):
+    """
+    labels를 repeat번 파싱하는 데 걸린 시간으로 초당 처리 라벨 수를 반환합니다.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for label in labels:
+            parse(label)
+    elapsed = time.perf_counter() - start
+    return len(labels) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="영양성분 파서 처리량 측정")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="한 줄에 라벨 하나인 텍스트 파일")
+    parser.add_argument("--expected", help="라벨별 기대값 파일 (기본 코퍼스는 nutrient_labels_expected.jsonl)")
+    parser.add_argument("--repeat", type=int, default=1000, help="코퍼스 반복 횟수")
+    args = parser.parse_args()
+
+    labels = load_corpus(args.corpus)
+    expected_path = args.expected or (DEFAULT_EXPECTED if args.corpus == DEFAULT_CORPUS else None)
+    if expected_path:
+        mismatches = check_expected(labels, load_expected(expected_path))
+        for line_no, key, value, actual in mismatches:
+            print(f"{line_no}번 라벨 {key}: 기대값 {value}, 결과 {actual}")
+        if mismatches:
+            sys.exit(1)
+        print(f"기대값 확인: 라벨 {len(labels)}개 일치")
+
+    print(f"라벨 {len(labels)}개 x {args.repeat}회")
+
+    # 토크나이저: parse_nutrient_string 안에서 라벨을 한 번 훑는 정규식만 따로 측정
+    for name, parse in [("parse_nutrient_string", parse_nutrient_string),
+                        ("토크나이저 (findall)", _TOKEN_PATTERN.findall),
+                        ("legacy (정규식 6개)", legacy_parse_nutrient_string)]:
+        throughput = measure(parse, labels, args.repeat)
+        print(f"{name:>24}: {throughput:>12,.0f} labels/s  ({1e6 / throughput:.2f} us/label)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# benchmarks/scan_latency.py
+"""
+스캔 전체 흐름의 단계별 지연 측정
+C005, CertImgListServiceV3, Supabase allergy_info, Polly를 모두 로컬 대역 서버(devtools/fake_services.py)로 바꾸고,
+임시 폴더의 빈 캐시로 main4.py와 같은 스캔(scanner.scan_barcode)을 반복합니다.
+
+측정 항목:
+    - 단계별(바코드 API, 성분 정보 API, 알레르기 성분 검사, 음성 준비)과 전체(스캔 시작 -> 모든 안내 음성 준비) p50/p95/p99
+    - 빈 캐시(cold)로 처음 스캔할 때와 같은 바코드를 다시 스캔할 때(warm)
+    - 처리량: 한 개씩 스캔(음성 포함), 일괄 처리(batch_scan.run_batch, 음성 제외)를 작업자 1개와 여러 개로 비교
+
+사용법 (저장소 최상위 폴더에서):
+    python -m benchmarks.scan_latency
+    python -m benchmarks.scan_latency --scans 200 --latency c005=80,certimg=120,supabase=40,polly=150 --jitter 20
+    python -m benchmarks.scan_latency --error-rate certimg=0.05 --drop-rate c005=0.01 --json scan_latency.json
+"""
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from devtools.fake_services import add_fault_arguments, build_faults, generate_dataset, service_environment, start_server
+
+PERCENTILES = (50, 95, 99)
+END_TO_END = "end_to_end"
+
+# 출력 순서 (scanner.py의 단계 이름)
+STAGE_ORDER = [
+    "barcode_api", "nutrition_api", "allergen_match", "product_tts", "allergen_tts",
+    "first_warning", "audio_ready", END_TO_END
+]
+
+
+def percentile(values, pct):
+    # 가장 가까운 순위 방식의 백분위수
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    [{단계: 초}] 목록을 {단계: {"n", "p50", "p95", "p99"}}(밀리초)로 요약합니다.
+    """
+    stages = {}
+    for timings in samples:
+        for stage, elapsed in timings.items():
+            stages.setdefault(stage, []).append(elapsed * 1000)
+    return {
+        stage: dict({"n": len(values)}, **{f"p{pct}": percentile(values, pct) for pct in PERCENTILES})
+        for stage, values in sorted(stages.items(), key=lambda item: STAGE_ORDER.index(item[0]))
+    }
+
+
+def run_scans(barcodes, executor):
+    """
+    main4.py처럼 바코드를 하나씩 스캔하고, 안내 음성이 모두 준비될 때까지 기다립니다.
+    반환: (스캔별 단계 소요 시간 목록, 오류 수, 걸린 시간)
+    """
+    from scanner import scan_barcode
+
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for barcode in barcodes:
+        result = scan_barcode(barcode, os.getenv('API_KEY_NAME'), os.getenv('API_KEY_DETAIL'), executor)
+        result.wait_audio()
+        end_to_end = time.perf_counter() - result.started
+
+        failed = result.error is not None or result.allergen_error is not None
+        for future in result.audio_futures():
+            try:
+                # 재생 대신 스트리밍으로 받은 제품 안내를 끝까지 받아 캐시에 저장
+                for source in future.result():
+                    if not isinstance(source, str):
+                        source.save()
+            except Exception:
+                failed = True
+
+        if failed:
+            errors += 1
+            continue
+        timings = dict(result.timings)
+        timings[END_TO_END] = end_to_end
+        samples.append(timings)
+    return samples, errors, time.perf_counter() - started
+
+
+def run_batch_throughput(barcodes, workers, workdir):
+    """
+    batch_scan.run_batch로 바코드를 일괄 조회하고 (처리한 수, 걸린 시간)을 반환합니다. (API 속도 제한 없음)
+    """
+    import batch_scan
+
+    source = os.path.join(workdir, f"batch-{workers}.txt")
+    output = os.path.join(workdir, f"batch-{workers}.jsonl")
+    with open(source, "w", encoding="utf-8") as file:
+        file.write("\n".join(barcodes) + "\n")
+
+    started = time.perf_counter()
+    batch_scan.run_batch(source, output, workers=workers, name_concurrency=workers, detail_concurrency=workers,
+                         name_rate=1e9, detail_rate=1e9)
+    elapsed = time.perf_counter() - started
+
+    with open(output, encoding="utf-8") as file:
+        done = sum(1 for line in file if line.strip())
+    return done, elapsed
+
+
+def print_table(title, summary):
+    print(f"\n[{title}]")
+    print(f"{'단계':<16}{'n':>6}" + "".join(f"{f'p{pct}(ms)':>12}" for pct in PERCENTILES))
+    for stage, values in summary.items():
+        print(f"{stage:<16}{values['n']:>6}" + "".join(f"{values[f'p{pct}']:>12.1f}" for pct in PERCENTILES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스캔 단계별 지연 측정 (로컬 대역 서비스 사용)")
+    parser.add_argument("--scans", type=int, default=100, help="시나리오별 스캔할 바코드 수")
+    parser.add_argument("--workers", type=int, default=4, help="스캔 작업 풀 크기 (main4.py와 같음)")
+    parser.add_argument("--batch-workers", type=int, default=8, help="일괄 처리 비교에 사용할 작업자 수")
+    parser.add_argument("--seed", type=int, default=0, help="가상 제품 데이터 시드")
+    parser.add_argument("--tts-warmup", action="store_true", help="스캔 전에 main4.py처럼 음성 캐시를 미리 준비")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일")
+    parser.add_argument("--keep", action="store_true", help="임시 캐시 폴더를 지우지 않음")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    # 스캔(cold/warm), 일괄 처리 작업자 1개, 여러 개에 서로 다른 바코드를 사용하여 캐시가 섞이지 않도록 함
+    dataset = generate_dataset(args.scans * 3, args.seed)
+    barcodes = list(dataset["products"])
+    scan_barcodes = barcodes[:args.scans]
+    serial_barcodes = barcodes[args.scans:args.scans * 2]
+    parallel_barcodes = barcodes[args.scans * 2:]
+
+    faults = build_faults(args.latency, args.jitter, args.error_rate, args.drop_rate)
+    server = start_server(dataset=dataset, faults=faults)
+    workdir = tempfile.mkdtemp(prefix="scan-latency-")
+    if not args.keep:
+        # 음성 캐시 색인이 종료 시 저장된 뒤에 지워지도록 가장 먼저 등록 (atexit는 역순으로 실행)
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+
+    # 모듈이 가져올 때 설정을 읽으므로, 프로젝트 모듈을 가져오기 전에 대역 서버와 임시 캐시를 바라보도록 설정
+    os.environ.update(service_environment(server))
+    os.environ.update({
+        "PRODUCT_CACHE_PATH": os.path.join(workdir, "product_cache.db"),
+        "PRODUCT_STORE_PATH": os.path.join(workdir, "product_store.db"),  # 만들지 않으므로 로컬 저장소는 사용하지 않음
+        "TTS_CACHE_DIR": os.path.join(workdir, "sound_cache"),
+        "ALLERGY_SNAPSHOT_PATH": os.path.join(workdir, "allergy_snapshot.json"),
+        "SUPABASE_KEY": "bench.bench.bench",
+        "AWS_ACCESS_KEY": "bench",
+        "AWS_SECRET_KEY": "bench",
+        "API_KEY_NAME": "bench",
+        "API_KEY_DETAIL": "bench",
+        "TTS_WARMUP": "0",
+    })
+
+    report = {"config": vars(args), "scenarios": {}, "throughput": {}}
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        # 스캔 중 출력되는 안내 문구는 측정 결과와 섞이지 않도록 버림
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            if args.tts_warmup:
+                from ttsAdvanced import warm_up_tts_cache
+
+                started = time.perf_counter()
+                warm_up_tts_cache()
+                report["tts_warmup_s"] = time.perf_counter() - started
+
+            for scenario in ("cold", "warm"):
+                samples, errors, elapsed = run_scans(scan_barcodes, executor)
+                report["scenarios"][scenario] = {"errors": errors, "stages": summarize(samples)}
+                report["throughput"][f"single_scan_{scenario}"] = {
+                    "scans": len(scan_barcodes), "seconds": elapsed, "per_second": len(scan_barcodes) / elapsed
+                }
+
+            for name, batch_barcodes, workers in (
+                ("batch_1_worker", serial_barcodes, 1),
+                (f"batch_{args.batch_workers}_workers", parallel_barcodes, args.batch_workers),
+            ):
+                done, elapsed = run_batch_throughput(batch_barcodes, workers, workdir)
+                report["throughput"][name] = {"scans": done, "seconds": elapsed, "per_second": done / elapsed}
+
+        # 전체 실행 동안의 캐시 적중, 재시도, 타임아웃 횟수 (metrics.py)
+        from metrics import get_metrics
+
+        report["counters"] = get_metrics().snapshot()["counters"]
+    finally:
+        executor.shutdown(wait=True)
+        server.shutdown()
+
+    if "tts_warmup_s" in report:
+        print(f"음성 캐시 준비: {report['tts_warmup_s'] * 1000:.1f}ms")
+    for scenario, result in report["scenarios"].items():
+        print_table(f"{scenario} (실패 {result['errors']}건 제외)", result["stages"])
+
+    print("\n[처리량]")
+    for name, result in report["throughput"].items():
+        print(f"{name:<24}{result['scans']:>6}건 {result['seconds']:>8.2f}s {result['per_second']:>10.1f}건/s")
+    print("(single_scan은 안내 음성 준비 포함, batch는 음성 없이 조회와 알레르기 성분 검사만 수행)")
+
+    print("\n[카운터]")
+    for counter in sorted(report.get("counters", []), key=lambda item: (item["name"], sorted(item["labels"].items()))):
+        labels = ",".join(f"{name}={value}" for name, value in sorted(counter["labels"].items()))
+        print(f"{counter['name']:<16}{labels:<48}{counter['value']:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,69 @@
+import os
+import tempfile
 import streamlit as st
-import pandas as pd
 from dotenv import load_dotenv
-import re
-from db_utils import get_db_connection  # 수정된 db_utils.py의 함수 임포트
+import db_utils
+from allergen_io import validate_allergen, read_rows, validate_rows, diff_allergens, apply_diff, iter_csv
+from db_utils import get_db_connection
+from risk_levels import RiskLevel, KOREAN_NAMES, normalize_risk_level
 
 # 환경 변수 로드
 load_dotenv()
 
-# 알레르기 정보 삽입 함수
-def insert_allergy_info(allergen, risk_level):
+# 테이블 캐시 유지 시간 (초). 이 페이지에서 추가/삭제하면 바로 비우고, 다른 곳에서 바꾼 내용은 이 시간 안에 반영됨
+TABLE_CACHE_TTL = 60
+
+# 데이터베이스 오류를 화면에 표시하고 이번 실행을 멈춤 (db_utils는 오류를 그대로 전달함)
+def show_db_error(e):
+    st.error(f"데이터베이스 오류: {e}")
+    st.stop()
+
+# allergy_info 테이블 조회 함수 (위젯을 조작할 때마다 다시 실행되므로 세션 간에 공유하는 캐시에 보관)
+@st.cache_data(ttl=TABLE_CACHE_TTL, show_spinner=False)
+def load_allergy_table():
     with get_db_connection() as supabase:
-        data = {'allergen': allergen, 'risk_level': risk_level}
-        result = supabase.table('allergy_info').upsert(data).execute()
-        return result
+        result = supabase.table('allergy_info').select('allergen, risk_level').order('allergen').execute()
+        return result.data
 
-# 알레르기 정보 삭제 함수
+# 캐시된 테이블 반환 (조회 실패 시 오류 표시)
+def get_allergy_table():
+    try:
+        return load_allergy_table()
+    except Exception as e:
+        show_db_error(e)
+
+# 알레르기 정보 삽입 함수 (저장 후 테이블 캐시를 비움)
+def insert_allergy_info(allergen, risk_level):
+    try:
+        result = db_utils.insert_allergy_info(allergen, risk_level)
+    except Exception as e:
+        show_db_error(e)
+    load_allergy_table.clear()
+    return result
+
+# 알레르기 정보 삭제 함수 (삭제 후 테이블 캐시를 비움)
 def delete_allergy_info(allergen):
-    with get_db_connection() as supabase:
-        result = supabase.table('allergy_info').delete().eq('allergen', allergen).execute()
-        return result
+    try:
+        result = db_utils.delete_allergy_info(allergen)
+    except Exception as e:
+        show_db_error(e)
+    load_allergy_table.clear()
+    return result
 
 # 알레르기 정보 그룹 조회 함수
 def get_allergy_info_grouped():
-    with get_db_connection() as supabase:
-        result = supabase.table('allergy_info').select('allergen, risk_level').order('risk_level').execute()
-        df = pd.DataFrame(result.data)
-        grouped = {
-            "High risk group": df[df['risk_level'] == 'High risk group'],
-            "Risk group": df[df['risk_level'] == 'Risk group'],
-            "Caution group": df[df['risk_level'] == 'Caution group']
-        } if not df.empty else {
-            "High risk group": pd.DataFrame(),
-            "Risk group": pd.DataFrame(),
-            "Caution group": pd.DataFrame()
-        }
-        return grouped
-
-# 입력값 검증 함수
-def validate_allergen(allergen):
-    pattern = re.compile(r'^[A-Za-z가-힣\s\-\/]+$')
-    return bool(pattern.match(allergen))
-
-# 위험 그룹 이름 매핑 (한국어 <-> 영어)
-risk_level_mapping = {
-    "고위험": "High risk group",
-    "위험": "Risk group",
-    "주의": "Caution group"
-}
+    """
+    테이블을 한 번 훑어 위험 수준별 알레르기 성분 목록으로 나눕니다.
+    반환: {RiskLevel: [allergen]} (알 수 없는 위험 수준으로 저장된 성분은 None 그룹)
+    """
+    grouped = {level: [] for level in RiskLevel}
+    for row in get_allergy_table():
+        # 이전에 'High risk group' 등으로 저장된 행도 같은 그룹으로 표시
+        grouped.setdefault(normalize_risk_level(row['risk_level']), []).append(row['allergen'])
+    return grouped
+
+# 위험 그룹 이름 매핑 (한국어 -> RiskLevel)
+risk_level_mapping = {korean_name: level for level, korean_name in KOREAN_NAMES.items()}
 
 # Streamlit 애플리케이션 시작
 st.title("알레르기 정보 관리")
@@ -74,29 +91,89 @@ if st.button("알레르기 정보 추가"):
 
 st.markdown("---")
 
+# 파일 일괄 등록 섹션
+st.subheader("파일로 일괄 등록")
+
+uploaded_file = st.file_uploader("CSV 또는 Excel 파일 (allergen, risk_level 열)", type=["csv", "xlsx"])
+delete_missing = st.checkbox("파일에 없는 알레르기 성분은 삭제", value=False)
+
+if uploaded_file is not None:
+    try:
+        desired, errors = validate_rows(read_rows(uploaded_file, uploaded_file.name))
+    except (ValueError, ImportError) as e:
+        desired, errors = {}, [(1, str(e))]
+
+    if errors:
+        st.error(f"{len(errors)}개 행에 오류가 있어 반영할 수 없습니다. 수정한 뒤 다시 올려주세요.")
+        st.write("\n".join(f"- {line}번째 줄: {message}" for line, message in errors[:50]))
+    else:
+        # 화면에는 캐시된 테이블과 비교한 결과를 보여주고, 반영할 때는 최신 테이블과 다시 비교
+        current = {row['allergen']: row['risk_level'] for row in get_allergy_table()}
+        diff = diff_allergens(current, desired, delete_missing)
+        st.write(
+            f"추가 {len(diff['insert'])}개, 변경 {len(diff['update'])}개, "
+            f"삭제 {len(diff['delete'])}개, 변경 없음 {diff['unchanged']}개"
+        )
+
+        if st.button("일괄 반영"):
+            progress_bar = st.progress(0.0)
+            try:
+                current = {row['allergen']: row['risk_level'] for row in db_utils.iter_allergy_info()}
+                diff = diff_allergens(current, desired, delete_missing)
+                applied = apply_diff(
+                    diff, progress=lambda done, total: progress_bar.progress(done / total, text=f"{done}/{total}")
+                )
+            except Exception as e:
+                # 일부만 반영되었을 수 있으므로 캐시를 비운 뒤 오류 표시
+                load_allergy_table.clear()
+                show_db_error(e)
+            load_allergy_table.clear()
+            st.success(f"{applied}개 항목을 반영했습니다!")
+
+st.markdown("---")
+
 # 저장된 알레르기 정보 표시 섹션
 st.subheader("저장된 알레르기 정보 목록")
 
 # 그룹별 데이터 가져오기
 allergy_data_grouped = get_allergy_info_grouped()
 
+# 현재 목록 내보내기 (캐시된 테이블 사용, 한글이 깨지지 않도록 BOM 포함 UTF-8)
+# 전체 CSV를 하나의 문자열로 합치지 않고 나누어 임시 파일에 쓴 뒤 파일로 넘김
+# (Streamlit은 내려받기 데이터를 한 번에 읽어 보관하므로, 아주 큰 테이블은 allergen_io.py export를 사용)
+with tempfile.TemporaryDirectory() as export_directory:
+    export_path = os.path.join(export_directory, "allergy_info.csv")
+    with open(export_path, "w", encoding="utf-8-sig", newline="") as export_file:
+        for chunk in iter_csv(get_allergy_table()):
+            export_file.write(chunk)
+    with open(export_path, "rb") as export_file:
+        st.download_button(
+            "CSV로 내보내기",
+            data=export_file,
+            file_name="allergy_info.csv",
+            mime="text/csv"
+        )
+
 # 그룹별로 테이블 및 삭제 버튼 표시
-for group, data in allergy_data_grouped.items():
-    korean_group_name = {v: k for k, v in risk_level_mapping.items()}[group]  # 영어 -> 한국어 변환
+for group, allergens in allergy_data_grouped.items():
+    korean_group_name = KOREAN_NAMES.get(group, "알 수 없음")  # RiskLevel -> 한국어 변환
 
     # 위험도에 따른 색상 및 배경색 지정
-    if korean_group_name == "고위험":
+    if group == RiskLevel.HIGH_RISK:
         color = "white"
         background_color = "rgba(255, 0, 0, 0.7)"
-    elif korean_group_name == "위험":
+    elif group == RiskLevel.RISK:
         color = "black"
         background_color = "rgba(255, 165, 0, 0.7)"
-    else:  # "주의" 그룹
+    elif group == RiskLevel.CAUTION:
         color = "black"
         background_color = "rgba(255, 255, 0, 0.7)"
+    else:  # 알 수 없는 위험 수준으로 저장된 항목
+        color = "black"
+        background_color = "rgba(200, 200, 200, 0.7)"
 
-    if not data.empty:
-        allergens_list = " | ".join(data['allergen'])
+    if allergens:
+        allergens_list = " | ".join(allergens)
 
         st.markdown(
             f"""
@@ -111,12 +188,12 @@ for group, data in allergy_data_grouped.items():
         )
 
         # 항목별 삭제 버튼 추가
-        for index, row in data.iterrows():
-            delete_button = st.button(f"삭제 {row['allergen']}", key=f"delete_{group}_{index}", use_container_width=True)
+        for allergen_name in allergens:
+            delete_button = st.button(f"삭제 {allergen_name}", key=f"delete_{allergen_name}", use_container_width=True)
 
             if delete_button:
-                delete_allergy_info(row['allergen'])  # 해당 항목만 삭제하는 함수 호출
-                st.success(f"{row['allergen']} 항목이 삭제되었습니다!")
+                delete_allergy_info(allergen_name)  # 해당 항목만 삭제하는 함수 호출
+                st.success(f"{allergen_name} 항목이 삭제되었습니다!")
     else:
         st.write(f"{korean_group_name} 그룹에 저장된 알레르기 정보가 없습니다.")
 
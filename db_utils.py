@@ -1,41 +1,246 @@
 import os
+import json
+import hashlib
+import threading
+import time
 from dotenv import load_dotenv
 from contextlib import contextmanager
-import streamlit as st
-from supabase import create_client
+import metrics
+from risk_levels import normalize_risk_level
+from file_utils import atomic_write
 
 # 환경 변수 로드
 load_dotenv()
 
-# Supabase 클라이언트 초기화
+# 알레르기 위험도 스냅샷 설정
+SNAPSHOT_PATH = os.getenv('ALLERGY_SNAPSHOT_PATH', 'allergy_snapshot.json')
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv('ALLERGY_SNAPSHOT_INTERVAL', 300))  # 변경 확인 간격 (초)
+SNAPSHOT_RETRY_INTERVAL = float(os.getenv('ALLERGY_SNAPSHOT_RETRY_INTERVAL', 5))  # 갱신 실패 후 다시 시도할 간격 (초)
+SNAPSHOT_UPDATED_COLUMN = os.getenv('ALLERGY_UPDATED_COLUMN', 'updated_at')  # 최종 수정 시각 컬럼
+
+_client = None
+_client_lock = threading.Lock()
+
+# Supabase 클라이언트 초기화 (프로세스 전체에서 하나만 생성하여 재사용)
 def init_supabase():
-    url: str = os.getenv('SUPABASE_URL')
-    key: str = os.getenv('SUPABASE_KEY')
-    return create_client(url, key)
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # supabase SDK는 처음 연결할 때 불러옴 (프로그램 시작 시간 단축)
+                from supabase import create_client
+
+                url: str = os.getenv('SUPABASE_URL')
+                key: str = os.getenv('SUPABASE_KEY')
+                _client = create_client(url, key)
+    return _client
 
 @contextmanager
 def get_db_connection():
-    supabase = init_supabase()
-    try:
-        yield supabase
-    except Exception as e:
-        st.error(f"데이터베이스 오류: {e}")
-        raise e
+    """
+    공유 Supabase 클라이언트를 넘겨줍니다. 오류는 그대로 전달하므로 화면 표시는 호출한 쪽(db_manage.py 등)에서 합니다.
+    """
+    yield init_supabase()
+
+
+def normalize_risk_levels(risk_levels):
+    """
+    {allergen: risk_level}의 위험 수준을 RiskLevel로 통일합니다. ('High risk group' 등 이전 표기 포함)
+    알 수 없는 값은 그대로 둡니다.
+    """
+    return {allergen: normalize_risk_level(level) or level for allergen, level in risk_levels.items()}
+
+
+def _is_missing_column_error(error, column):
+    # PostgREST의 '컬럼 없음' 오류 (PostgreSQL 42703 undefined_column, 또는 스키마 캐시에 없는 컬럼 PGRST204)
+    code = getattr(error, 'code', None)
+    if code in ('42703', 'PGRST204'):
+        return True
+    message = str(error)
+    return column in message and ('does not exist' in message or 'Could not find' in message)
+
+
+def _content_hash(rows):
+    # 수정 시각 컬럼이 없을 때 위험 수준 변경까지 알아채기 위한 테이블 내용 해시
+    payload = json.dumps(sorted((row['allergen'], row['risk_level']) for row in rows), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AllergenSnapshotUnavailableError(RuntimeError):
+    """
+    Supabase에 연결할 수 없고 디스크에 저장된 스냅샷도 없어 알레르기 정보를 한 번도 읽지 못한 경우
+    (등록된 성분이 없는 것과 구분하여, 빈 결과 대신 오류로 알림)
+    """
+
+
+class AllergenSnapshot:
+    """
+    allergy_info 테이블 전체(allergen -> risk_level)를 메모리에 보관하는 스냅샷
+    refresh_interval마다 행 수와 최종 수정 시각을 확인하여 바뀐 경우에만 전체를 다시 읽습니다.
+    테이블에 수정 시각 컬럼이 없으면 매번 전체를 읽어 내용 해시로 비교합니다. (위험 수준만 바꾼 경우도 반영)
+    마지막으로 성공한 스냅샷은 디스크에도 저장하여, Supabase가 느리거나 연결되지 않아도 조회할 수 있습니다.
+    갱신에 실패하면 refresh_interval 대신 retry_interval 뒤에 다시 시도합니다.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH, refresh_interval=SNAPSHOT_REFRESH_INTERVAL,
+                 updated_column=SNAPSHOT_UPDATED_COLUMN, retry_interval=SNAPSHOT_RETRY_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.updated_column = updated_column
+        self.risk_levels = {}
+        self.signature = None
+        self.version = 0
+        self.loaded = False  # 디스크나 Supabase에서 한 번이라도 읽었는지
+        self.last_error = None  # 마지막 갱신 실패 원인 (성공하면 None)
+        self.checked_at = None
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+        self._refreshing = False
+        self._load_from_disk()
+
+    def _load_from_disk(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.risk_levels = normalize_risk_levels(data.get('risk_levels', {}))
+        signature = data.get('signature')
+        self.signature = tuple(signature) if signature else None
+        self.version += 1
+        self.loaded = True
+
+    def _save_to_disk(self):
+        data = {'risk_levels': self.risk_levels, 'signature': self.signature, 'saved_at': time.time()}
+        atomic_write(self.path, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def _fetch_signature(self, supabase):
+        # 행 수와 최종 수정 시각으로 테이블 변경 여부를 판단 (수정 시각 컬럼이 없으면 None)
+        result = supabase.table('allergy_info')\
+            .select('allergen', count='exact')\
+            .limit(1)\
+            .execute()
+        max_updated = None
+
+        if self.updated_column:
+            try:
+                latest = supabase.table('allergy_info')\
+                    .select(self.updated_column)\
+                    .order(self.updated_column, desc=True)\
+                    .limit(1)\
+                    .execute()
+                if latest.data:
+                    max_updated = latest.data[0][self.updated_column]
+            except Exception as e:
+                # 일시적인 네트워크 오류는 그대로 전달 (기존 스냅샷 유지), 컬럼이 없는 테이블인 경우에만 내용 해시로 전환
+                if not _is_missing_column_error(e, self.updated_column):
+                    raise
+                print(f"allergy_info에 {self.updated_column} 컬럼이 없어 테이블 내용으로 변경 여부를 확인합니다.")
+                self.updated_column = None
+                return None
+
+        return (result.count, max_updated)
+
+    def refresh(self, force=False):
+        """
+        테이블이 바뀌었으면 스냅샷을 다시 읽습니다. 실패하면 기존 스냅샷을 유지합니다.
+        """
+        try:
+            with metrics.span("allergen_db_refresh"):
+                self._refresh(force)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+            if self.loaded:
+                print(f"알레르기 정보 스냅샷 갱신 실패 (기존 데이터 사용, {self.retry_interval:g}초 뒤 다시 시도): {e}")
+            else:
+                print(f"알레르기 정보를 불러오지 못했습니다 ({self.retry_interval:g}초 뒤 다시 시도): {e}")
+        finally:
+            with self._lock:
+                self.checked_at = time.time()
+                self._refreshing = False
+                self._refreshed.notify_all()
+
+    def _refresh(self, force):
+        supabase = init_supabase()
+        signature = self._fetch_signature(supabase) if self.updated_column else None
+        rows = None
+        if signature is None:
+            # 수정 시각 컬럼이 없으면 전체를 읽어 내용 해시로 비교 (행 수만으로는 위험 수준 변경을 알 수 없음)
+            rows = supabase.table('allergy_info')\
+                .select('allergen, risk_level')\
+                .execute().data
+            signature = (len(rows), _content_hash(rows))
+        if force or signature != self.signature or not self.risk_levels:
+            if rows is None:
+                rows = supabase.table('allergy_info')\
+                    .select('allergen, risk_level')\
+                    .execute().data
+            risk_levels = normalize_risk_levels({row['allergen']: row['risk_level'] for row in rows})
+            with self._lock:
+                self.risk_levels = risk_levels
+                self.signature = signature
+                self.version += 1
+                self.loaded = True
+            self._save_to_disk()
+
+    def get(self):
+        """
+        현재 스냅샷(allergen -> risk_level)을 반환합니다.
+        확인 간격이 지났으면 백그라운드에서 갱신하고, 한 번도 읽지 못한 경우에만 기다립니다.
+        한 번도 읽지 못했고 이번 시도도 실패하면 AllergenSnapshotUnavailableError를 던집니다.
+        """
+        with self._lock:
+            interval = self.retry_interval if self.last_error is not None else self.refresh_interval
+            stale = self.checked_at is None or time.time() - self.checked_at >= interval
+            start_refresh = stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+            loaded = self.loaded
+            if not loaded and not start_refresh:
+                # 다른 스레드(시작 시 준비 작업 등)가 처음 읽는 중이면 빈 스냅샷을 돌려주지 않고 기다림
+                self._refreshed.wait_for(lambda: not self._refreshing)
+
+        if start_refresh:
+            if loaded:
+                threading.Thread(target=self.refresh, daemon=True).start()
+            else:
+                self.refresh()
+        if not self.loaded:
+            raise AllergenSnapshotUnavailableError(f"알레르기 정보를 불러오지 못했습니다: {self.last_error}")
+        return self.risk_levels
+
+    def invalidate(self):
+        """
+        다음 조회 때 테이블을 다시 확인하도록 합니다. (데이터 추가/삭제 후 호출)
+        """
+        with self._lock:
+            self.checked_at = None
+            self.signature = None
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_allergen_snapshot():
+    """
+    프로세스 전체에서 공유하는 알레르기 위험도 스냅샷을 반환합니다.
+    """
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = AllergenSnapshot()
+    return _snapshot
 
 def get_allergen_risk_level(allergen):
     """
     주어진 알레르기 성분의 위험 수준을 반환합니다.
     알레르기 정보가 없으면 None을 반환합니다.
     """
-    with get_db_connection() as supabase:
-        result = supabase.table('allergy_info')\
-            .select('risk_level')\
-            .eq('allergen', allergen)\
-            .execute()
-        
-        if result.data and len(result.data) > 0:
-            return result.data[0]['risk_level']
-        return None
+    return get_allergen_snapshot().get().get(allergen)
 
 def get_allergens_risk_levels(allergens):
     """
@@ -45,20 +250,39 @@ def get_allergens_risk_levels(allergens):
     """
     if not allergens:
         return {}
-    
-    with get_db_connection() as supabase:
-        result = supabase.table('allergy_info')\
-            .select('allergen, risk_level')\
-            .in_('allergen', allergens)\
-            .execute()
-        
-        return {row['allergen']: row['risk_level'] for row in result.data}
+
+    risk_levels = get_allergen_snapshot().get()
+    return {allergen: risk_levels[allergen] for allergen in allergens if allergen in risk_levels}
+
+def get_all_allergens_risk_levels():
+    """
+    등록된 모든 알레르기 성분의 위험 수준을 한 번에 반환하는 함수
+    반환: 딕셔너리 {allergen: risk_level}
+    """
+    return dict(get_allergen_snapshot().get())
 
 def insert_allergy_info(allergen, risk_level):
+    return upsert_allergy_infos([(allergen, risk_level)])
+
+def upsert_allergy_infos(rows):
+    """
+    여러 알레르기 정보를 한 번의 요청으로 추가하거나 변경하는 함수
+    rows: [(allergen, risk_level)] (위험 수준은 항상 표준 표기(RiskLevel)로 저장)
+    """
+    records = []
+    for allergen, risk_level in rows:
+        level = normalize_risk_level(risk_level)
+        if level is None:
+            raise ValueError(f"알 수 없는 위험 수준: {risk_level}")
+        records.append({'allergen': allergen, 'risk_level': level.value})
+    if not records:
+        return None
+
     with get_db_connection() as supabase:
         result = supabase.table('allergy_info')\
-            .upsert({'allergen': allergen, 'risk_level': risk_level})\
+            .upsert(records)\
             .execute()
+        get_allergen_snapshot().invalidate()
         return result
 
 def delete_allergy_info(allergen):
@@ -67,4 +291,38 @@ def delete_allergy_info(allergen):
             .delete()\
             .eq('allergen', allergen)\
             .execute()
-        return result
\ No newline at end of file
+        get_allergen_snapshot().invalidate()
+        return result
+
+def delete_allergy_infos(allergens):
+    """
+    여러 알레르기 정보를 한 번의 요청으로 삭제하는 함수
+    """
+    allergens = list(allergens)
+    if not allergens:
+        return None
+
+    with get_db_connection() as supabase:
+        result = supabase.table('allergy_info')\
+            .delete()\
+            .in_('allergen', allergens)\
+            .execute()
+        get_allergen_snapshot().invalidate()
+        return result
+
+def iter_allergy_info(page_size=1000):
+    """
+    allergy_info 테이블을 allergen 순으로 page_size행씩 나누어 읽으며 한 행씩 돌려주는 함수
+    """
+    start = 0
+    while True:
+        with get_db_connection() as supabase:
+            result = supabase.table('allergy_info')\
+                .select('allergen, risk_level')\
+                .order('allergen')\
+                .range(start, start + page_size - 1)\
+                .execute()
+        yield from result.data
+        if len(result.data) < page_size:
+            return
+        start += page_size
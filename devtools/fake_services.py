@@ -0,0 +1,594 @@
+# devtools/fake_services.py
+"""
+식품안전나라 C005, CertImgListServiceV3, Supabase allergy_info, Amazon Polly 대신 사용할 로컬 대역 서버
+녹화해 둔 응답 페이지나 생성한 가상 제품 데이터를 돌려주므로, 실제 서비스 없이 동기화와 조회를 확인할 수 있습니다.
+서비스별로 응답 지연과 오류(503 응답, 연결 끊김)를 주입할 수 있어 벤치마크(benchmarks/scan_latency.py)에도 사용합니다.
+
+사용법 (저장소 최상위 폴더에서):
+    # 실제 API에서 페이지 녹화
+    python -m devtools.fake_services record --source c005 --pages 3 --out recordings
+    python -m devtools.fake_services record --source certimg --pages 3 --out recordings
+
+    # 녹화된 페이지로 대역 서버 실행
+    python -m devtools.fake_services serve --recordings recordings --port 8900
+
+    # 가상 제품 1000개로 대역 서버 실행 (C005 80ms, Polly 150ms 지연, 성분 정보 API 5% 503 응답)
+    python -m devtools.fake_services serve --dataset 1000 --latency c005=80,certimg=120,polly=150 \
+        --error-rate certimg=0.05
+
+    # 대역 서버를 바라보도록 설정한 뒤 동기화 (serve가 출력하는 환경 변수를 사용)
+    FOODSAFETY_API_URL=http://127.0.0.1:8900/api \
+    CERTIMG_API_URL=http://127.0.0.1:8900/B553748/CertImgListServiceV3/getCertImgListServiceV3 \
+    python product_store.py sync
+
+녹화 파일 구성:
+    c005/{start}-{end}.json, c005/BAR_CD={barcode}.json
+    certimg/page-{pageNo}-{numOfRows}.json, certimg/report-{prdlstReportNo}.json
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+C005_EMPTY = {"C005": {"total_count": "0", "RESULT": {"CODE": "INFO-200", "MSG": "해당하는 데이터가 없습니다."}}}
+CERTIMG_EMPTY = {
+    "body": {"items": [], "totalCount": "0", "pageNo": "1", "numOfRows": "0"},
+    "header": {"resultCode": "OK", "resultMessage": "success"}
+}
+
+# 지연과 오류를 따로 설정할 수 있는 대역 서비스
+SERVICES = ("c005", "certimg", "supabase", "polly")
+
+# 가상 allergy_info 테이블 (allergen -> risk_level)
+FAKE_ALLERGY_INFO = {
+    "땅콩": "High Risk Group",
+    "호두": "High Risk Group",
+    "새우": "High Risk Group",
+    "게": "High Risk Group",
+    "메밀": "High risk group",  # 관리 화면이 예전에 저장하던 표기 (위험 수준 정규화 확인용)
+    "우유": "Risk Group",
+    "계란": "Risk Group",
+    "밀": "Risk Group",
+    "대두": "Risk Group",
+    "고등어": "Risk Group",
+    "조개류": "Risk Group",
+    "오징어": "Risk Group",
+    "복숭아": "Caution Group",
+    "토마토": "Caution Group",
+    "돼지고기": "Caution Group",
+    "쇠고기": "Caution Group",
+    "닭고기": "Caution Group",
+    "잣": "Caution Group",
+    "아황산류": "Caution Group",
+}
+
+# 가상 원재료 (원재료 표기, 해당 알레르기 성분)
+FAKE_INGREDIENTS = [
+    ("밀가루(밀:미국산)", "밀"), ("탈지분유(우유)", "우유"), ("대두유", "대두"), ("전란액(계란)", "계란"),
+    ("땅콩버터", "땅콩"), ("호두분태", "호두"), ("새우분말", "새우"), ("게살", "게"), ("메밀가루", "메밀"),
+    ("고등어", "고등어"), ("바지락추출물", "조개류"), ("오징어채", "오징어"), ("복숭아농축과즙", "복숭아"),
+    ("토마토페이스트", "토마토"), ("돈육", "돼지고기"), ("쇠고기농축액", "쇠고기"), ("닭고기", "닭고기"),
+    ("잣", "잣"), ("무수아황산", "아황산류"),
+]
+FAKE_PLAIN_INGREDIENTS = ["설탕", "정제소금", "물엿", "식물성유지", "옥수수전분", "합성향료", "정제수", "포도당"]
+
+
+def generate_dataset(count, seed=0):
+    """
+    가상 제품 count개의 C005 행, CertImgListServiceV3 항목, allergy_info 행을 만듭니다. (seed가 같으면 같은 데이터)
+    반환: {"products": {barcode: C005 행}, "details": {report_no: 성분 정보 항목}, "allergy_info": [행]}
+    """
+    rng = random.Random(seed)
+    products = {}
+    details = {}
+
+    for index in range(count):
+        barcode = f"88{index:011d}"
+        report_no = f"{20000000000000 + index}"
+        name = f"가상제품{index}"
+
+        ingredients = rng.sample(FAKE_INGREDIENTS, rng.randint(0, 4))
+        rawmtrl = ", ".join(
+            rng.sample(FAKE_PLAIN_INGREDIENTS, rng.randint(2, 5)) + [text for text, _ in ingredients]
+        )
+        allergens = [allergen for _, allergen in ingredients]
+        allergy = f"{', '.join(allergens)} 함유" if allergens and rng.random() < 0.85 else "알레르기 정보 없음"
+
+        total = rng.choice([30, 60, 120, 200, 500])
+        nutrient = (
+            f"총 내용량 {total}g 열량 {rng.randint(50, 600)}kcal 나트륨 {rng.randint(0, 2000):,}mg "
+            f"{rng.randint(0, 99)}% 탄수화물 {rng.randint(0, 90)}g {rng.randint(0, 30)}% "
+            f"당류 {rng.randint(0, 40)}g 지방 {rng.randint(0, 30)}g {rng.randint(0, 50)}% 트랜스지방 0g "
+            f"포화지방 {rng.randint(0, 15)}.{rng.randint(0, 9)}g {rng.randint(0, 90)}% "
+            f"콜레스테롤 {rng.randint(0, 60)}mg {rng.randint(0, 20)}% 단백질 {rng.randint(0, 25)}g {rng.randint(0, 45)}%"
+        )
+
+        products[barcode] = {"BAR_CD": barcode, "PRDLST_NM": name, "PRDLST_REPORT_NO": report_no}
+        details[report_no] = {
+            "prdlstReportNo": report_no,
+            "prdlstNm": name,
+            "barcode": "알수없음",
+            "nutrient": nutrient,
+            "allergy": allergy,
+            "rawmtrl": rawmtrl
+        }
+
+    allergy_info = [
+        {"id": index + 1, "allergen": allergen, "risk_level": risk_level, "updated_at": "2024-01-01T00:00:00+00:00"}
+        for index, (allergen, risk_level) in enumerate(FAKE_ALLERGY_INFO.items())
+    ]
+    return {"products": products, "details": details, "allergy_info": allergy_info}
+
+
+class ServiceFault:
+    """
+    대역 서비스 하나의 응답 지연과 오류 주입 설정 (지연은 초 단위)
+    요청마다 latency ± jitter만큼 기다린 뒤, error_rate 비율은 503으로 응답하고 drop_rate 비율은 응답 없이 연결을 끊습니다.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, drop_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def outcome(self):
+        """
+        이번 요청에 주입할 오류를 반환합니다. ("error", "drop" 또는 None)
+        """
+        roll = random.random()
+        if roll < self.error_rate:
+            return "error"
+        if roll < self.error_rate + self.drop_rate:
+            return "drop"
+        return None
+
+
+def parse_service_values(text, scale=1.0):
+    """
+    'c005=80,polly=150' 형식의 문자열을 {서비스: 값 * scale}로 변환합니다. 서비스 이름 없이 값만 쓰면 모든 서비스에 적용합니다.
+    """
+    values = {}
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            service, value = part.split("=", 1)
+            service = service.strip()
+            if service not in SERVICES:
+                raise ValueError(f"알 수 없는 서비스: {service} (사용 가능: {', '.join(SERVICES)})")
+            values[service] = float(value) * scale
+        else:
+            values.update(dict.fromkeys(SERVICES, float(part) * scale))
+    return values
+
+
+def build_faults(latency_ms="", jitter_ms="", error_rate="", drop_rate=""):
+    """
+    서비스별 설정 문자열(지연은 밀리초)로 {서비스: ServiceFault}를 만듭니다.
+    """
+    latency = parse_service_values(latency_ms, 0.001)
+    jitter = parse_service_values(jitter_ms, 0.001)
+    errors = parse_service_values(error_rate)
+    drops = parse_service_values(drop_rate)
+    return {
+        service: ServiceFault(latency.get(service, 0.0), jitter.get(service, 0.0),
+                              errors.get(service, 0.0), drops.get(service, 0.0))
+        for service in SERVICES
+    }
+
+
+def service_name(method, path):
+    """
+    요청이 어느 대역 서비스로 가는지 반환합니다. 처리할 수 없는 요청이면 None
+    """
+    parts = [part for part in path.split("/") if part]
+    if method == "POST" and parts == ["v1", "speech"]:
+        return "polly"
+    if parts[:2] == ["rest", "v1"]:
+        return "supabase"
+    if method != "GET":
+        return None
+    if "C005" in parts:
+        return "c005"
+    if parts and parts[-1] == "getCertImgListServiceV3":
+        return "certimg"
+    return None
+
+
+def recording_name(path, query):
+    """
+    요청 경로와 쿼리로 녹화 파일 이름을 정합니다. 처리할 수 없는 요청이면 None
+    """
+    parts = [part for part in path.split("/") if part]
+    if "C005" in parts:
+        rest = parts[parts.index("C005") + 1:]  # json/{start}/{end}[/BAR_CD=...]
+        if len(rest) >= 3:
+            if len(rest) >= 4:
+                return f"c005/{rest[3]}.json"
+            return f"c005/{rest[1]}-{rest[2]}.json"
+        return None
+    if parts and parts[-1] == "getCertImgListServiceV3":
+        report_no = query.get("prdlstReportNo", [None])[0]
+        if report_no:
+            return f"certimg/report-{report_no}.json"
+        page_no = query.get("pageNo", ["1"])[0]
+        num_of_rows = query.get("numOfRows", ["10"])[0]
+        return f"certimg/page-{page_no}-{num_of_rows}.json"
+    return None
+
+
+def dataset_response(dataset, path, query):
+    """
+    생성한 가상 데이터로 C005/CertImgListServiceV3 응답을 만듭니다. 처리할 수 없는 요청이면 None
+    """
+    parts = [part for part in path.split("/") if part]
+    if "C005" in parts:
+        rest = parts[parts.index("C005") + 1:]
+        if len(rest) < 3:
+            return None
+        if len(rest) >= 4 and rest[3].startswith("BAR_CD="):
+            row = dataset["products"].get(rest[3][len("BAR_CD="):])
+            rows = [row] if row else []
+            total = len(rows)
+        else:
+            start, end = int(rest[1]), int(rest[2])
+            all_rows = list(dataset["products"].values())
+            rows = all_rows[start - 1:end]
+            total = len(all_rows)
+        if not rows:
+            return C005_EMPTY
+        return {"C005": {"total_count": str(total), "row": rows, "RESULT": {"CODE": "INFO-000", "MSG": "정상처리되었습니다."}}}
+
+    if parts and parts[-1] == "getCertImgListServiceV3":
+        report_no = query.get("prdlstReportNo", [None])[0]
+        page_no = int(query.get("pageNo", ["1"])[0])
+        num_of_rows = int(query.get("numOfRows", ["10"])[0])
+        if report_no:
+            item = dataset["details"].get(report_no)
+            items = [item] if item else []
+            total = len(items)
+        else:
+            all_items = list(dataset["details"].values())
+            items = all_items[(page_no - 1) * num_of_rows:page_no * num_of_rows]
+            total = len(all_items)
+        return {
+            "body": {
+                "items": [{"item": item} for item in items],
+                "totalCount": str(total),
+                "pageNo": str(page_no),
+                "numOfRows": str(num_of_rows)
+            },
+            "header": {"resultCode": "OK", "resultMessage": "success"}
+        }
+    return None
+
+
+def postgrest_filter(rows, query):
+    """
+    PostgREST eq/in 필터에 맞는 행을 반환합니다. 없는 컬럼이면 KeyError
+    """
+    columns = set(rows[0]) if rows else {"allergen", "risk_level"}
+    selected = rows
+
+    for column, values in query.items():
+        if column in ("select", "order", "limit", "offset", "on_conflict"):
+            continue
+        if column not in columns:
+            raise KeyError(column)
+        operator, _, operand = values[0].partition(".")
+        if operator == "eq":
+            selected = [row for row in selected if str(row[column]) == operand]
+        elif operator == "in":
+            options = {option.strip().strip('"') for option in operand.strip("()").split(",")}
+            selected = [row for row in selected if str(row[column]) in options]
+    return selected
+
+
+def postgrest_select(rows, query):
+    """
+    PostgREST 조회(select, eq/in 필터, order, limit, offset)를 흉내 냅니다.
+    반환: (선택된 행, 필터 후 전체 행 수). 없는 컬럼이면 KeyError
+    """
+    columns = set(rows[0]) if rows else set()
+    selected = postgrest_filter(rows, query)
+
+    if "order" in query:
+        column, _, direction = query["order"][0].partition(".")
+        if column not in columns:
+            raise KeyError(column)
+        selected = sorted(selected, key=lambda row: row[column], reverse=direction.startswith("desc"))
+
+    total = len(selected)
+    offset = int(query.get("offset", ["0"])[0])
+    limit = query.get("limit", [None])[0]
+    selected = selected[offset:offset + int(limit) if limit is not None else None]
+
+    select = query.get("select", ["*"])[0]
+    if select.strip() != "*":
+        names = [name.strip() for name in select.split(",") if name.strip()]
+        missing = [name for name in names if name not in columns]
+        if missing:
+            raise KeyError(missing[0])
+        selected = [{name: row[name] for name in names} for row in selected]
+    return selected, total
+
+
+def fake_speech(text):
+    # 실제 Polly MP3(24kbps, 초당 약 5글자)와 비슷한 크기의 MP3 프레임 헤더로 채운 데이터
+    return (b"\xff\xf3\x44\xc4" + bytes(140)) * max(1, len(text) * 4)
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    # server.dataset 또는 server.recordings_dir의 응답을 server.faults의 지연/오류를 주입하여 돌려줌
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_body(status, body, "application/json; charset=utf-8", headers)
+
+    def inject_fault(self, service):
+        """
+        설정된 지연만큼 기다리고 오류를 주입합니다. 요청을 계속 처리해야 하면 True
+        """
+        fault = self.server.faults.get(service)
+        if fault is None:
+            return True
+        time.sleep(fault.delay())
+        outcome = fault.outcome()
+        if outcome == "error":
+            self.send_json(503, {"error": "injected failure"})
+            return False
+        if outcome == "drop":
+            self.close_connection = True
+            return False
+        return True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        service = service_name("GET", parsed.path)
+        if service is None:
+            self.send_json(404, {"error": "unknown endpoint"})
+            return
+        if not self.inject_fault(service):
+            return
+
+        if service == "supabase":
+            self.send_postgrest(parsed.path, query)
+            return
+
+        if self.server.dataset is not None:
+            payload = dataset_response(self.server.dataset, parsed.path, query)
+            if payload is not None:
+                self.send_json(200, payload)
+                return
+
+        name = recording_name(parsed.path, query)
+        if name is None:
+            self.send_json(404, {"error": "unknown endpoint"})
+            return
+
+        path = os.path.join(self.server.recordings_dir, name) if self.server.recordings_dir else None
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.send_json(200, json.load(file))
+        else:
+            # 녹화되지 않은 요청은 실제 API의 '데이터 없음' 응답과 같은 형식으로 응답
+            self.send_json(200, C005_EMPTY if name.startswith("c005/") else CERTIMG_EMPTY)
+
+    def send_postgrest(self, path, query):
+        table_rows = self.postgrest_table(path)
+        if table_rows is None:
+            return
+        try:
+            with self.server.write_lock:
+                rows, total = postgrest_select(table_rows, query)
+        except KeyError as e:
+            self.send_json(400, {"code": "42703", "message": f"column allergy_info.{e.args[0]} does not exist"})
+            return
+
+        headers = {}
+        if "count=exact" in (self.headers.get("Prefer") or ""):
+            offset = int(query.get("offset", ["0"])[0])
+            headers["Content-Range"] = f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}"
+        self.send_json(200, rows, headers)
+
+    def postgrest_table(self, path):
+        # 요청 대상 allergy_info 행 목록 (다른 테이블이면 404 응답 후 None)
+        table = path.rstrip("/").split("/")[-1]
+        if self.server.dataset is None or table != "allergy_info":
+            self.send_json(404, {"code": "42P01", "message": f'relation "public.{table}" does not exist'})
+            return None
+        return self.server.dataset["allergy_info"]
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        service = service_name("POST", parsed.path)
+        if service is None:
+            self.send_json(404, {"error": "unknown endpoint"})
+            return
+        if not self.inject_fault(service):
+            return
+
+        if service == "supabase":
+            # upsert: allergen이 같은 행은 바꾸고 없으면 추가
+            rows = self.postgrest_table(parsed.path)
+            if rows is None:
+                return
+            payload = json.loads(body or b"[]")
+            records = payload if isinstance(payload, list) else [payload]
+            with self.server.write_lock:
+                by_allergen = {row["allergen"]: row for row in rows}
+                for record in records:
+                    row = by_allergen.get(record["allergen"])
+                    if row is None:
+                        row = {"id": max((row["id"] for row in rows), default=0) + 1, "allergen": record["allergen"]}
+                        rows.append(row)
+                        by_allergen[row["allergen"]] = row
+                    row.update(record)
+                    row["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+            self.send_json(201, records)
+            return
+
+        text = json.loads(body or b"{}").get("Text", "")
+        self.send_body(200, fake_speech(text), "audio/mpeg", {"x-amzn-RequestCharacters": str(len(text))})
+
+    def do_DELETE(self):
+        parsed = urlparse(self.path)
+        if service_name("DELETE", parsed.path) != "supabase":
+            self.send_json(404, {"error": "unknown endpoint"})
+            return
+        if not self.inject_fault("supabase"):
+            return
+        rows = self.postgrest_table(parsed.path)
+        if rows is None:
+            return
+        with self.server.write_lock:
+            try:
+                deleted = postgrest_filter(rows, parse_qs(parsed.query))
+            except KeyError as e:
+                self.send_json(400, {"code": "42703", "message": f"column allergy_info.{e.args[0]} does not exist"})
+                return
+            deleted_ids = {row["id"] for row in deleted}
+            rows[:] = [row for row in rows if row["id"] not in deleted_ids]
+        self.send_json(200, deleted)
+
+
+def start_server(recordings_dir=None, host="127.0.0.1", port=0, verbose=False, dataset=None, faults=None):
+    """
+    백그라운드 스레드에서 대역 서버를 시작하고 서버 객체를 반환합니다. (port=0이면 빈 포트 사용)
+    기본 주소는 f"http://{host}:{server.server_port}" 입니다.
+    dataset(generate_dataset의 반환값)이 있으면 녹화 파일보다 먼저 사용하고,
+    faults({서비스: ServiceFault})는 실행 중에도 바꿀 수 있습니다.
+    """
+    server = ThreadingHTTPServer((host, port), FakeServiceHandler)
+    server.daemon_threads = True
+    server.recordings_dir = recordings_dir
+    server.verbose = verbose
+    server.dataset = dataset
+    server.faults = faults if faults is not None else {}
+    server.write_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def service_environment(server):
+    """
+    각 모듈이 대역 서버를 바라보도록 하는 환경 변수를 반환합니다.
+    """
+    base_url = f"http://{server.server_address[0]}:{server.server_port}"
+    return {
+        "FOODSAFETY_API_URL": f"{base_url}/api",
+        "CERTIMG_API_URL": f"{base_url}/B553748/CertImgListServiceV3/getCertImgListServiceV3",
+        "SUPABASE_URL": base_url,
+        "POLLY_ENDPOINT_URL": base_url,
+    }
+
+
+def record_pages(source, pages, out_dir):
+    """
+    실제 API에서 처음 pages개 페이지를 받아 녹화 파일로 저장합니다.
+    """
+    import http_client
+    from dotenv import load_dotenv
+    from product_store import (
+        FOODSAFETY_API_URL, CERTIMG_API_URL, C005_PAGE_SIZE, CERTIMG_PAGE_SIZE
+    )
+
+    load_dotenv()
+    os.makedirs(os.path.join(out_dir, source), exist_ok=True)
+
+    for page in range(pages):
+        if source == "c005":
+            start = page * C005_PAGE_SIZE + 1
+            end = start + C005_PAGE_SIZE - 1
+            url = f"{FOODSAFETY_API_URL}/{os.getenv('API_KEY_NAME')}/C005/json/{start}/{end}"
+            response = http_client.get(url)
+            name = f"c005/{start}-{end}.json"
+        else:
+            params = {
+                'ServiceKey': os.getenv('API_KEY_DETAIL'),
+                'returnType': 'json',
+                'pageNo': str(page + 1),
+                'numOfRows': str(CERTIMG_PAGE_SIZE)
+            }
+            response = http_client.get(CERTIMG_API_URL, params=params)
+            name = f"certimg/page-{page + 1}-{CERTIMG_PAGE_SIZE}.json"
+
+        response.raise_for_status()
+        with open(os.path.join(out_dir, name), "w", encoding="utf-8") as file:
+            json.dump(response.json(), file, ensure_ascii=False)
+        print(f"녹화: {name}")
+
+
+def add_fault_arguments(parser):
+    # serve와 벤치마크가 함께 사용하는 지연/오류 주입 옵션
+    services = ",".join(SERVICES)
+    parser.add_argument("--latency", default="", help=f"서비스별 응답 지연(ms), 예: c005=80,polly=150 ({services})")
+    parser.add_argument("--jitter", default="", help="서비스별 지연 편차(ms), 예: 20 (모든 서비스)")
+    parser.add_argument("--error-rate", default="", help="서비스별 503 응답 비율, 예: certimg=0.05")
+    parser.add_argument("--drop-rate", default="", help="서비스별 연결 끊김 비율, 예: c005=0.01")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="식품 API 로컬 대역 서버")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="녹화된 페이지 또는 가상 데이터로 대역 서버 실행")
+    serve_parser.add_argument("--recordings", default="recordings")
+    serve_parser.add_argument("--dataset", type=int, default=0, help="생성할 가상 제품 수 (0이면 녹화 파일만 사용)")
+    serve_parser.add_argument("--seed", type=int, default=0)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8900)
+    serve_parser.add_argument("--verbose", action="store_true")
+    add_fault_arguments(serve_parser)
+
+    record_parser = subparsers.add_parser("record", help="실제 API 응답 페이지 녹화")
+    record_parser.add_argument("--source", choices=["c005", "certimg"], required=True)
+    record_parser.add_argument("--pages", type=int, default=1)
+    record_parser.add_argument("--out", default="recordings")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_pages(args.source, args.pages, args.out)
+        return
+
+    dataset = generate_dataset(args.dataset, args.seed) if args.dataset else None
+    faults = build_faults(args.latency, args.jitter, args.error_rate, args.drop_rate)
+    server = start_server(args.recordings, args.host, args.port, args.verbose, dataset, faults)
+    print(f"대역 서버 실행 중: http://{args.host}:{server.server_port}")
+    for name, value in service_environment(server).items():
+        print(f"{name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
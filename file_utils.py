@@ -0,0 +1,19 @@
+# file_utils.py
+import os
+import tempfile
+
+
+def atomic_write(path, data):
+    """
+    임시 파일에 쓴 뒤 교체하여, 중간에 중단되어도 깨진 파일이 남지 않도록 합니다.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,231 @@
+# http_client.py
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+import metrics
+
+# 환경 변수 로드
+load_dotenv()
+
+# 연결/응답 대기 시간을 따로 설정 (초)
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+
+# 재시도 설정
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.3))
+BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 5))
+
+# 호스트별 커넥션 풀 크기
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 4))
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 16))
+
+# 서킷 브레이커 설정: 연속 실패 횟수, 차단 후 시험 요청까지 기다리는 시간 (초)
+BREAKER_FAILURES = int(os.getenv('HTTP_BREAKER_FAILURES', 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv('HTTP_BREAKER_RESET_TIMEOUT', 30))
+
+# 서킷 브레이커 상태
+CLOSED = "closed"  # 정상: 모든 요청을 보냄
+OPEN = "open"  # 차단: 요청을 보내지 않고 바로 실패
+HALF_OPEN = "half_open"  # 시험: 요청 하나만 보내 복구 여부 확인
+
+_session = None
+_session_lock = threading.Lock()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+# 엔드포인트별 요청 제한 (batch_scan.py 등에서 등록, call(func, *args)를 가진 객체)
+_limiters = {}
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    서킷 브레이커가 열려 있어 요청을 보내지 않은 경우
+    """
+
+
+class CircuitBreaker:
+    """
+    엔드포인트 하나의 서킷 브레이커
+    요청이 연속으로 failure_threshold번 실패하면 열려서 reset_timeout 동안 요청을 바로 실패시키고,
+    그 뒤에는 시험 요청 하나만 보내 성공하면 닫고 실패하면 다시 엽니다.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        요청을 보내도 되는지 반환합니다. 열린 상태에서 reset_timeout이 지나면 시험 요청 하나를 허용합니다.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+        metrics.increment("circuit_breaker_rejections", endpoint=self.name)
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def _transition(self, state):
+        # self._lock을 잡은 상태에서 호출됨
+        self.state = state
+        metrics.increment("circuit_breaker_transitions", endpoint=self.name, state=state)
+        if state == OPEN:
+            print(f"[{self.name}] 연속 {self.failures}회 실패로 요청을 {self.reset_timeout:g}초 동안 차단합니다.")
+        elif state == HALF_OPEN:
+            print(f"[{self.name}] 시험 요청으로 복구 여부를 확인합니다.")
+        else:
+            print(f"[{self.name}] 복구되어 요청 차단을 해제합니다.")
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+def get_breaker(endpoint):
+    """
+    엔드포인트별 서킷 브레이커를 반환합니다. (프로세스 전체에서 공유)
+    """
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(endpoint)
+            if breaker is None:
+                breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+    return breaker
+
+
+def breaker_states():
+    """
+    {엔드포인트: {"state", "failures"}} 형태로 모든 서킷 브레이커 상태를 반환합니다.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def set_rate_limiter(endpoint, limiter):
+    """
+    엔드포인트로 실제 요청을 보낼 때만 limiter.call()을 거치게 합니다. (캐시/로컬 저장소 조회는 제한하지 않음)
+    재시도도 요청마다 limiter.call()을 거치며, 재시도 전 대기 시간에는 limiter를 잡고 있지 않습니다.
+    limiter가 None이면 제한을 해제합니다.
+    """
+    if limiter is None:
+        _limiters.pop(endpoint, None)
+    else:
+        _limiters[endpoint] = limiter
+
+
+def get_session():
+    """
+    프로세스 전체에서 공유하는 requests.Session을 반환합니다.
+    HTTPAdapter가 호스트별로 커넥션 풀을 유지하므로 keep-alive 연결이 재사용됩니다.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # requests는 첫 요청 때 불러옴 (프로그램 시작 시간 단축)
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                _session = session
+    return _session
+
+
+def _backoff_delay(attempt):
+    # 지수 백오프에 full jitter 적용
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def get(url, params=None, timeout=None, retries=MAX_RETRIES, endpoint=None):
+    """
+    공유 세션으로 GET 요청을 보냅니다.
+    5xx 응답과 타임아웃/연결 오류는 지수 백오프로 재시도합니다.
+    재시도 후에도 5xx이면 마지막 응답을 반환하고, 예외가 계속되면 마지막 예외를 그대로 던집니다.
+    endpoint(기본값은 호스트)별 서킷 브레이커가 열려 있으면 요청 없이 CircuitOpenError를 던집니다.
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    host = urlparse(url).netloc
+    breaker = get_breaker(endpoint or host)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} 요청이 일시적으로 차단되었습니다.")
+
+    limiter = _limiters.get(endpoint or host)
+    try:
+        response = _get_with_retries(url, params, timeout, retries, host, limiter)
+    except Exception:
+        breaker.record_failure()
+        raise
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def _send(session, url, params, timeout):
+    return session.get(url, params=params, timeout=timeout)
+
+
+def _get_with_retries(url, params, timeout, retries, host, limiter=None):
+    import requests
+
+    session = get_session()
+    for attempt in range(retries + 1):
+        try:
+            # 요청 제한은 재시도를 포함한 실제 요청 하나마다 적용
+            if limiter is not None:
+                response = limiter.call(_send, session, url, params, timeout)
+            else:
+                response = _send(session, url, params, timeout)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            reason = "timeout" if isinstance(e, requests.Timeout) else "connection"
+            if reason == "timeout":
+                metrics.increment("http_timeouts", host=host)
+            if attempt >= retries:
+                raise
+        else:
+            if response.status_code < 500 or attempt >= retries:
+                return response
+            response.close()
+            reason = f"http_{response.status_code}"
+        metrics.increment("http_retries", host=host, reason=reason)
+        time.sleep(_backoff_delay(attempt))
@@ -1,114 +1,153 @@
 # main4.py
-from product_info import get_product_info_by_barcode, get_nutrition_info_by_report_no
+from scanner import scan_barcode, warm_up, SCAN_PRODUCT_NOT_FOUND, SCAN_NUTRITION_NOT_FOUND
+from nutrient_parser import format_nutrient
 import os
 from dotenv import load_dotenv
-import re
-from db_utils import get_allergens_risk_levels
-import sys
-from ttsAdvanced import speak_allergen_info, speak_product_info
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from audio_player import AudioPlayer
+import metrics
+from risk_levels import RiskLevel, normalize_risk_level
+from allergen_profiles import AllergenProfile
+from scan_log import record_scan, prewarm, start_prewarm, PREWARM_TOP
+
+
+def get_allergy_comment(allergen, risk_level):
+    risk_level = normalize_risk_level(risk_level)
+    if risk_level == RiskLevel.HIGH_RISK:
+        return f" - {allergen}: 주의! 고위험 알레르기 성분이 포함되어 있습니다."
+    elif risk_level == RiskLevel.RISK:
+        return f" - {allergen}: 주의! 위험 알레르기 성분이 포함되어 있습니다."
+    elif risk_level == RiskLevel.CAUTION:
+        return f" - {allergen}: 주의! 주의가 필요한 알레르기 성분이 포함되어 있습니다."
+    else:
+        return f" - {allergen}: 알 수 없는 위험 수준."
 
 
 def main():
+    parser = argparse.ArgumentParser(description="바코드 알레르기 안내")
+    parser.add_argument("--warmup", action="store_true", help="음성 캐시와 자주 스캔되는 제품의 캐시만 미리 준비하고 종료")
+    parser.add_argument("--profile", help="고객 알레르기 프로필 (쉼표로 구분, 예: 땅콩,우유)")
+    args = parser.parse_args()
+
     # 환경 변수 로드
     load_dotenv()
-    
+
+    # METRICS_PORT가 지정되어 있으면 /metrics 엔드포인트 시작
+    metrics.serve_from_env()
+
     api_key_name = os.getenv('API_KEY_NAME')  # 식품안전나라 API 키
     api_key_detail = os.getenv('API_KEY_DETAIL')  # 성분 정보 API 키
-    
-    while True:
-        # 바코드 입력 받기
-        barcode = input("바코드를 입력하세요: ").strip()
-        
-        # 바코드 검증 (숫자만 허용)
-        if not barcode.isdigit():
-            print("유효한 바코드를 입력해주세요. (숫자만 허용)")
-            sys.exit(1)
-        
-
-
-
-        # 1. 바코드를 통해 제품 정보 가져오기
-        product_info = get_product_info_by_barcode(barcode, api_key_name)
-
-        if product_info is None: # 1. 예외처리 : 바코드 정보를 찾지 못한 경우
-            print("제품 정보를 찾을 수 없습니다. 바코드를 다시 확인해주세요.")
-            sys.exit(1)
-
-        # 제품 정보에서 (이름 & 제품 번호) 추출
-        product_name = product_info.get("PRDLST_NM", "이름 정보 없음")
-        report_no = product_info.get("PRDLST_REPORT_NO", "번호 없음")
-
-        # 콘솔에 제품 이름 및 번호 출력
-        print("1. 제품 이름:", product_name)
-        print("2. 제품 번호:", report_no)
-        
-
-
-        # 2. 제품 번호를 이용하여 (알러지 & 영양 정보) 가져오기
-        detail_info = get_nutrition_info_by_report_no(report_no, api_key_detail)
-
-        if detail_info is None: # 2. 예외처리 : 바코드를 통해 영양 정보를 찾을 수 없음.
-            print("영양 성분 정보를 찾을 수 없습니다.")
-            sys.exit(1)
-
-        nutrient = detail_info.get("nutrient", {})
-        allergy_info = detail_info.get("allergy", "알레르기 정보 없음")
-        
-        # 3. 영양 정보 출력
-        print("\n3. 영양 정보:")
-        print(f"   - 열량: {nutrient.get('energy_kcal', '정보 없음')}")
-        print(f"   - 탄수화물: {nutrient.get('carbohydrates', '정보 없음')}")
-        print(f"   - 단백질: {nutrient.get('proteins', '정보 없음')}")
-        print(f"   - 지방: {nutrient.get('fat', '정보 없음')}")
-        print(f"   - 나트륨, {nutrient.get('sodium', '정보 없음')}")
-        print(f"   - 포화지방, {nutrient.get('saturated_fat', '정보 없음')}")
-
-        # 제품명, 영양 정보 출력
-        speak_product_info(barcode, product_name, nutrient) 
-
-
-        if allergy_info == "알레르기 정보 없음":
-            print("\n4. 알레르기 정보: 알레르기 정보가 없습니다.")
-            sys.exit(1)
-
-        # 알러지 정보가 문자열로 제공된다고 가정하고, 쉼표 또는 세미콜론으로 분리
-        allergens = re.split(r'[;,]+', allergy_info)
-        allergens = [allergen.strip() for allergen in allergens if allergen.strip()]
-
-        if allergens:
-            # 데이터베이스에 등록된 알레르기 성분과 비교
-            risk_levels = get_allergens_risk_levels(allergens)
-            
-            # 등록된 알레르기 성분만 필터링
-            registered_allergens = {allergen: risk_levels[allergen] for allergen in allergens if allergen in risk_levels}
-            
-            if registered_allergens:
+
+    # 음성 캐시와 자주 스캔되는 제품의 캐시만 준비하고 종료
+    if args.warmup:
+        warm_up()
+        prewarm(api_key_name, api_key_detail)
+        return
+
+    # 고객 프로필은 어휘(등록된 알레르기 성분)를 DB에서 불러와야 하므로 첫 입력을 기다리는 동안 만들고,
+    # 그 전에 스캔하면 첫 스캔에서만 완성될 때까지 기다림
+    profile_future = Future() if args.profile else None
+
+    def build_profile():
+        try:
+            profile = AllergenProfile.from_string(args.profile)
+        except Exception as e:
+            print(f"고객 알레르기 프로필을 만들지 못했습니다: {e}")
+            profile = None
+        if profile is not None and profile.unknown:
+            print(f"알 수 없는 알레르기 성분은 제외합니다: {', '.join(profile.unknown)}")
+        profile_future.set_result(profile)
+
+    # 첫 입력을 기다리는 동안 SDK 불러오기, 연결 준비, 알레르기 성분/위험도 메시지 음성 합성을 백그라운드에서 진행하고,
+    # 이어서 자주 스캔되는 제품의 정보와 안내 음성을 미리 준비 (첫 스캔이 먼저 들어와도 같은 객체를 함께 사용하므로 안전함)
+    def prepare():
+        if profile_future is not None:
+            build_profile()
+        warm_up(tts=os.getenv('TTS_WARMUP', '1') != '0')
+        if PREWARM_TOP > 0:
+            start_prewarm(api_key_name, api_key_detail)
+
+    threading.Thread(target=prepare, daemon=True).start()
+
+    # 네트워크/DB 조회와 음성 합성은 작업 풀에서, 재생은 우선순위 큐를 가진 전용 재생 스레드에서 처리
+    executor = ThreadPoolExecutor(max_workers=4)
+    player = AudioPlayer()
+
+    try:
+        while True:
+            # 바코드 입력 받기 (이전 제품 안내가 재생되는 동안에도 입력 가능)
+            barcode = input("바코드를 입력하세요: ").strip()
+
+            # 바코드 검증 (숫자만 허용)
+            if not barcode.isdigit():
+                print("유효한 바코드를 입력해주세요. (숫자만 허용)")
+                continue
+
+
+
+
+            # 제품/성분 정보를 조회하고, 알레르기 성분 검사와 안내 음성 준비를 작업 풀에서 시작
+            # (준비되는 음성은 위험도 순으로 재생 대기열에 추가됨)
+            profile = profile_future.result() if profile_future is not None else None
+            result = scan_barcode(barcode, api_key_name, api_key_detail, executor, player, profile=profile)
+            # 바코드, 단계별 소요 시간, 캐시 적중 여부 기록 (다음 시작 때 자주 스캔되는 제품을 미리 준비하는 데 사용)
+            record_scan(result)
+
+            if result.error == SCAN_PRODUCT_NOT_FOUND: # 1. 예외처리 : 바코드 정보를 찾지 못한 경우
+                print("제품 정보를 찾을 수 없습니다. 바코드를 다시 확인해주세요.")
+                continue
+
+            # 콘솔에 제품 이름 및 번호 출력
+            print("1. 제품 이름:", result.product_name)
+            print("2. 제품 번호:", result.report_no)
+
+            if result.error == SCAN_NUTRITION_NOT_FOUND: # 2. 예외처리 : 바코드를 통해 영양 정보를 찾을 수 없음.
+                print("영양 성분 정보를 찾을 수 없습니다.")
+                continue
+
+            nutrient = result.nutrient
+
+            # 3. 영양 정보 출력
+            print("\n3. 영양 정보:")
+            print(f"   - 열량: {format_nutrient('energy_kcal', nutrient.get('energy_kcal'))}")
+            print(f"   - 탄수화물: {format_nutrient('carbohydrates', nutrient.get('carbohydrates'))}")
+            print(f"   - 당류: {format_nutrient('sugars', nutrient.get('sugars'))}")
+            print(f"   - 단백질: {format_nutrient('proteins', nutrient.get('proteins'))}")
+            print(f"   - 지방: {format_nutrient('fat', nutrient.get('fat'))}")
+            print(f"   - 포화지방: {format_nutrient('saturated_fat', nutrient.get('saturated_fat'))}")
+            print(f"   - 트랜스지방: {format_nutrient('trans_fat', nutrient.get('trans_fat'))}")
+            print(f"   - 콜레스테롤: {format_nutrient('cholesterol', nutrient.get('cholesterol'))}")
+            print(f"   - 나트륨: {format_nutrient('sodium', nutrient.get('sodium'))}")
+            print(f"   - 칼슘: {format_nutrient('calcium', nutrient.get('calcium'))}")
+
+
+            if result.profile_conflicts:
+                print(f"\n[고객 알레르기 프로필] 주의! 포함된 성분: {', '.join(result.profile_conflicts)}")
+            elif result.profile_conflicts is not None:
+                print("\n[고객 알레르기 프로필] 프로필의 알레르기 성분이 없습니다.")
+
+            if not result.has_allergy_info:
+                print("\n4. 알레르기 정보: 알레르기 정보가 없습니다.")
+                continue
+
+            if result.allergen_error is not None:
+                print(f"알레르기 위험도 조회 중 오류 발생: {result.allergen_error}")
+                continue
+
+            if result.allergens:
                 print("\n4. 알레르기 정보:")
-                allergy_comments = []
-                for allergen, risk_level in registered_allergens.items():
-                    if risk_level == "High Risk Group":
-                        comment = f" - {allergen}: 주의! 고위험 알레르기 성분이 포함되어 있습니다."
-                        allergy_comments.append(comment)
-                    elif risk_level == "Risk Group":
-                        comment = f" - {allergen}: 주의! 위험 알레르기 성분이 포함되어 있습니다."
-                        allergy_comments.append(comment)
-                    elif risk_level == "Caution Group":
-                        comment = f" - {allergen}: 주의! 주의가 필요한 알레르기 성분이 포함되어 있습니다."
-                        allergy_comments.append(comment)
-                    else:
-                        comment = f" - {allergen}: 알 수 없는 위험 수준."
-                        allergy_comments.append(comment)
-
-                    for comment in allergy_comments:
-                        print(comment)
-
-                    speak_allergen_info(allergen, risk_level)
-                
+                for allergen, risk_level in result.allergens.items():
+                    print(get_allergy_comment(allergen, risk_level))
+
             else:
                 print("\n4. 알레르기 정보: 데이터베이스에 등록된 알레르기 성분이 없습니다.")
-        else:
-            print("\n4. 알레르기 정보: 알레르기 성분 정보가 없습니다.")
+    finally:
+        # 대기 중인 안내 음성을 모두 재생한 뒤 종료
+        executor.shutdown(wait=True)
+        player.close(wait=True)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
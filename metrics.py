@@ -0,0 +1,273 @@
+# metrics.py
+"""
+스캔 단계별 소요 시간(span)과 카운터를 모으는 가벼운 계측 모듈
+
+span 이름:
+    barcode_api, nutrition_api (API 요청), nutrient_parse (영양성분 파싱),
+    allergen_lookup (알레르기 성분 검사), allergen_db_refresh (allergy_info 테이블 조회),
+    tts_synthesis (Polly 합성 요청), playback (음성 재생), scan_request (scan_service.py 요청, lane별),
+    announcement_compose (알레르기 경고 안내 준비, source=segments|ssml), scan_prewarm (자주 스캔되는 제품 캐시 미리 채우기)
+카운터 이름:
+    cache_hits, cache_misses, cache_stale_hits (cache=product|tts), cache_negative_hits (NOT_FOUND 적중, cache=product),
+    http_retries, http_timeouts (host별),
+    circuit_breaker_transitions (endpoint, state=open|half_open|closed), circuit_breaker_rejections (endpoint별),
+    singleflight_shared (다른 요청의 진행 중인 조회/합성 결과를 함께 받은 횟수, flight=barcode|report_no|tts|announcement),
+    scan_prewarmed (미리 준비한 바코드 수)
+
+내보내기 (환경 변수):
+    METRICS_FILE=metrics.jsonl  -> span/카운터 이벤트를 한 줄씩 JSON Lines로 기록
+    METRICS_PORT=9464           -> http://127.0.0.1:9464/metrics 에서 Prometheus 텍스트 형식으로 제공 (serve_from_env)
+    SCAN_DEBUG=1                -> API 응답 원본, 음성 캐시 사용 여부 등 디버그 출력
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+# 환경 변수 로드
+load_dotenv()
+
+METRICS_FILE = os.getenv('METRICS_FILE') or None
+METRICS_PORT = os.getenv('METRICS_PORT') or None
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+DEBUG = os.getenv('SCAN_DEBUG', '0') not in ('', '0', 'false', 'False')
+
+# 소요 시간 히스토그램 구간 (초)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus 지표 이름 앞에 붙이는 접두사
+PREFIX = "scan_"
+
+
+def debug(*args):
+    """
+    SCAN_DEBUG가 켜진 경우에만 출력합니다. (출력할 값을 만드는 비용이 크면 호출 전에 DEBUG를 확인)
+    """
+    if DEBUG:
+        print(*args)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """
+    span 소요 시간 히스토그램과 카운터를 메모리에 모으고, path가 있으면 이벤트마다 JSON Lines로 기록합니다.
+    """
+
+    def __init__(self, path=METRICS_FILE, buckets=BUCKETS):
+        self.path = path
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}  # (이름, 라벨) -> 누적 값
+        self._spans = {}  # (이름, 라벨) -> {"buckets", "count", "sum", "errors"}
+        self._file = None
+
+    def increment(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            total = self._counters.get(key, 0) + value
+            self._counters[key] = total
+            self._write({"type": "counter", "name": name, "labels": labels, "value": total})
+
+    def observe(self, name, seconds, error=False, **labels):
+        """
+        span 하나의 소요 시간(초)을 기록합니다.
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            stats = self._spans.get(key)
+            if stats is None:
+                stats = self._spans[key] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0, "errors": 0}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats["buckets"][index] += 1
+            stats["count"] += 1
+            stats["sum"] += seconds
+            if error:
+                stats["errors"] += 1
+            self._write({
+                "type": "span", "name": name, "labels": labels,
+                "duration_ms": round(seconds * 1000, 3), "error": error
+            })
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        with 블록의 소요 시간을 기록합니다. 블록에서 예외가 나면 오류로 함께 기록합니다.
+        """
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error, **labels)
+
+    def _write(self, event):
+        # self._lock을 잡은 상태에서 호출됨
+        if not self.path:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        event["ts"] = time.time()
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def snapshot(self):
+        """
+        현재까지 모은 값을 반환합니다. {"counters": [...], "spans": [...]} (span 시간은 밀리초)
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+            spans = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "mean_ms": stats["sum"] / stats["count"] * 1000 if stats["count"] else 0.0
+                }
+                for (name, labels), stats in self._spans.items()
+            ]
+        return {"counters": counters, "spans": spans}
+
+    def render_prometheus(self):
+        """
+        Prometheus 텍스트 형식(0.0.4)으로 변환합니다.
+        """
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                metric = f"{PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, labels), value in self._counters.items():
+                    if counter_name == name:
+                        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+            if self._spans:
+                metric = f"{PREFIX}span_duration_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (name, labels), stats in self._spans.items():
+                    label_key = (("span", name),) + labels
+                    for bound, count in zip(self.buckets, stats["buckets"]):
+                        lines.append(f"{metric}_bucket{_format_labels(label_key, [('le', repr(bound))])} {count}")
+                    lines.append(f"{metric}_bucket{_format_labels(label_key, [('le', '+Inf')])} {stats['count']}")
+                    lines.append(f"{metric}_sum{_format_labels(label_key)} {stats['sum']}")
+                    lines.append(f"{metric}_count{_format_labels(label_key)} {stats['count']}")
+
+                metric = f"{PREFIX}span_errors_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (name, labels), stats in self._spans.items():
+                    lines.append(f"{metric}{_format_labels((('span', name),) + labels)} {stats['errors']}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    프로세스 전체에서 공유하는 계측 객체를 반환합니다.
+    """
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def span(name, **labels):
+    return get_metrics().span(name, **labels)
+
+
+def observe(name, seconds, error=False, **labels):
+    get_metrics().observe(name, seconds, error, **labels)
+
+
+def increment(name, value=1, **labels):
+    get_metrics().increment(name, value, **labels)
+
+
+def _metrics_handler():
+    # http.server는 엔드포인트를 시작할 때만 불러옴 (계측 모듈은 모든 스캔 모듈이 불러오므로 시작 시간에 영향)
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        # GET /metrics -> Prometheus 텍스트, GET /metrics.json -> snapshot()
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = get_metrics().render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = json.dumps(get_metrics().snapshot(), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return MetricsHandler
+
+
+def start_metrics_server(port, host=METRICS_HOST):
+    """
+    백그라운드 스레드에서 /metrics 엔드포인트를 시작하고 서버 객체를 반환합니다.
+    """
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, int(port)), _metrics_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_from_env():
+    """
+    METRICS_PORT가 지정되어 있으면 /metrics 엔드포인트를 시작합니다. 반환: 서버 객체 또는 None
+    """
+    if not METRICS_PORT:
+        return None
+    try:
+        server = start_metrics_server(METRICS_PORT)
+    except OSError as e:
+        print(f"계측 엔드포인트를 시작할 수 없습니다: {e}")
+        return None
+    print(f"계측 엔드포인트: http://{METRICS_HOST}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,180 @@
+# nutrient_parser.py
+import re
+import unicodedata
+
+# 영양성분 이름 -> 키 (긴 이름을 먼저 두어 '포화지방'이 '지방'으로 잘못 잡히지 않도록 함)
+NUTRIENT_NAMES = {
+    "포화지방": "saturated_fat",
+    "트랜스지방": "trans_fat",
+    "콜레스테롤": "cholesterol",
+    "탄수화물": "carbohydrates",
+    "식이섬유": "dietary_fiber",
+    "단백질": "proteins",
+    "나트륨": "sodium",
+    "에너지": "energy_kcal",
+    "열량": "energy_kcal",
+    "당류": "sugars",
+    "지방": "fat",
+    "칼슘": "calcium",
+}
+
+# 다른 영양성분 이름을 포함하지만 값을 사용하지 않는 이름 ('불포화지방' 안의 '포화지방'으로 잘못 잡히지 않도록 먼저 검사)
+IGNORED_NAMES = ("불포화지방",)
+
+# 제공량/기준량 표시 ('1회 제공량 1봉지 (120g)', '총 내용량 300g', '100g당')
+SERVING_NAME = "제공량"
+TOTAL_NAME = "내용량"
+BASIS_MARKER = "당"
+
+# 키별 표준 단위
+NUTRIENT_UNITS = {
+    "energy_kcal": "kcal",
+    "carbohydrates": "g",
+    "sugars": "g",
+    "dietary_fiber": "g",
+    "proteins": "g",
+    "fat": "g",
+    "saturated_fat": "g",
+    "trans_fat": "g",
+    "cholesterol": "mg",
+    "sodium": "mg",
+    "calcium": "mg",
+}
+
+# (입력 단위, 표준 단위) -> 곱할 값
+UNIT_FACTORS = {
+    ("kcal", "kcal"): 1.0,
+    ("kj", "kcal"): 1 / 4.184,
+    ("g", "g"): 1.0,
+    ("mg", "g"): 0.001,
+    ("μg", "g"): 0.000001,
+    ("g", "mg"): 1000.0,
+    ("mg", "mg"): 1.0,
+    ("μg", "mg"): 0.001,
+}
+
+# 소문자 단위 -> UNIT_FACTORS의 단위
+_UNIT_ALIASES = {"kcal": "kcal", "kj": "kj", "g": "g", "mg": "mg", "μg": "μg", "ug": "μg"}
+
+# 그룹 없이 되돌아가지 않는(possessive) 반복만 사용하여 정규식 엔진의 되추적 비용을 줄임 ('1.' 등도 float로 변환 가능)
+_NUMBER = r"[0-9][0-9,]*+\.?+[0-9]*+"
+
+# 라벨 전체를 한 번에 훑는 토크나이저
+# 이름 그룹 하나로 시작하고 모든 분기가 한글 글자로 시작하므로 정규식 엔진이 첫 글자만 보고 나머지 위치를 건너뜀
+# - 영양성분: '나트륨 1,880mg 94%' 형식 (단위는 글자 묶음으로 받고 파싱할 때 확인)
+# - 제공량: '1회 제공량 1봉지 (120g)' / '총 내용량 300g' 형식
+# - 기준량: '100g당 120kcal' 형식 (이름 없는 열량, 값이 없어도 '당' 표시를 남겨 기준량을 찾음)
+_TOKEN_PATTERN = re.compile(
+    rf"({'|'.join(IGNORED_NAMES + tuple(NUTRIENT_NAMES))}"
+    rf"|{SERVING_NAME}(?:\s*+(?:{_NUMBER}\s*+[가-힣]++\s*+)?+\()?+|{TOTAL_NAME}|{BASIS_MARKER})"
+    rf"(?:[\s:,]*+({_NUMBER})\s*+([a-zA-Zμ]++)[\s(미만]*+({_NUMBER}\s*+%|))?+",
+    re.ASCII
+)
+
+# '100g당' 형식의 표시 기준량 (토크나이저가 '당' 표시를 찾은 경우에만 'g당' 부분을 먼저 찾고 그 앞만 검사)
+_BASIS_PATTERN = re.compile(rf"({_NUMBER})\s*+(?:g|ml|G|ML)\s*+당", re.ASCII)
+_BASIS_UNIT_PATTERN = re.compile(r"(?:g|ml|G|ML)\s*+당", re.ASCII)
+
+# 영양성분 이름 -> (키, 표준 단위) (라벨 단위는 대부분 표준 단위이므로 문자열 비교만 하고, 다를 때만 변환 값을 찾음)
+_NAME_KEYS = {name: (key, NUTRIENT_UNITS[key]) for name, key in NUTRIENT_NAMES.items()}
+_EMPTY_NUTRIENTS = dict.fromkeys(NUTRIENT_UNITS)
+
+
+def _unit_factor(unit, standard_unit):
+    # 표준 단위가 아닌 경우의 변환 값 (변환할 수 없는 단위면 None)
+    return UNIT_FACTORS.get((_UNIT_ALIASES.get(unit.lower()), standard_unit))
+
+
+def _to_float(number):
+    return float(number.replace(',', '')) if ',' in number else float(number)
+
+
+def parse_nutrient_string(nutrient_str):
+    """
+    'nutrient' 문자열을 한 번에 훑어 숫자 값으로 변환하는 함수
+    반환: {키: 값} (값은 NUTRIENT_UNITS의 단위로 맞춘 float, 표시가 없으면 None)
+          daily_value_pct: {키: %영양성분기준치}, serving_size_g: 1회 제공량 (모르면 None), basis_g: 값의 기준량
+    100g당 등으로 표시된 라벨은 1회 제공량이 표시되어 있으면 1회 제공량 기준으로 환산하고,
+    없으면 표시된 기준량(예: 100ml당) 그대로 둡니다. (총 내용량을 1회 제공량으로 보지 않음)
+    """
+    nutrient_dict = _EMPTY_NUTRIENTS.copy()
+    daily_value = {}
+    serving_size = None
+    total_size = None
+    basis = None
+    has_basis = False
+    unnamed_energy = None
+
+    # '㎎', 전각 숫자 등을 일반 문자로 통일
+    text = nutrient_str
+    if not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+
+    # 같은 항목이 여러 번 나오면 처음 값을 사용
+    for name, value, unit, pct in _TOKEN_PATTERN.findall(text):
+        name_key = _NAME_KEYS.get(name)
+        if name_key is not None:
+            key, standard_unit = name_key
+            if nutrient_dict[key] is not None:
+                continue
+            if unit == standard_unit:
+                nutrient_dict[key] = float(value) if "," not in value else _to_float(value)
+            else:
+                # 값이 없거나('' 단위) 변환할 수 없는 단위는 건너뜀
+                factor = _unit_factor(unit, standard_unit)
+                if factor is None:
+                    continue
+                nutrient_dict[key] = _to_float(value) * factor
+            if pct:
+                # '94%' / '94 %' 형식
+                pct = pct[:-1]
+                daily_value[key] = float(pct) if "," not in pct else _to_float(pct)
+        elif name == BASIS_MARKER:
+            # '100g당 120kcal'처럼 이름 없이 표시된 열량 (이름이 있는 열량이 우선)
+            has_basis = True
+            factor = _unit_factor(unit, "kcal")
+            if factor is not None and unnamed_energy is None:
+                unnamed_energy = _to_float(value) * factor
+        elif not value or unit.lower() not in ("g", "ml"):
+            continue
+        elif name == TOTAL_NAME:
+            total_size = total_size or _to_float(value)
+        elif name.startswith(SERVING_NAME):
+            serving_size = serving_size or _to_float(value)
+
+    if nutrient_dict["energy_kcal"] is None:
+        nutrient_dict["energy_kcal"] = unnamed_energy
+    if has_basis:
+        for marker in _BASIS_UNIT_PATTERN.finditer(text):
+            match = _BASIS_PATTERN.search(text, max(0, marker.start() - 16), marker.end())
+            if match:
+                basis = _to_float(match.group(1))
+                break
+
+    # 기준량 표시가 없으면 값은 총 내용량 기준, 기준량이 총 내용량과 같으면 한 번에 다 먹는 제품
+    if serving_size is None and (basis is None or basis == total_size):
+        serving_size = total_size
+    # 100g당 표시 -> 1회 제공량이 표시된 경우에만 1회 제공량 기준으로 환산
+    if basis is not None and serving_size is not None and basis != serving_size:
+        ratio = serving_size / basis
+        for key, value in nutrient_dict.items():
+            if value is not None:
+                nutrient_dict[key] = value * ratio
+        for key in daily_value:
+            daily_value[key] *= ratio
+        basis = serving_size
+
+    nutrient_dict["daily_value_pct"] = daily_value
+    nutrient_dict["serving_size_g"] = serving_size
+    nutrient_dict["basis_g"] = basis if basis is not None else serving_size
+    return nutrient_dict
+
+
+def format_nutrient(key, value):
+    """
+    숫자 값을 '1,880mg' 형식의 문자열로 변환합니다. 값이 없으면 '정보 없음'
+    """
+    if value is None:
+        return "정보 없음"
+    number = f"{value:,.2f}".rstrip('0').rstrip('.')
+    return f"{number}{NUTRIENT_UNITS.get(key, '')}"
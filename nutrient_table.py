@@ -0,0 +1,349 @@
+# nutrient_table.py
+"""
+제품 전체의 영양 성분을 열(column) 단위 NumPy 배열로 모아 두고 한 번에 조회하는 표
+
+일괄 조회 결과(batch_scan.py의 JSONL)나 로컬 저장소(product_store.py)의 성분 정보를 읽어
+영양 성분마다 float64 배열 하나(값이 없으면 NaN), 바코드/제품 번호/제품명 배열로 저장합니다.
+열마다 .npy 파일 하나로 저장하므로 불러올 때 메모리 매핑(mmap)으로 필요한 열만 읽고,
+저장할 때마다 새 폴더(세대)에 열을 모두 쓴 뒤 meta.json이 그 폴더를 가리키도록 바꾸므로 열이 섞이지 않습니다.
+조건 검색과 정렬은 파이썬 반복문 없이 배열 연산으로 처리합니다.
+
+사용법:
+    python nutrient_table.py build --store                          # 로컬 저장소 전체로 표 만들기
+    python nutrient_table.py build --batch batch_results.jsonl --append
+    python nutrient_table.py query --where "sodium>1500" --limit 20
+    python nutrient_table.py query --where "energy_kcal>0" --order-by saturated_fat/energy_kcal --desc --limit 20
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from nutrient_parser import NUTRIENT_UNITS, parse_nutrient_string, format_nutrient
+from file_utils import atomic_write
+
+# 환경 변수 로드
+load_dotenv()
+
+TABLE_PATH = os.getenv('NUTRIENT_TABLE_PATH', 'nutrient_table')
+FORMAT_VERSION = 2
+# 이전 세대 폴더를 지우기 전에 남겨 두는 시간 (동시에 저장 중이거나 막 불러오는 프로세스 보호)
+GENERATION_GRACE_SECONDS = 3600
+
+KEY_COLUMNS = ["barcode", "report_no", "name"]
+VALUE_COLUMNS = list(NUTRIENT_UNITS) + ["serving_size_g"]
+
+# 조건 연산자 (NaN과의 비교는 항상 False이므로 값이 없는 제품은 자동으로 빠짐)
+OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+_CONDITION_PATTERN = re.compile(r"^\s*([\w/]+)\s*(>=|<=|==|!=|>|<)\s*([-+0-9.eE]+)\s*$")
+
+
+class NutrientTableBuilder:
+    """
+    제품 한 행씩 모아 NutrientTable을 만듭니다.
+    같은 제품(바코드, 바코드가 없으면 제품 번호)이 다시 들어오면 나중 값으로 바꿉니다.
+    """
+
+    def __init__(self):
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, barcode, report_no, name, nutrient):
+        """
+        nutrient: parse_nutrient_string 결과 (또는 같은 키의 딕셔너리, 문자열이면 먼저 해석)
+        """
+        if isinstance(nutrient, str):
+            nutrient = parse_nutrient_string(nutrient)
+        nutrient = nutrient or {}
+        values = tuple(
+            float(value) if isinstance(value, (int, float)) else np.nan
+            for value in (nutrient.get(column) for column in VALUE_COLUMNS)
+        )
+        barcode = barcode or ""
+        report_no = report_no or ""
+        self._rows[barcode or f"#{report_no}"] = (barcode, report_no, name or "", values)
+
+    def add_table(self, table):
+        """
+        기존 표의 모든 행을 추가합니다. (이어서 만들기)
+        """
+        columns = [table[column] for column in VALUE_COLUMNS]
+        for index in range(len(table)):
+            self.add(
+                str(table["barcode"][index]), str(table["report_no"][index]), str(table["name"][index]),
+                {column: float(values[index]) for column, values in zip(VALUE_COLUMNS, columns)}
+            )
+
+    def add_batch_results(self, path):
+        """
+        batch_scan.py 결과 파일(JSONL)의 성공한 레코드를 추가합니다. 반환: 추가한 수
+        """
+        added = 0
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("error") or not record.get("nutrient"):
+                    continue
+                self.add(record.get("barcode"), record.get("report_no"), record.get("product_name"), record["nutrient"])
+                added += 1
+        return added
+
+    def add_store(self, store, batch_size=5000):
+        """
+        로컬 저장소의 성분 정보가 있는 모든 제품을 추가합니다. 반환: 추가한 수
+        """
+        added = 0
+        for rows in store.iter_nutrient_rows(batch_size):
+            for barcode, report_no, name, nutrient in rows:
+                if nutrient:
+                    self.add(barcode, report_no, name, nutrient)
+                    added += 1
+        return added
+
+    def build(self):
+        rows = list(self._rows.values())
+        columns = {}
+        for position, column in enumerate(KEY_COLUMNS):
+            columns[column] = np.array([row[position] for row in rows], dtype=str)
+        values = np.array([row[3] for row in rows], dtype=np.float64).reshape(len(rows), len(VALUE_COLUMNS))
+        for position, column in enumerate(VALUE_COLUMNS):
+            columns[column] = np.ascontiguousarray(values[:, position])
+        return NutrientTable(columns)
+
+
+class NutrientTable:
+    """
+    열 이름 -> 1차원 배열 (모든 열의 길이가 같음)
+    query()는 조건에 맞는 행 번호 배열을 반환하고, rows()로 필요한 행만 딕셔너리로 꺼냅니다.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["barcode"])
+
+    def __getitem__(self, column):
+        return self.column(column)
+
+    def column(self, expression):
+        """
+        열 이름 또는 'saturated_fat/energy_kcal'처럼 두 열의 비율 (분모가 0 이하이거나 값이 없으면 NaN)
+        """
+        if "/" in expression:
+            numerator, denominator = expression.split("/", 1)
+            return ratio(self.column(numerator), self.column(denominator))
+        if expression not in self.columns:
+            raise KeyError(f"알 수 없는 열: {expression}")
+        return self.columns[expression]
+
+    def save(self, path=TABLE_PATH):
+        """
+        열마다 .npy 파일로 새 세대 폴더에 저장한 뒤 meta.json을 원자적으로 바꿔 새 세대로 전환합니다.
+        중간에 중단되거나 다른 프로세스가 동시에 저장해도 meta.json은 항상 완성된 한 세대만 가리킵니다.
+        """
+        os.makedirs(path, exist_ok=True)
+        generation = f"v{time.time_ns()}-{os.getpid()}"
+        directory = os.path.join(path, generation)
+        os.makedirs(directory)
+        for column, values in self.columns.items():
+            np.save(os.path.join(directory, f"{column}.npy"), np.asarray(values))
+        meta = {"version": FORMAT_VERSION, "data": generation, "rows": len(self), "columns": list(self.columns)}
+        atomic_write(os.path.join(path, "meta.json"), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        _remove_old_generations(path, generation)
+
+    @classmethod
+    def load(cls, path=TABLE_PATH, mmap=True):
+        """
+        저장된 표를 불러옵니다. mmap=True이면 파일을 메모리 매핑하여 실제로 읽는 열만 디스크에서 가져옵니다.
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 표 형식입니다: {meta.get('version')} (표를 다시 만드세요)")
+        directory = os.path.join(path, meta["data"])
+        mode = "r" if mmap else None
+        columns = {column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode=mode) for column in meta["columns"]}
+        if any(len(values) != meta["rows"] for values in columns.values()):
+            raise ValueError("열의 길이가 맞지 않습니다. 표를 다시 만드세요.")
+        return cls(columns)
+
+    def mask(self, where=()):
+        """
+        where: [(열 이름 또는 비율, 연산자, 값)] 조건을 모두 만족하는 행이 True인 배열
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for expression, op, value in where:
+            if op not in OPS:
+                raise ValueError(f"알 수 없는 연산자: {op}")
+            selected &= OPS[op](self.column(expression), value)
+        return selected
+
+    def query(self, where=(), order_by=None, descending=False, limit=None):
+        """
+        조건에 맞는 행 번호 배열을 반환합니다.
+        order_by(열 이름 또는 비율)가 주어지면 그 값으로 정렬하고 값이 없는 행은 뺍니다.
+        limit만큼만 필요하면 전체 정렬 대신 상위 limit개만 골라 정렬합니다.
+        """
+        selected = self.mask(where)
+        if order_by is None:
+            indices = np.flatnonzero(selected)
+            return indices if limit is None else indices[:limit]
+
+        keys = np.asarray(self.column(order_by))
+        selected &= ~np.isnan(keys)
+        indices = np.flatnonzero(selected)
+        keys = -keys[indices] if descending else keys[indices]
+        if limit is not None and limit < len(indices):
+            top = np.argpartition(keys, limit)[:limit]
+            return indices[top[np.argsort(keys[top], kind="stable")]]
+        return indices[np.argsort(keys, kind="stable")]
+
+    def rows(self, indices, columns=None):
+        """
+        행 번호 배열의 행을 [{열: 값}]으로 반환합니다. 값이 없는(NaN) 영양 성분은 None
+        """
+        columns = columns or KEY_COLUMNS + VALUE_COLUMNS
+        selected = {column: np.asarray(self.column(column))[indices] for column in columns}
+        result = []
+        for position in range(len(indices)):
+            row = {}
+            for column, values in selected.items():
+                value = values[position].item()
+                row[column] = None if isinstance(value, float) and value != value else value
+            result.append(row)
+        return result
+
+    def to_pandas(self):
+        """
+        pandas DataFrame으로 변환합니다. (pandas는 이때만 불러옴)
+        """
+        import pandas as pd
+
+        return pd.DataFrame({column: np.asarray(values) for column, values in self.columns.items()})
+
+
+def _remove_old_generations(path, current):
+    """
+    현재 세대가 아니고 만든 지 GENERATION_GRACE_SECONDS가 지난 세대 폴더를 지웁니다.
+    (메모리 매핑 중이라 지울 수 없는 파일은 다음 저장 때 다시 시도)
+    """
+    cutoff = time.time_ns() - GENERATION_GRACE_SECONDS * 1_000_000_000
+    for entry in os.listdir(path):
+        full_path = os.path.join(path, entry)
+        if entry == current:
+            continue
+        generation = re.fullmatch(r"v(\d+)-\d+", entry)
+        if generation and os.path.isdir(full_path) and int(generation.group(1)) < cutoff:
+            shutil.rmtree(full_path, ignore_errors=True)
+
+
+def ratio(numerator, denominator):
+    """
+    두 열의 비율 (분모가 0 이하이거나 값이 없으면 NaN)
+    """
+    numerator = np.asarray(numerator)
+    denominator = np.asarray(denominator)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def parse_condition(text):
+    """
+    'sodium>1500' 형식의 조건을 (열, 연산자, 값)으로 바꿉니다.
+    """
+    match = _CONDITION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"조건 형식이 올바르지 않습니다: {text} (예: sodium>1500)")
+    return match.group(1), match.group(2), float(match.group(3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="영양 성분 열 단위 표 만들기/조회")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="일괄 조회 결과나 로컬 저장소로 표 만들기")
+    build_parser.add_argument("--store", action="store_true", help="로컬 저장소(product_store.py)의 모든 제품 추가")
+    build_parser.add_argument("--batch", nargs="*", default=[], help="batch_scan.py 결과 파일(JSONL)")
+    build_parser.add_argument("--append", action="store_true", help="기존 표에 이어서 추가")
+    build_parser.add_argument("-o", "--output", default=TABLE_PATH, help="표를 저장할 폴더")
+
+    query_parser = subparsers.add_parser("query", help="조건 검색")
+    query_parser.add_argument("--table", default=TABLE_PATH, help="표가 저장된 폴더")
+    query_parser.add_argument("--where", action="append", default=[], help="조건 (예: sodium>1500, 여러 번 지정 가능)")
+    query_parser.add_argument("--order-by", help="정렬 기준 열 또는 비율 (예: saturated_fat/energy_kcal)")
+    query_parser.add_argument("--desc", action="store_true", help="내림차순 정렬")
+    query_parser.add_argument("--limit", type=int, default=20)
+    query_parser.add_argument("--count", action="store_true", help="조건에 맞는 제품 수만 출력")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if not args.store and not args.batch:
+            parser.error("--store 또는 --batch 중 하나 이상을 지정하세요.")
+        builder = NutrientTableBuilder()
+        if args.append and os.path.exists(os.path.join(args.output, "meta.json")):
+            builder.add_table(NutrientTable.load(args.output, mmap=False))
+            print(f"기존 표: {len(builder)}개 제품")
+        if args.store:
+            from product_store import get_product_store
+
+            store = get_product_store()
+            if store is None:
+                print("로컬 저장소가 없습니다. 먼저 product_store.py sync를 실행하세요.")
+                sys.exit(1)
+            print(f"로컬 저장소: {builder.add_store(store)}개 제품")
+        for path in args.batch:
+            print(f"{path}: {builder.add_batch_results(path)}개 제품")
+        table = builder.build()
+        table.save(args.output)
+        print(f"표 저장: {args.output} ({len(table)}개 제품)")
+        return
+
+    table = NutrientTable.load(args.table)
+    try:
+        where = [parse_condition(text) for text in args.where]
+        indices = table.query(where, args.order_by, args.desc, None if args.count else args.limit)
+    except (KeyError, ValueError) as e:
+        print(e.args[0])
+        sys.exit(1)
+    if args.count:
+        print(len(indices))
+        return
+
+    shown = [expression for expression, _, _ in where]
+    if args.order_by and args.order_by not in shown:
+        shown.append(args.order_by)
+    # 출력할 열(비율 포함)은 한 번씩만 계산하고 출력할 행만 꺼냄
+    shown_values = {expression: np.asarray(table.column(expression))[indices] for expression in shown}
+    for position, row in enumerate(table.rows(indices, KEY_COLUMNS)):
+        values = []
+        for expression in shown:
+            value = float(shown_values[expression][position])
+            values.append(f"{expression}={value:.4g}" if "/" in expression else f"{expression}={format_nutrient(expression, value)}")
+        print(f"{row['barcode'] or '-'}\t{row['report_no']}\t{row['name']}\t{', '.join(values)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# product_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import metrics
+
+# 환경 변수 로드
+load_dotenv()
+
+# 캐시 설정 (환경 변수로 변경 가능)
+CACHE_PATH = os.getenv('PRODUCT_CACHE_PATH', 'product_cache.db')
+CACHE_TTL = float(os.getenv('PRODUCT_CACHE_TTL', 7 * 24 * 3600))  # 기본 7일
+CACHE_MAX_ENTRIES = int(os.getenv('PRODUCT_CACHE_MAX_ENTRIES', 20000))
+# API에서 없다고 확인된 바코드/제품 번호를 다시 조회하지 않는 시간 (초)
+NOT_FOUND_TTL = float(os.getenv('PRODUCT_CACHE_NOT_FOUND_TTL', 600))
+# 만료된 항목을 API 장애 시 대신 쓰기 위해 남겨 두는 시간 (초)
+STALE_TTL = float(os.getenv('PRODUCT_CACHE_STALE_TTL', 30 * 24 * 3600))
+
+# 캐시 네임스페이스
+BARCODE = "barcode"  # 바코드 -> {PRDLST_NM, PRDLST_REPORT_NO}
+REPORT_NO = "report_no"  # 제품 번호 -> 성분 정보 원본 (nutrient, allergy, rawmtrl)
+ALLERGEN_BITS = "allergen_bits"  # 제품 번호 -> 알레르기 성분 비트셋 {bits, vocab} (allergen_profiles.py)
+
+# "조회 결과 없음"을 저장할 때의 값
+NOT_FOUND = "__not_found__"
+
+
+class ProductCache:
+    """
+    바코드/제품 번호 조회 결과를 저장하는 SQLite 기반 로컬 캐시
+    항목별 만료 시간(TTL)과 최대 항목 수를 가지며, 초과 시 가장 오래 사용하지 않은 항목부터 삭제합니다.
+    만료된 항목은 stale_ttl 동안 남겨 두어 API를 사용할 수 없을 때 get_stale()로 꺼낼 수 있습니다.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, stale_ttl=STALE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, namespace, key):
+        """
+        캐시된 값을 반환합니다. 없거나 만료된 경우 None을 반환합니다.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, str(key))
+            ).fetchone()
+
+            if row is None or row[1] < now:
+                self.misses += 1
+                metrics.increment("cache_misses", cache="product", namespace=namespace)
+                return None
+
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, str(key))
+            )
+            self._conn.commit()
+            value = json.loads(row[0])
+            # 조회 결과가 없다는 기록(NOT_FOUND)은 제품 정보 적중과 따로 셈
+            if value == NOT_FOUND:
+                self.negative_hits += 1
+                metrics.increment("cache_negative_hits", cache="product", namespace=namespace)
+            else:
+                self.hits += 1
+                metrics.increment("cache_hits", cache="product", namespace=namespace)
+            return value
+
+    def contains(self, namespace, key):
+        """
+        적중/실패 통계와 사용 시간에 반영하지 않고 만료되지 않은 값이 있는지만 확인합니다.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM cache WHERE namespace = ? AND key = ? AND expires_at >= ?",
+                (namespace, str(key), time.time())
+            ).fetchone()
+        return row is not None
+
+    def get_stale(self, namespace, key):
+        """
+        만료 여부와 관계없이 남아 있는 값을 반환합니다. (API 장애 시 대신 사용, 적중 통계에는 반영하지 않음)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ?", (namespace, str(key))
+            ).fetchone()
+        if row is None:
+            return None
+        metrics.increment("cache_stale_hits", cache="product", namespace=namespace)
+        return json.loads(row[0])
+
+    def set_not_found(self, namespace, key, ttl=NOT_FOUND_TTL):
+        """
+        조회 결과가 없다는 것을 짧은 시간(NOT_FOUND_TTL) 동안 저장합니다. get()은 NOT_FOUND를 반환합니다.
+        """
+        self.set(namespace, key, NOT_FOUND, ttl)
+
+    def set(self, namespace, key, value, ttl=None):
+        """
+        값을 캐시에 저장합니다. ttl을 지정하지 않으면 기본 만료 시간을 사용합니다.
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, str(key), json.dumps(value, ensure_ascii=False), expires_at, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, str(key)))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def _evict(self):
+        # 만료 후 stale_ttl이 지난 항목 정리 후, 최대 항목 수를 넘으면 오래 사용하지 않은 항목부터 삭제
+        self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time() - self.stale_ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE rowid IN "
+                "(SELECT rowid FROM cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        """
+        캐시 적중/실패 횟수와 현재 항목 수를 반환합니다. (적중률에는 NOT_FOUND 적중을 넣지 않음)
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_product_cache():
+    """
+    프로세스 전체에서 공유하는 캐시 인스턴스를 반환합니다.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ProductCache()
+    return _cache
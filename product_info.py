@@ -1,13 +1,91 @@
 # product_info.py
-import requests
 import json
-import re
+import http_client
+import metrics
+from product_cache import get_product_cache, BARCODE, REPORT_NO, NOT_FOUND
+from product_store import get_product_store, FOODSAFETY_API_URL, CERTIMG_API_URL
+from nutrient_parser import parse_nutrient_string
+from singleflight import SingleFlight
 
-def get_product_info_by_barcode(barcode, api_key):
-    url = f"http://openapi.foodsafetykorea.go.kr/api/{api_key}/C005/json/1/1/BAR_CD={barcode}"
+# 여러 계산대에서 같은 제품을 동시에 조회해도 API 요청은 한 번만 보냄
+_barcode_flight = SingleFlight("barcode")
+_report_no_flight = SingleFlight("report_no")
+
+
+class ApiUnavailableError(Exception):
+    """
+    API 장애(5xx 응답, 시간 초과, 연결 오류, 서킷 브레이커 차단)로 조회하지 못했고 이전에 저장된 정보도 없는 경우
+    제품이 없다고 확인된 경우(None)와 달리 나중에 다시 조회하면 찾을 수 있습니다.
+    """
+
+
+def get_product_info_by_barcode(barcode, api_key, raise_unavailable=False):
+    """
+    바코드로 제품 정보를 조회합니다. 제품이 없으면 None
+    API 장애로 조회하지 못하면 raise_unavailable일 때 ApiUnavailableError를 던지고, 아니면 None을 반환합니다.
+    """
+    try:
+        return _barcode_flight.do(barcode, _get_product_info_by_barcode, barcode, api_key)
+    except ApiUnavailableError:
+        if raise_unavailable:
+            raise
+        return None
+
+
+def get_nutrition_info_by_report_no(report_no, api_key, raise_unavailable=False):
+    """
+    제품 번호로 성분 정보를 조회합니다. 성분 정보가 없으면 None
+    API 장애로 조회하지 못하면 raise_unavailable일 때 ApiUnavailableError를 던지고, 아니면 None을 반환합니다.
+    """
+    try:
+        return _report_no_flight.do(report_no, _get_nutrition_info_by_report_no, report_no, api_key)
+    except ApiUnavailableError:
+        if raise_unavailable:
+            raise
+        return None
+
+
+def _stale(namespace, key):
+    # API를 사용할 수 없을 때 만료된 캐시라도 남아 있으면 사용하고, 없으면 ApiUnavailableError
+    stale = get_product_cache().get_stale(namespace, key)
+    if stale is None or stale == NOT_FOUND:
+        raise ApiUnavailableError(f"{namespace} {key}: API를 사용할 수 없고 저장된 정보도 없습니다.")
+    print("API를 사용할 수 없어 이전에 저장된 정보를 사용합니다.")
+    return stale
+
+
+def _stale_nutrition_info(report_no):
+    return build_nutrition_info(_stale(REPORT_NO, report_no))
+
+
+def _get_product_info_by_barcode(barcode, api_key):
+    # 캐시에 저장된 제품 정보가 있으면 API를 호출하지 않음
+    cache = get_product_cache()
+    cached = cache.get(BARCODE, barcode)
+    if cached is not None and cached != NOT_FOUND:
+        return cached
+
+    # 로컬 저장소(product_store.py로 미리 받아 둔 C005 데이터)에 있으면 API를 호출하지 않음
+    store = get_product_store()
+    if store is not None:
+        product_info = store.get_product(barcode)
+        if product_info is not None:
+            cache.set(BARCODE, barcode, product_info)
+            return product_info
+
+    # 최근 API에서 없다고 확인된 바코드는 NOT_FOUND_TTL 동안 다시 조회하지 않음
+    if cached == NOT_FOUND:
+        metrics.debug(f"제품 정보가 없는 바코드 (최근 조회 결과): {barcode}")
+        return None
+
+    # 캐시와 로컬 저장소에 없을 때만 requests를 불러옴 (프로그램 시작 시간 단축)
+    import requests
+
+    url = f"{FOODSAFETY_API_URL}/{api_key}/C005/json/1/1/BAR_CD={barcode}"
     
     try:
-        response = requests.get(url, timeout=10)
+        with metrics.span("barcode_api"):
+            response = http_client.get(url, endpoint="barcode_api")
         if response.status_code == 200:
             data = response.json()
             # 데이터 구조 확인
@@ -16,26 +94,54 @@ def get_product_info_by_barcode(barcode, api_key):
                     "PRDLST_NM": data["C005"]["row"][0].get("PRDLST_NM", "이름 정보 없음"),  # 제품명
                     "PRDLST_REPORT_NO": data["C005"]["row"][0].get("PRDLST_REPORT_NO", "번호 없음")
                 }
+                cache.set(BARCODE, barcode, product_info)
                 return product_info
             else:
                 print("API 응답에 제품 정보가 없습니다.")
+                # 정상 응답에 행이 없는 경우만 저장 (인증키 오류 등은 저장하지 않음)
+                if data.get("C005", {}).get("RESULT", {}).get("CODE") in ("INFO-000", "INFO-200"):
+                    cache.set_not_found(BARCODE, barcode)
                 return None
         else:
             print("바코드 API 요청 실패:", response.status_code)
-            return None
+            return _stale(BARCODE, barcode) if response.status_code >= 500 else None
+    except http_client.CircuitOpenError:
+        print("바코드 API 장애로 요청을 잠시 보내지 않습니다.")
+        return _stale(BARCODE, barcode)
     except requests.Timeout:
         print("바코드 API 요청 시간이 초과되었습니다.")
-        return None
+        return _stale(BARCODE, barcode)
     except requests.ConnectionError:
         print("바코드 API 서버에 연결할 수 없습니다.")
-        return None
+        return _stale(BARCODE, barcode)
     except requests.RequestException as e:
         print(f"바코드 API 요청 중 오류 발생: {e}")
+        return _stale(BARCODE, barcode)
+
+
+def _get_nutrition_info_by_report_no(report_no, api_key):
+    # 캐시에는 응답 원본 필드를 저장하고, 꺼낼 때 파싱함
+    cache = get_product_cache()
+    cached = cache.get(REPORT_NO, report_no)
+    if cached is not None and cached != NOT_FOUND:
+        return build_nutrition_info(cached)
+
+    # 로컬 저장소에 성분 정보가 있으면 API를 호출하지 않음
+    store = get_product_store()
+    if store is not None:
+        raw_item = store.get_detail(report_no)
+        if raw_item is not None:
+            cache.set(REPORT_NO, report_no, raw_item)
+            return build_nutrition_info(raw_item)
+
+    # 최근 API에서 없다고 확인된 제품 번호는 NOT_FOUND_TTL 동안 다시 조회하지 않음
+    if cached == NOT_FOUND:
+        metrics.debug(f"성분 정보가 없는 제품 번호 (최근 조회 결과): {report_no}")
         return None
 
+    import requests
 
-def get_nutrition_info_by_report_no(report_no, api_key):
-    url = "http://apis.data.go.kr/B553748/CertImgListServiceV3/getCertImgListServiceV3"
+    url = CERTIMG_API_URL
     params = {
         'ServiceKey': api_key,
         'prdlstReportNo': report_no,
@@ -44,70 +150,65 @@ def get_nutrition_info_by_report_no(report_no, api_key):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
-        print("\n2. 요청 url: ", response.url)
+        with metrics.span("nutrition_api"):
+            response = http_client.get(url, params=params, endpoint="nutrition_api")
+        metrics.debug("\n2. 요청 url: ", response.url)
         if response.status_code == 200:
             data = response.json()
-            print("응답 데이터:", json.dumps(data, indent=2, ensure_ascii=False))  # 전체 응답 데이터 출력
+            # 응답 원본 출력은 디버그 모드에서만 (매 스캔마다 전체 응답을 직렬화하지 않도록 함)
+            if metrics.DEBUG:
+                print("응답 데이터:", json.dumps(data, indent=2, ensure_ascii=False))  # 전체 응답 데이터 출력
             if 'body' in data and 'items' in data['body'] and len(data['body']['items']) > 0:
                 item = data['body']['items'][0]['item']
-                print("Item 내용:", json.dumps(item, indent=2, ensure_ascii=False))  # item 내용 출력
-                # 'nutrient' 필드가 문자열인지 확인
-                nutrient_str = item.get('nutrient', "알레르기 정보 없음")
-                allergy = item.get('allergy', "알레르기 정보 없음")
-                
-                # 'nutrient'가 JSON 문자열인지 확인 후 파싱
-                if isinstance(nutrient_str, str):
-                    nutrient = parse_nutrient_string(nutrient_str)
-                else:
-                    nutrient = nutrient_str
-                
-                product_info = {
-                    "nutrient": nutrient,
-                    "allergy": allergy
+                if metrics.DEBUG:
+                    print("Item 내용:", json.dumps(item, indent=2, ensure_ascii=False))  # item 내용 출력
+                raw_item = {
+                    "nutrient": item.get('nutrient', "알레르기 정보 없음"),
+                    "allergy": item.get('allergy', "알레르기 정보 없음"),
+                    "rawmtrl": item.get('rawmtrl', "")
                 }
-                return product_info
+                cache.set(REPORT_NO, report_no, raw_item)
+                return build_nutrition_info(raw_item)
             else:
                 print(f"'{report_no}'에 대한 정보가 없습니다.")
+                # 정상 응답(body 포함)에 항목이 없는 경우만 저장
+                if 'body' in data:
+                    cache.set_not_found(REPORT_NO, report_no)
                 return None
         else:
             print("성분 정보 API 요청 실패:", response.status_code)
-            return None
+            return _stale_nutrition_info(report_no) if response.status_code >= 500 else None
+    except http_client.CircuitOpenError:
+        print("성분 정보 API 장애로 요청을 잠시 보내지 않습니다.")
+        return _stale_nutrition_info(report_no)
     except requests.Timeout:
         print("성분 정보 API 요청 시간이 초과되었습니다.")
-        return None
+        return _stale_nutrition_info(report_no)
     except requests.ConnectionError:
         print("성분 정보 API 서버에 연결할 수 없습니다.")
-        return None
+        return _stale_nutrition_info(report_no)
     except requests.RequestException as e:
         print(f"성분 정보 API 요청 중 오류 발생: {e}")
-        return None
+        return _stale_nutrition_info(report_no)
 
 
-def parse_nutrient_string(nutrient_str):
+def build_nutrition_info(item):
     """
-    'nutrient' 문자열을 파싱하여 딕셔너리로 변환하는 함수
-    필요한 영양성분: 열량, 탄수화물, 단백질, 지방, 나트륨, 포화지방
+    성분 정보 API의 item(또는 캐시된 원본)에서 영양 정보, 알레르기 정보, 원재료를 구성하는 함수
     """
-    nutrient_dict = {}
-    key_mapping = {
-        "열량": "energy_kcal",
-        "탄수화물": "carbohydrates",
-        "단백질": "proteins",
-        "지방": "fat",
-        "나트륨": "sodium",
-        "포화지방": "saturated_fat"
+    # 'nutrient' 필드가 문자열인지 확인
+    nutrient_str = item.get('nutrient', "알레르기 정보 없음")
+    allergy = item.get('allergy', "알레르기 정보 없음")
+
+    # 'nutrient'가 JSON 문자열인지 확인 후 파싱
+    if isinstance(nutrient_str, str):
+        with metrics.span("nutrient_parse"):
+            nutrient = parse_nutrient_string(nutrient_str)
+    else:
+        nutrient = nutrient_str
+
+    return {
+        "nutrient": nutrient,
+        "allergy": allergy,
+        "rawmtrl": item.get('rawmtrl', "")
     }
-    
-    for korean, english in key_mapping.items():
-        # '열량 500kcal' 형식으로 추출
-        pattern = rf"{korean}\s+([\d,]+(?:\.\d+)?)\s*([kK][cC][aA][lL]|[gG]|[mM][gG])"
-        match = re.search(pattern, nutrient_str)
-        if match:
-            number = match.group(1).replace(',', '')  # 쉼표 제거
-            unit = match.group(2)
-            nutrient_dict[english] = f"{number}{unit}"
-        else:
-            nutrient_dict[english] = "정보 없음"
-    
-    return nutrient_dict
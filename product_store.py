@@ -0,0 +1,415 @@
+# product_store.py
+"""
+C005(바코드 -> 제품) 및 CertImgListServiceV3(제품 번호 -> 성분 정보) 전체 데이터를 내려받아 두는 로컬 저장소
+
+사용법:
+    python product_store.py sync              # 두 API 모두 이어서 동기화
+    python product_store.py sync --source c005 --max-pages 10
+    python product_store.py sync --full       # 처음부터 다시 동기화
+    python product_store.py stats
+
+각 페이지를 저장할 때 다음 시작 위치도 함께 기록하므로, 중단된 동기화는 같은 명령으로 이어서 진행됩니다.
+끝까지 받은 뒤에는 같은 명령으로 그 뒤에 추가된 행만 받고, 전체를 받기 시작한 지 PRODUCT_STORE_REFRESH_INTERVAL이
+지났으면 처음부터 다시 받아 이미 받은 행의 변경(성분, 알레르기 표시 등)도 반영합니다.
+(API에서 삭제된 행은 남아 있으므로 지우려면 저장소 파일을 지우고 --full로 다시 받으세요)
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import http_client
+
+# 환경 변수 로드
+load_dotenv()
+
+STORE_PATH = os.getenv('PRODUCT_STORE_PATH', 'product_store.db')
+FOODSAFETY_API_URL = os.getenv('FOODSAFETY_API_URL', 'http://openapi.foodsafetykorea.go.kr/api')
+CERTIMG_API_URL = os.getenv(
+    'CERTIMG_API_URL', 'http://apis.data.go.kr/B553748/CertImgListServiceV3/getCertImgListServiceV3'
+)
+
+C005_PAGE_SIZE = 1000  # C005 한 번에 받을 수 있는 최대 행 수
+CERTIMG_PAGE_SIZE = 100  # CertImgListServiceV3 한 번에 받을 수 있는 최대 행 수
+QUERY_CHUNK_SIZE = 500  # IN (...) 조회 한 번에 넣는 키 수 (SQLite 변수 개수 제한)
+# 끝까지 받은 뒤 처음부터 다시 받는 간격 (초, 기본 7일, 0이면 --full로만 다시 받음)
+SYNC_REFRESH_INTERVAL = float(os.getenv('PRODUCT_STORE_REFRESH_INTERVAL', 7 * 24 * 3600))
+
+
+class ProductStore:
+    """
+    바코드와 제품 번호로 색인된 SQLite 제품 저장소
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS products (
+                barcode TEXT PRIMARY KEY,
+                report_no TEXT NOT NULL,
+                name TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_products_report_no ON products (report_no);
+            CREATE TABLE IF NOT EXISTS details (
+                report_no TEXT PRIMARY KEY,
+                name TEXT,
+                nutrient TEXT,
+                allergy TEXT,
+                rawmtrl TEXT
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                source TEXT PRIMARY KEY,
+                next_index INTEGER NOT NULL,
+                total INTEGER,
+                updated_at REAL
+            );
+            """
+        )
+        # 알레르기 성분 비트셋 (allergen_profiles.py, 16진수 문자열과 만들 때의 어휘 크기)
+        # 이전 버전에서 만든 저장소에는 열이 없으므로 추가
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(details)")}
+        if "allergen_bits" not in columns:
+            self._conn.execute("ALTER TABLE details ADD COLUMN allergen_bits TEXT")
+            self._conn.execute("ALTER TABLE details ADD COLUMN allergen_vocab INTEGER")
+        # 현재 전체 동기화를 시작한 시각 (처음부터 다시 받을 때를 정하는 데 사용)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sync_state)")}
+        if "pass_started_at" not in columns:
+            self._conn.execute("ALTER TABLE sync_state ADD COLUMN pass_started_at REAL")
+        self._conn.commit()
+
+    def get_product(self, barcode):
+        """
+        바코드로 {PRDLST_NM, PRDLST_REPORT_NO}를 반환합니다. 없으면 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, report_no FROM products WHERE barcode = ?", (barcode,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"PRDLST_NM": row[0] or "이름 정보 없음", "PRDLST_REPORT_NO": row[1]}
+
+    def get_detail(self, report_no):
+        """
+        제품 번호로 성분 정보 원본 {nutrient, allergy, rawmtrl}을 반환합니다. 없으면 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT nutrient, allergy, rawmtrl FROM details WHERE report_no = ?", (report_no,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "nutrient": row[0] or "알레르기 정보 없음",
+            "allergy": row[1] or "알레르기 정보 없음",
+            "rawmtrl": row[2] or ""
+        }
+
+    def get_report_nos(self, barcodes):
+        """
+        여러 바코드의 제품 번호를 한 번에 조회합니다. 반환: {barcode: report_no} (없는 바코드는 빠짐)
+        """
+        barcodes = list(barcodes)
+        found = {}
+        with self._lock:
+            for start in range(0, len(barcodes), QUERY_CHUNK_SIZE):
+                chunk = barcodes[start:start + QUERY_CHUNK_SIZE]
+                found.update(self._conn.execute(
+                    f"SELECT barcode, report_no FROM products WHERE barcode IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+        return found
+
+    def get_allergen_bits(self, report_nos):
+        """
+        여러 제품의 알레르기 성분 비트셋을 한 번에 조회합니다.
+        반환: {report_no: (allergen_bits, allergen_vocab)} (비트셋을 아직 만들지 않았으면 (None, None))
+        """
+        report_nos = list(report_nos)
+        found = {}
+        with self._lock:
+            for start in range(0, len(report_nos), QUERY_CHUNK_SIZE):
+                chunk = report_nos[start:start + QUERY_CHUNK_SIZE]
+                rows = self._conn.execute(
+                    "SELECT report_no, allergen_bits, allergen_vocab FROM details "
+                    f"WHERE report_no IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def iter_outdated_allergen_rows(self, vocab_size, batch_size=1000):
+        """
+        비트셋이 없거나 vocab_size보다 작은 어휘로 만든 제품을 batch_size개씩 돌려줍니다. [(report_no, allergy, rawmtrl)]
+        """
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT report_no, allergy, rawmtrl FROM details "
+                    "WHERE report_no > ? AND (allergen_bits IS NULL OR allergen_vocab < ?) "
+                    "ORDER BY report_no LIMIT ?",
+                    (last, vocab_size, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][0]
+
+    def set_allergen_bits(self, rows):
+        """
+        rows: [(report_no, allergen_bits, allergen_vocab)]
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE details SET allergen_bits = ?, allergen_vocab = ? WHERE report_no = ?",
+                [(bits, vocab, report_no) for report_no, bits, vocab in rows]
+            )
+
+    def iter_nutrient_rows(self, batch_size=5000):
+        """
+        성분 정보가 있는 모든 제품을 batch_size개씩 돌려줍니다. [(barcode, report_no, name, nutrient)]
+        바코드가 여러 개인 제품은 바코드마다 한 행, C005에 없는 제품은 바코드가 빈 문자열입니다.
+        """
+        last = ("", "")
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT COALESCE(p.barcode, ''), d.report_no, COALESCE(p.name, d.name), d.nutrient "
+                    "FROM details d LEFT JOIN products p ON p.report_no = d.report_no "
+                    "WHERE (d.report_no, COALESCE(p.barcode, '')) > (?, ?) "
+                    "ORDER BY d.report_no, COALESCE(p.barcode, '') LIMIT ?",
+                    (last[1], last[0], batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield rows
+            last = (rows[-1][0], rows[-1][1])
+
+    def get_sync_state(self, source):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT next_index, total FROM sync_state WHERE source = ?", (source,)
+            ).fetchone()
+        return (row[0], row[1]) if row else (1, None)
+
+    def begin_sync(self, source, refresh_interval=SYNC_REFRESH_INTERVAL):
+        """
+        이번 동기화를 시작할 행 번호를 반환합니다. 반환: (시작 행 번호, 처음부터 다시 받는지 여부)
+        끝까지 받았고 전체 동기화를 시작한 지 refresh_interval이 지났으면 처음부터 다시 받도록 위치를 되돌리고,
+        아니면 저장된 위치부터 이어서 받습니다. (끝까지 받은 경우 그 뒤에 추가된 행만 받음)
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT next_index, total, pass_started_at FROM sync_state WHERE source = ?", (source,)
+            ).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO sync_state (source, next_index, total, updated_at, pass_started_at) "
+                    "VALUES (?, 1, NULL, ?, ?)", (source, now, now)
+                )
+                return 1, False
+            next_index, total, pass_started_at = row
+            finished = total is not None and next_index > total
+            # 시작 시각이 없는 이전 버전의 저장소는 바로 다시 받음
+            if finished and refresh_interval > 0 and now - (pass_started_at or 0) >= refresh_interval:
+                self._conn.execute(
+                    "UPDATE sync_state SET next_index = 1, updated_at = ?, pass_started_at = ? WHERE source = ?",
+                    (now, now, source)
+                )
+                return 1, True
+        return next_index, False
+
+    def save_page(self, source, products, details, next_index, total):
+        """
+        한 페이지 분량의 행과 다음 시작 위치를 하나의 트랜잭션으로 저장합니다.
+        """
+        with self._lock, self._conn:
+            if products:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO products (barcode, report_no, name) VALUES (?, ?, ?)", products
+                )
+            if details:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO details (report_no, name, nutrient, allergy, rawmtrl) "
+                    "VALUES (?, ?, ?, ?, ?)", details
+                )
+            # 전체 동기화 시작 시각은 그대로 두고 위치만 갱신
+            self._conn.execute(
+                "INSERT INTO sync_state (source, next_index, total, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source) DO UPDATE SET next_index = excluded.next_index, total = excluded.total, "
+                "updated_at = excluded.updated_at",
+                (source, next_index, total, time.time())
+            )
+
+    def reset_sync_state(self, source):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sync_state WHERE source = ?", (source,))
+
+    def stats(self):
+        with self._lock:
+            products = self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            details = self._conn.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+            states = self._conn.execute("SELECT source, next_index, total FROM sync_state").fetchall()
+        return {
+            "products": products,
+            "details": details,
+            "sync_state": {source: {"next_index": next_index, "total": total} for source, next_index, total in states}
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_product_store():
+    """
+    공유 저장소를 반환합니다. 아직 동기화한 적이 없어 파일이 없으면 None을 반환합니다.
+    """
+    global _store
+    if _store is None:
+        if not os.path.exists(STORE_PATH):
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = ProductStore()
+    return _store
+
+
+def fetch_c005_page(api_key, start, end):
+    """
+    C005 start~end 행을 조회합니다. 반환: (행 목록, 전체 행 수)
+    """
+    url = f"{FOODSAFETY_API_URL}/{api_key}/C005/json/{start}/{end}"
+    response = http_client.get(url)
+    response.raise_for_status()
+    data = response.json().get("C005", {})
+    result_code = data.get("RESULT", {}).get("CODE", "INFO-000")
+    if result_code == "INFO-200":  # 해당하는 데이터가 없음
+        return [], int(data.get("total_count", 0) or 0)
+    if result_code != "INFO-000":
+        raise RuntimeError(f"C005 오류: {data.get('RESULT')}")
+    return data.get("row", []), int(data.get("total_count", 0) or 0)
+
+
+def fetch_certimg_page(api_key, page_no, num_of_rows):
+    """
+    CertImgListServiceV3의 page_no 페이지를 조회합니다. 반환: (item 목록, 전체 행 수)
+    """
+    params = {
+        'ServiceKey': api_key,
+        'returnType': 'json',
+        'pageNo': str(page_no),
+        'numOfRows': str(num_of_rows)
+    }
+    response = http_client.get(CERTIMG_API_URL, params=params)
+    response.raise_for_status()
+    body = response.json().get("body", {})
+    items = [entry.get("item", entry) for entry in body.get("items", []) or []]
+    return items, int(body.get("totalCount", 0) or 0)
+
+
+def sync_c005(store, api_key, page_size=C005_PAGE_SIZE, max_pages=None):
+    """
+    C005를 마지막으로 저장한 위치부터 끝까지 페이지 단위로 받아 저장합니다. (다시 받을 때가 되었으면 처음부터)
+    반환: 이번에 저장한 행 수
+    """
+    next_index, restarted = store.begin_sync("c005")
+    if restarted:
+        print("C005: 마지막 전체 동기화 후 다시 받을 때가 되어 처음부터 받습니다.")
+    saved = 0
+    pages = 0
+
+    while max_pages is None or pages < max_pages:
+        rows, total = fetch_c005_page(api_key, next_index, next_index + page_size - 1)
+        # 끝까지 받은 뒤 추가된 행이 없으면 빈 응답의 전체 행 수(0)로 덮어쓰지 않음
+        if not rows:
+            break
+        products = [
+            (row["BAR_CD"], row.get("PRDLST_REPORT_NO", ""), row.get("PRDLST_NM"))
+            for row in rows if row.get("BAR_CD") and row.get("PRDLST_REPORT_NO")
+        ]
+        next_index += len(rows)
+        store.save_page("c005", products, [], next_index, total)
+        saved += len(products)
+        pages += 1
+        print(f"C005: {next_index - 1}/{total}행")
+
+        if next_index > total:
+            break
+    return saved
+
+
+def sync_certimg(store, api_key, page_size=CERTIMG_PAGE_SIZE, max_pages=None):
+    """
+    CertImgListServiceV3를 마지막으로 저장한 페이지부터 끝까지 받아 저장합니다. (다시 받을 때가 되었으면 처음부터)
+    반환: 이번에 저장한 행 수
+    """
+    next_index, restarted = store.begin_sync("certimg")
+    if restarted:
+        print("CertImgListServiceV3: 마지막 전체 동기화 후 다시 받을 때가 되어 처음부터 받습니다.")
+    saved = 0
+    pages = 0
+
+    while max_pages is None or pages < max_pages:
+        # 저장 위치는 행 번호로 기록하고, 페이지 번호는 그로부터 계산
+        page_no = (next_index - 1) // page_size + 1
+        items, total = fetch_certimg_page(api_key, page_no, page_size)
+        if not items:
+            break
+        details = [
+            (item["prdlstReportNo"], item.get("prdlstNm"), item.get("nutrient"),
+             item.get("allergy"), item.get("rawmtrl"))
+            for item in items if item.get("prdlstReportNo")
+        ]
+        # 바코드가 기재된 항목은 바코드 색인에도 추가 (대부분 '알수없음')
+        products = [
+            (item["barcode"], item["prdlstReportNo"], item.get("prdlstNm"))
+            for item in items if item.get("prdlstReportNo") and str(item.get("barcode", "")).isdigit()
+        ]
+        next_index = (page_no - 1) * page_size + len(items) + 1
+        store.save_page("certimg", products, details, next_index, total)
+        saved += len(details)
+        pages += 1
+        print(f"CertImgListServiceV3: {next_index - 1}/{total}행")
+
+        if len(items) < page_size or next_index > total:
+            break
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="제품 데이터 로컬 저장소")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="API에서 제품 데이터를 받아 저장")
+    sync_parser.add_argument("--source", choices=["c005", "certimg", "all"], default="all")
+    sync_parser.add_argument("--full", action="store_true", help="다시 받을 때가 되지 않았어도 저장된 위치를 무시하고 처음부터 동기화")
+    sync_parser.add_argument("--max-pages", type=int, default=None, help="이번 실행에서 받을 최대 페이지 수")
+    subparsers.add_parser("stats", help="저장된 행 수와 동기화 위치 출력")
+    args = parser.parse_args()
+
+    store = ProductStore()
+
+    if args.command == "stats":
+        print(store.stats())
+        return
+
+    sources = ["c005", "certimg"] if args.source == "all" else [args.source]
+    for source in sources:
+        if args.full:
+            store.reset_sync_state(source)
+        if source == "c005":
+            saved = sync_c005(store, os.getenv('API_KEY_NAME'), max_pages=args.max_pages)
+        else:
+            saved = sync_certimg(store, os.getenv('API_KEY_DETAIL'), max_pages=args.max_pages)
+        print(f"{source}: {saved}행 저장")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# risk_levels.py
+import re
+from enum import Enum
+
+
+class RiskLevel(str, Enum):
+    """
+    allergy_info.risk_level에 저장하는 표준 위험 수준
+    str을 상속하므로 문자열과 바로 비교하거나 JSON으로 저장할 수 있습니다.
+    """
+    HIGH_RISK = "High Risk Group"
+    RISK = "Risk Group"
+    CAUTION = "Caution Group"
+
+
+# 관리 화면에 표시하는 한국어 이름
+KOREAN_NAMES = {
+    RiskLevel.HIGH_RISK: "고위험",
+    RiskLevel.RISK: "위험",
+    RiskLevel.CAUTION: "주의",
+}
+
+
+def _alias_key(text):
+    # 대소문자, 공백, 구분 기호를 무시하고 비교 ('High risk group' == 'High Risk Group' == 'HIGH_RISK_GROUP')
+    return re.sub(r"[\W_]+", "", str(text)).lower()
+
+
+_ALIASES = {}
+for _level in RiskLevel:
+    for _alias in (_level.value, _level.name, KOREAN_NAMES[_level]):
+        _ALIASES[_alias_key(_alias)] = _level
+
+
+def normalize_risk_level(value):
+    """
+    저장된 값이나 입력값을 RiskLevel로 변환합니다. (예: 'High risk group', '고위험')
+    알 수 없는 값이면 None을 반환합니다.
+    """
+    if isinstance(value, RiskLevel):
+        return value
+    if value is None:
+        return None
+    return _ALIASES.get(_alias_key(value))
@@ -0,0 +1,401 @@
+# scan_log.py
+"""
+스캔 기록과 자주 스캔되는 제품의 캐시 미리 채우기
+
+스캔할 때마다 바코드, 시각, 단계별 소요 시간, 캐시 적중 여부를 scan_log.jsonl에 한 줄씩 덧붙이고,
+compact()가 기록을 바코드별 스캔 횟수(scan_counts.json)로 합친 뒤 기록 파일을 비웁니다.
+횟수는 SCAN_COUNTS_HALF_LIFE_DAYS마다 절반으로 줄여 최근에 많이 스캔된 제품이 위로 올라오게 합니다.
+프로그램을 시작할 때(또는 일정 간격으로) 상위 N개 바코드의 제품 정보, 성분 정보, 안내 음성을
+백그라운드에서 미리 준비하므로 재시작 후 첫 손님부터 캐시를 사용합니다.
+
+사용법:
+    python scan_log.py compact                # 기록을 스캔 횟수로 합치기
+    python scan_log.py top --limit 20         # 많이 스캔된 바코드
+    python scan_log.py prewarm --top 200      # 상위 200개 캐시 미리 채우기 (예: 개점 전 cron)
+
+기록 한 줄 예: {"t":1760000000.1,"b":"8801234567890","c":"hit","ms":{"barcode_api":0.4,...}}
+    c: 제품/성분 정보 캐시 적중 여부 (hit: 둘 다, partial: 하나만, miss: 둘 다 없음), e: 스캔 실패 사유
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import metrics
+from product_cache import BARCODE, REPORT_NO
+from file_utils import atomic_write
+
+# 환경 변수 로드
+load_dotenv()
+
+SCAN_LOG_PATH = os.getenv('SCAN_LOG_PATH', 'scan_log.jsonl')
+SCAN_COUNTS_PATH = os.getenv('SCAN_COUNTS_PATH', 'scan_counts.json')
+COUNTS_HALF_LIFE_DAYS = float(os.getenv('SCAN_COUNTS_HALF_LIFE_DAYS', 14))
+COUNTS_MAX_ENTRIES = int(os.getenv('SCAN_COUNTS_MAX_ENTRIES', 50000))
+COMPACT_BYTES = int(os.getenv('SCAN_LOG_COMPACT_BYTES', 4 * 1024 * 1024))  # 기록이 이보다 커지면 자동으로 합침
+PREWARM_TOP = int(os.getenv('SCAN_PREWARM_TOP', 200))
+PREWARM_WORKERS = int(os.getenv('SCAN_PREWARM_WORKERS', 4))
+PREWARM_INTERVAL = float(os.getenv('SCAN_PREWARM_INTERVAL', 0))  # 초, 0이면 시작할 때 한 번만
+
+
+def cache_outcome(cache_hits):
+    """
+    {BARCODE: 적중 여부, REPORT_NO: 적중 여부} -> 'hit' | 'partial' | 'miss'
+    """
+    hits = [hit for hit in (cache_hits.get(BARCODE), cache_hits.get(REPORT_NO)) if hit is not None]
+    if hits and all(hits):
+        return "hit"
+    return "partial" if any(hits) else "miss"
+
+
+def make_record(result):
+    """
+    ScanResult를 기록 한 줄(딕셔너리)로 만듭니다.
+    """
+    record = {
+        "t": round(time.time(), 1),
+        "b": result.barcode,
+        "c": cache_outcome(result.cache_hits),
+        "ms": {stage: round(seconds * 1000, 1) for stage, seconds in result.timings.items()},
+    }
+    if result.error:
+        record["e"] = result.error
+    return record
+
+
+class ScanLog:
+    """
+    덧붙이기만 하는 스캔 기록 파일과 바코드별 스캔 횟수
+    기록 한 줄은 한 번의 write로 쓰므로 여러 스레드가 함께 써도 줄이 섞이지 않습니다.
+    counts()는 합친 횟수를 파일이 바뀐 경우에만 다시 읽고, 기록 파일은 지난번에 읽은 위치 뒤에 덧붙은 줄만 읽습니다.
+    """
+
+    def __init__(self, path=SCAN_LOG_PATH, counts_path=SCAN_COUNTS_PATH,
+                 half_life_days=COUNTS_HALF_LIFE_DAYS, compact_bytes=COMPACT_BYTES):
+        self.path = path
+        self.counts_path = counts_path
+        self.half_life = half_life_days * 24 * 3600
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        # counts()가 이어서 읽는 상태 (합친 횟수 파일, 기록 파일과 읽은 위치, 아직 합치지 않은 횟수)
+        self._counts_lock = threading.Lock()
+        self._base_id = None
+        self._base = ({}, time.time())
+        self._log_id = None
+        self._offset = 0
+        self._pending = {}
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+                size = file.tell()
+        if self.compact_bytes and size > self.compact_bytes:
+            self.compact()
+
+    def record(self, result):
+        """
+        스캔 결과를 기록합니다. 안내 음성이 아직 준비 중이면 모두 준비된 뒤(음성 단계 소요 시간 포함) 기록합니다.
+        """
+        futures = result.audio_futures()
+        if not futures:
+            self.append(make_record(result))
+            return
+
+        remaining = [len(futures)]
+        remaining_lock = threading.Lock()
+
+        def done(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                try:
+                    self.append(make_record(result))
+                except Exception as e:
+                    print(f"스캔 기록 중 오류 발생: {e}")
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def _load_counts(self):
+        """
+        반환: (바코드별 횟수, 합친 시각, 이미 합친 .compacting 파일 이름 목록)
+        """
+        try:
+            with open(self.counts_path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}, time.time(), []
+        return data.get("counts", {}), data.get("updated_at", time.time()), data.get("applied", [])
+
+    def _decay(self, counts, since, now):
+        # 마지막으로 합친 뒤 지난 시간만큼 반감기에 따라 줄임
+        if not self.half_life or now <= since:
+            return counts
+        factor = 0.5 ** ((now - since) / self.half_life)
+        return {barcode: count * factor for barcode, count in counts.items()}
+
+    def _compacting_files(self):
+        # 이 프로세스가 방금 만든 것과 이전에 중단된 합치기가 남긴 것 모두
+        return sorted(glob.glob(f"{glob.escape(self.path)}.*.compacting"))
+
+    def _read_records(self, path):
+        try:
+            with open(path, encoding="utf-8") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # 중단되어 덜 쓰인 마지막 줄 등
+                continue
+        return records
+
+    def compact(self):
+        """
+        기록 파일을 바코드별 스캔 횟수에 합치고 비웁니다. 반환: 합친 기록 수
+        이전에 중단되어 남은 .compacting 파일도 함께 합칩니다. 합친 파일 이름을 횟수와 같은 파일에 함께 저장하므로
+        파일을 지우기 전에 중단되어도 다음 합치기에서 다시 세지 않고 지우기만 합니다.
+        """
+        with self._lock:
+            # 이름을 바꾼 뒤 읽으므로 그 사이에 들어오는 기록은 새 파일에 쌓임
+            # (프로세스 번호는 다시 쓰일 수 있으므로 시각도 함께 넣어 이전에 남은 파일과 겹치지 않게 함)
+            compacting = f"{self.path}.{os.getpid()}-{time.time_ns()}.compacting"
+            try:
+                os.replace(self.path, compacting)
+            except FileNotFoundError:
+                pass
+            files = self._compacting_files()
+            applied = set(self._load_counts()[2])
+        if not files:
+            return 0
+
+        records = {path: self._read_records(path) for path in files if os.path.basename(path) not in applied}
+        now = time.time()
+        with self._lock:
+            counts, updated_at, applied = self._load_counts()
+            applied = set(applied)
+            counts = self._decay(counts, updated_at, now)
+            folded = 0
+            for path, file_records in records.items():
+                name = os.path.basename(path)
+                # 다른 프로세스가 그 사이에 합친 파일
+                if name in applied:
+                    continue
+                for record in file_records:
+                    if record.get("e") or not record.get("b"):
+                        continue
+                    counts[record["b"]] = counts.get(record["b"], 0) + 1
+                folded += len(file_records)
+                applied.add(name)
+            # 너무 많아지면 횟수가 적은 바코드부터 버림
+            if len(counts) > COUNTS_MAX_ENTRIES:
+                counts = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True)[:COUNTS_MAX_ENTRIES])
+            # 이미 지워진 파일의 이름은 다시 쓰이지 않으므로 남아 있는 파일의 이름만 유지
+            remaining = {os.path.basename(path) for path in files}
+            data = {
+                "updated_at": now,
+                "counts": {barcode: round(count, 3) for barcode, count in counts.items()},
+                "applied": sorted(applied & remaining),
+            }
+            atomic_write(self.counts_path, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        for path in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return folded
+
+    def _base_counts(self):
+        # 합친 횟수 파일은 바뀐 경우에만 다시 읽음 (다른 프로세스가 합친 경우 포함)
+        try:
+            stat = os.stat(self.counts_path)
+            base_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            base_id = None
+        if base_id != self._base_id:
+            counts, updated_at, _ = self._load_counts()
+            self._base = (counts, updated_at)
+            self._base_id = base_id
+        return self._base
+
+    def _pending_counts(self):
+        # 아직 합치지 않은 기록은 지난번에 읽은 위치 뒤에 덧붙은 줄만 읽어 이어서 셈
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            self._log_id, self._offset, self._pending = None, 0, {}
+            return self._pending
+        with file:
+            stat = os.fstat(file.fileno())
+            log_id = (stat.st_dev, stat.st_ino)
+            if log_id != self._log_id or stat.st_size < self._offset:
+                # 합치기로 기록 파일이 바뀐 경우 처음부터 다시 셈
+                self._log_id, self._offset, self._pending = log_id, 0, {}
+            file.seek(self._offset)
+            data = file.read()
+        # 덜 쓰인 마지막 줄은 다음에 읽음
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not record.get("e") and record.get("b"):
+                self._pending[record["b"]] = self._pending.get(record["b"], 0) + 1
+        self._offset += end
+        return self._pending
+
+    def counts(self):
+        """
+        바코드별 스캔 횟수 (반감기를 적용한 값, 아직 합치지 않은 기록 포함)
+        """
+        with self._counts_lock:
+            counts, updated_at = self._base_counts()
+            counts = dict(self._decay(counts, updated_at, time.time()))
+            for barcode, count in self._pending_counts().items():
+                counts[barcode] = counts.get(barcode, 0) + count
+        return counts
+
+    def top_barcodes(self, limit=PREWARM_TOP):
+        """
+        스캔 횟수가 많은 순으로 바코드 limit개를 반환합니다.
+        """
+        counts = self.counts()
+        return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+
+_scan_log = None
+_scan_log_lock = threading.Lock()
+
+
+def get_scan_log():
+    """
+    프로세스 전체에서 공유하는 스캔 기록을 반환합니다. SCAN_LOG_PATH가 빈 문자열이면 None (기록하지 않음)
+    """
+    global _scan_log
+    if _scan_log is None and SCAN_LOG_PATH:
+        with _scan_log_lock:
+            if _scan_log is None:
+                _scan_log = ScanLog()
+    return _scan_log
+
+
+def record_scan(result):
+    scan_log = get_scan_log()
+    if scan_log is None:
+        return
+    try:
+        scan_log.record(result)
+    except Exception as e:
+        print(f"스캔 기록 중 오류 발생: {e}")
+
+
+def prewarm_barcode(barcode, api_key_name, api_key_detail, tts=True):
+    """
+    바코드 하나의 제품 정보, 성분 정보를 캐시에 채우고 tts=True이면 제품 안내와 알레르기 경고 안내 음성도 준비합니다.
+    반환: 준비했으면 True
+    """
+    from product_info import get_product_info_by_barcode, get_nutrition_info_by_report_no
+    from allergen_matcher import find_allergens
+    from ttsAdvanced import prepare_product_info
+    from announcement import prepare_announcement
+
+    product_info = get_product_info_by_barcode(barcode, api_key_name)
+    if product_info is None:
+        return False
+    product_name = product_info.get("PRDLST_NM", "이름 정보 없음")
+    detail_info = get_nutrition_info_by_report_no(product_info.get("PRDLST_REPORT_NO", "번호 없음"), api_key_detail)
+    if detail_info is None:
+        return False
+    if tts:
+        prepare_product_info(product_name, detail_info.get("nutrient", {}))
+        allergens = find_allergens(detail_info.get("allergy", "알레르기 정보 없음"), detail_info.get("rawmtrl", ""))
+        if allergens:
+            prepare_announcement(allergens)
+    return True
+
+
+def prewarm(api_key_name, api_key_detail, top=PREWARM_TOP, workers=PREWARM_WORKERS, tts=True, scan_log=None):
+    """
+    많이 스캔된 바코드 top개를 workers개 스레드로 미리 준비합니다. 반환: 준비한 바코드 수
+    """
+    scan_log = scan_log or get_scan_log()
+    if scan_log is None:
+        return 0
+    barcodes = scan_log.top_barcodes(top)
+    if not barcodes:
+        return 0
+
+    warmed = 0
+    with metrics.span("scan_prewarm"), ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(prewarm_barcode, barcode, api_key_name, api_key_detail, tts) for barcode in barcodes]
+        for future in futures:
+            try:
+                warmed += bool(future.result())
+            except Exception as e:
+                print(f"캐시 미리 채우기 중 오류 발생: {e}")
+    metrics.increment("scan_prewarmed", warmed)
+    print(f"자주 스캔되는 제품 {warmed}/{len(barcodes)}개 캐시 준비 완료")
+    return warmed
+
+
+def start_prewarm(api_key_name, api_key_detail, top=PREWARM_TOP, interval=PREWARM_INTERVAL, tts=True):
+    """
+    백그라운드 스레드에서 캐시를 미리 채웁니다. interval(초)이 0보다 크면 그 간격마다 기록을 합치고 다시 채웁니다.
+    """
+    def run():
+        while True:
+            try:
+                prewarm(api_key_name, api_key_detail, top, tts=tts)
+            except Exception as e:
+                print(f"캐시 미리 채우기 중 오류 발생: {e}")
+            if interval <= 0:
+                return
+            time.sleep(interval)
+            scan_log = get_scan_log()
+            if scan_log is not None:
+                scan_log.compact()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스캔 기록과 캐시 미리 채우기")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("compact", help="기록을 바코드별 스캔 횟수로 합치기")
+    top_parser = subparsers.add_parser("top", help="많이 스캔된 바코드 출력")
+    top_parser.add_argument("--limit", type=int, default=20)
+    prewarm_parser = subparsers.add_parser("prewarm", help="많이 스캔된 제품의 캐시 미리 채우기")
+    prewarm_parser.add_argument("--top", type=int, default=PREWARM_TOP)
+    prewarm_parser.add_argument("--workers", type=int, default=PREWARM_WORKERS)
+    prewarm_parser.add_argument("--no-tts", action="store_true", help="안내 음성은 준비하지 않음")
+    args = parser.parse_args()
+
+    scan_log = ScanLog()
+    if args.command == "compact":
+        print(f"기록 {scan_log.compact()}줄을 스캔 횟수에 합쳤습니다.")
+    elif args.command == "top":
+        counts = scan_log.counts()
+        for barcode in scan_log.top_barcodes(args.limit):
+            print(f"{barcode}\t{counts[barcode]:.1f}")
+    else:
+        scan_log.compact()
+        prewarm(os.getenv('API_KEY_NAME'), os.getenv('API_KEY_DETAIL'), args.top, args.workers,
+                tts=not args.no_tts, scan_log=scan_log)
+
+
+if __name__ == "__main__":
+    main()
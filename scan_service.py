@@ -0,0 +1,266 @@
+# scan_service.py
+"""
+여러 계산대가 함께 사용하는 상주 스캔 서비스
+
+한 프로세스가 HTTP 세션, Supabase 클라이언트, 알레르기 성분 스냅샷, 제품/음성 캐시를 계속 유지하므로
+계산대마다 시작 비용을 다시 들이지 않습니다.
+여러 계산대에서 같은 바코드를 동시에 조회하면 API 요청과 음성 합성은 한 번만 합니다. (singleflight.py)
+
+사용법:
+    python scan_service.py --port 8765
+    python scan_service.py --unix-socket /tmp/scan_service.sock
+    python scan_service.py --port 8765 --play    # 서비스가 실행 중인 컴퓨터에서 안내 음성 재생 (계산대 한 곳)
+
+요청:
+    GET /scan?barcode=8801234567890&lane=1    -> 스캔 결과 JSON (audio=0이면 안내 음성 준비를 기다리지 않음)
+    GET /scan?barcode=...&profile=땅콩,우유    -> 고객 알레르기 프로필과 비교한 결과(profile_conflicts) 포함
+                                                 (알 수 없는 성분은 비교하지 않고 profile_unknown으로 돌려줌)
+    GET /health                               -> 상태와 캐시 통계
+
+스캔마다 scan_log.jsonl에 기록하고, 시작할 때 자주 스캔되는 제품의 캐시를 백그라운드에서 미리 채웁니다.
+SCAN_PREWARM_INTERVAL(초)을 지정하면 그 간격마다 기록을 합치고 다시 채웁니다. (scan_log.py)
+    curl --unix-socket /tmp/scan_service.sock "http://localhost/scan?barcode=8801234567890"
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlparse, parse_qs
+
+from dotenv import load_dotenv
+
+import metrics
+from scanner import scan_barcode, warm_up
+from allergen_profiles import AllergenProfile
+from risk_levels import normalize_risk_level
+from scan_log import record_scan, start_prewarm, PREWARM_TOP
+
+# 환경 변수 로드
+load_dotenv()
+
+SERVICE_HOST = os.getenv('SCAN_SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.getenv('SCAN_SERVICE_PORT', 8765))
+SERVICE_WORKERS = int(os.getenv('SCAN_SERVICE_WORKERS', 8))
+AUDIO_TIMEOUT = float(os.getenv('SCAN_SERVICE_AUDIO_TIMEOUT', 30))  # 안내 음성 준비를 기다리는 최대 시간 (초)
+
+
+def _audio_paths(future, timeout):
+    # 준비된 음성 파일 경로 목록 (실패하거나 시간 안에 준비되지 않으면 None)
+    try:
+        sources = future.result(timeout=timeout)
+    except Exception:
+        return None
+    return [getattr(source, "path", source) for source in sources]
+
+
+class ScanService:
+    """
+    계산대 요청을 처리하는 스캔 서비스
+    작업 풀과 (있으면) 재생기를 프로세스 전체에서 하나만 두고 모든 요청이 함께 사용합니다.
+    """
+
+    def __init__(self, api_key_name, api_key_detail, workers=SERVICE_WORKERS, player=None):
+        self.api_key_name = api_key_name
+        self.api_key_detail = api_key_detail
+        self.player = player
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.started_at = time.time()
+        self.scans = 0
+        self._lock = threading.Lock()
+
+    def scan(self, barcode, lane=None, wait_audio=True, profile=None):
+        """
+        바코드 하나를 스캔하고 결과를 JSON으로 보낼 수 있는 딕셔너리로 반환합니다.
+        wait_audio=True이면 안내 음성 파일이 준비될 때까지 기다려 경로를 함께 돌려줍니다.
+        profile(AllergenProfile)이 주어지면 고객 프로필과 비교한 결과도 돌려줍니다.
+        """
+        with self._lock:
+            self.scans += 1
+
+        with metrics.span("scan_request", lane=lane or ""):
+            result = scan_barcode(
+                barcode, self.api_key_name, self.api_key_detail, self.executor,
+                self.player, stream=self.player is not None, profile=profile
+            )
+            record_scan(result)
+
+            response = {
+                "barcode": result.barcode,
+                "lane": lane,
+                "error": result.error,
+                "product_name": result.product_name,
+                "report_no": result.report_no,
+                "nutrient": result.nutrient,
+                "allergy": result.allergy,
+                "has_allergy_info": result.has_allergy_info,
+                "allergens": [
+                    {"allergen": allergen, "risk_level": normalize_risk_level(risk_level) or risk_level}
+                    for allergen, risk_level in result.allergens.items()
+                ],
+                "allergen_error": str(result.allergen_error) if result.allergen_error is not None else None,
+                "profile_conflicts": result.profile_conflicts,
+                "profile_unknown": profile.unknown if profile is not None else None,
+            }
+
+            if wait_audio and result.product_audio is not None:
+                # 재생기가 있으면 스트리밍 중인 제품 안내는 재생이 끝난 뒤에야 경로가 정해지므로 None일 수 있음
+                deadline = time.monotonic() + AUDIO_TIMEOUT
+                response["audio"] = {
+                    "product": _audio_paths(result.product_audio, max(0, deadline - time.monotonic())),
+                    "allergens": (
+                        _audio_paths(result.allergen_audio, max(0, deadline - time.monotonic()))
+                        if result.allergen_audio is not None else []
+                    )
+                }
+
+        response["timings_ms"] = {stage: round(seconds * 1000, 1) for stage, seconds in result.timings.items()}
+        return response
+
+    def health(self):
+        from product_cache import get_product_cache
+        from tts_cache import get_tts_cache
+        from db_utils import get_allergen_snapshot, AllergenSnapshotUnavailableError
+        from http_client import breaker_states
+
+        try:
+            allergens = len(get_allergen_snapshot().get())
+        except AllergenSnapshotUnavailableError:
+            allergens = None  # 알레르기 정보를 아직 한 번도 읽지 못함
+
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "scans": self.scans,
+            "allergens": allergens,
+            "product_cache": get_product_cache().stats(),
+            "tts_cache": get_tts_cache().stats(),
+            "circuit_breakers": breaker_states(),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.player is not None:
+            self.player.close(wait=True)
+
+
+class ScanRequestHandler(BaseHTTPRequestHandler):
+    # GET /scan?barcode=...&lane=...&audio=0|1, GET /health
+    service = None
+
+    def log_message(self, format, *args):
+        metrics.debug("scan_service:", format % args)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+
+        if parsed.path == "/health":
+            self.send_json(200, self.service.health())
+            return
+        if parsed.path != "/scan":
+            self.send_json(404, {"error": "unknown endpoint"})
+            return
+
+        # 바코드 검증 (숫자만 허용)
+        barcode = query.get("barcode", "").strip()
+        if not barcode.isdigit():
+            self.send_json(400, {"error": "invalid_barcode", "message": "유효한 바코드를 입력해주세요. (숫자만 허용)"})
+            return
+
+        try:
+            profile = AllergenProfile.from_string(query["profile"]) if query.get("profile") else None
+            response = self.service.scan(barcode, query.get("lane"), query.get("audio", "1") != "0", profile)
+        except Exception as e:
+            print(f"스캔 처리 중 오류 발생: {e}")
+            self.send_json(500, {"error": "scan_failed", "message": str(e)})
+            return
+        self.send_json(200, response)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler가 client_address[0]을 사용하므로 주소를 튜플로 맞춤
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT, unix_socket=None):
+    """
+    서비스용 HTTP 서버를 만듭니다. unix_socket이 주어지면 TCP 대신 Unix 소켓에서 요청을 받습니다.
+    """
+    handler = type("BoundScanRequestHandler", (ScanRequestHandler,), {"service": service})
+    if unix_socket:
+        # 이전 실행에서 남은 소켓 파일 정리
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _stop(signum, frame):
+    # 서비스 관리자(systemd 등)가 보내는 SIGTERM도 Ctrl+C와 같이 정리 후 종료
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="여러 계산대가 함께 사용하는 상주 스캔 서비스")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--unix-socket", help="TCP 대신 사용할 Unix 소켓 경로")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="조회/음성 합성 작업 스레드 수")
+    parser.add_argument("--play", action="store_true", help="서비스가 실행 중인 컴퓨터에서 안내 음성 재생")
+    parser.add_argument("--no-warmup", action="store_true", help="시작할 때 음성 캐시와 자주 스캔되는 제품의 캐시를 미리 준비하지 않음")
+    args = parser.parse_args()
+
+    # METRICS_PORT가 지정되어 있으면 /metrics 엔드포인트 시작
+    metrics.serve_from_env()
+
+    player = None
+    if args.play:
+        from audio_player import AudioPlayer
+        player = AudioPlayer()
+
+    service = ScanService(os.getenv('API_KEY_NAME'), os.getenv('API_KEY_DETAIL'), args.workers, player)
+    # 첫 요청이 시작 비용을 기다리지 않도록 연결, 스냅샷, 캐시를 미리 준비
+    warm_up(tts=not args.no_warmup and os.getenv('TTS_WARMUP', '1') != '0')
+    if not args.no_warmup and PREWARM_TOP > 0:
+        start_prewarm(service.api_key_name, service.api_key_detail)
+
+    server = make_server(service, args.host, args.port, args.unix_socket)
+    if args.unix_socket:
+        print(f"스캔 서비스 시작: {args.unix_socket}")
+    else:
+        print(f"스캔 서비스 시작: http://{args.host}:{server.server_port}/scan?barcode=")
+
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
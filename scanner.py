@@ -0,0 +1,197 @@
+# scanner.py
+"""
+바코드 하나를 스캔하는 흐름 (제품 조회 -> 성분 정보 조회 -> 알레르기 성분 검사 -> 안내 음성 준비)
+main4.py의 대화형 스캔과 benchmarks/scan_latency.py가 함께 사용합니다.
+"""
+import threading
+import time
+from concurrent.futures import wait
+
+from product_info import get_product_info_by_barcode, get_nutrition_info_by_report_no
+from allergen_matcher import find_allergens
+from allergen_profiles import get_product_bits
+from ttsAdvanced import prepare_product_info
+from announcement import plan_announcement, announcement_priority, prepare_announcement
+from audio_player import PRIORITY_PRODUCT
+from product_cache import get_product_cache, BARCODE, REPORT_NO
+
+# 단계 이름 (ScanResult.timings의 키, 값은 초)
+STAGE_BARCODE_API = "barcode_api"  # 바코드 -> 제품 정보
+STAGE_NUTRITION_API = "nutrition_api"  # 제품 번호 -> 성분 정보 (파싱 포함)
+STAGE_ALLERGEN_MATCH = "allergen_match"  # 등록된 알레르기 성분 검사
+STAGE_PRODUCT_TTS = "product_tts"  # 제품 안내 음성 준비
+STAGE_ALLERGEN_TTS = "allergen_tts"  # 알레르기 경고 안내 음성 준비 (모든 성분을 위험도별로 묶은 안내 하나)
+STAGE_FIRST_WARNING = "first_warning"  # 스캔 시작 -> 알레르기 경고 안내 음성 준비 완료
+STAGE_AUDIO_READY = "audio_ready"  # 스캔 시작 -> 모든 안내 음성 준비 완료
+
+# 스캔 실패 사유
+SCAN_PRODUCT_NOT_FOUND = "product_not_found"
+SCAN_NUTRITION_NOT_FOUND = "nutrition_not_found"
+
+
+class ScanResult:
+    """
+    바코드 하나의 스캔 결과와 단계별 소요 시간
+    안내 음성은 작업 풀에서 계속 준비되므로 product_audio와 allergen_audio의 음성은 Future로 들어 있습니다.
+    allergen_audio는 모든 알레르기 경고를 위험도별 문장으로 묶은 안내 하나입니다. (announcement.py)
+    """
+
+    def __init__(self, barcode):
+        self.barcode = barcode
+        self.error = None
+        self.product_name = None
+        self.report_no = None
+        self.nutrient = {}
+        self.allergy = "알레르기 정보 없음"
+        self.rawmtrl = ""
+        self.allergens = {}
+        self.allergen_error = None
+        self.profile_conflicts = None  # 고객 프로필의 성분 중 제품에 들어 있는 것 (프로필이 없으면 None)
+        self.cache_hits = {}  # {BARCODE: 적중 여부, REPORT_NO: 적중 여부} 조회 전 제품 캐시에 있었는지 (scan_log.py)
+        self.product_audio = None
+        self.allergen_audio = None  # 알레르기 경고 안내 Future (검출된 성분이 없으면 None)
+        self.timings = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def has_allergy_info(self):
+        return not (self.allergy == "알레르기 정보 없음" and not self.rawmtrl)
+
+    def record(self, stage, elapsed, earliest=False):
+        """
+        단계 소요 시간을 기록합니다. 같은 단계가 여러 번 기록되면 가장 긴 값(earliest=True이면 가장 짧은 값)을 남깁니다.
+        """
+        with self._lock:
+            previous = self.timings.get(stage)
+            if previous is None or (elapsed < previous if earliest else elapsed > previous):
+                self.timings[stage] = elapsed
+
+    def audio_futures(self):
+        return [future for future in (self.product_audio, self.allergen_audio) if future is not None]
+
+    def wait_audio(self, timeout=None):
+        """
+        모든 안내 음성이 준비될 때까지 기다립니다.
+        """
+        wait(self.audio_futures(), timeout=timeout)
+
+
+def warm_up(tts=True):
+    """
+    무거운 SDK(requests, supabase, boto3)를 불러오고 HTTP 세션, Supabase 클라이언트, 알레르기 성분 스냅샷,
+    캐시를 미리 준비합니다. tts=True이면 등록된 알레르기 성분과 위험도 메시지 음성도 미리 합성합니다.
+    main4.py는 입력을 기다리는 동안 백그라운드 스레드에서, scan_service.py는 요청을 받기 전에 호출합니다.
+    """
+    from http_client import get_session
+    from db_utils import init_supabase, get_allergen_snapshot
+    from allergen_matcher import get_allergen_matcher
+    from product_cache import get_product_cache
+    from ttsAdvanced import get_polly_client, warm_up_tts_cache
+
+    try:
+        get_session()
+        get_product_cache()
+        init_supabase()
+        get_allergen_snapshot().get()
+        get_allergen_matcher()
+        get_polly_client()
+        if tts:
+            warm_up_tts_cache()
+    except Exception as e:
+        print(f"스캔 준비 중 오류 발생: {e}")
+
+
+def _run_timed(result, stage, function, *args):
+    # 작업 풀에서 실행되는 단계의 소요 시간을 결과를 돌려주기 전에 기록
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        end = time.perf_counter()
+        result.record(stage, end - start)
+        if stage in (STAGE_PRODUCT_TTS, STAGE_ALLERGEN_TTS):
+            result.record(STAGE_AUDIO_READY, end - result.started)
+        if stage == STAGE_ALLERGEN_TTS:
+            result.record(STAGE_FIRST_WARNING, end - result.started, earliest=True)
+
+
+def scan_barcode(barcode, api_key_name, api_key_detail, executor, player=None, stream=True, profile=None):
+    """
+    바코드 하나를 스캔하고 ScanResult를 반환합니다.
+    알레르기 성분 검사와 제품 안내 음성 합성은 executor에서 동시에 진행하고,
+    player가 주어지면 준비되는 음성을 위험도 순으로 재생 대기열에 추가합니다.
+    stream=False이면 새로 합성하는 제품 안내도 끝까지 받아 캐시에 저장한 파일 경로로 돌려줍니다. (직접 재생하지 않는 경우)
+    profile(AllergenProfile)이 주어지면 제품 비트셋과 비교한 결과를 profile_conflicts에 담습니다.
+    """
+    result = ScanResult(barcode)
+
+    cache = get_product_cache()
+
+    # 1. 바코드를 통해 제품 정보 가져오기
+    result.cache_hits[BARCODE] = cache.contains(BARCODE, barcode)
+    start = time.perf_counter()
+    product_info = get_product_info_by_barcode(barcode, api_key_name)
+    result.record(STAGE_BARCODE_API, time.perf_counter() - start)
+    if product_info is None:
+        result.error = SCAN_PRODUCT_NOT_FOUND
+        return result
+
+    result.product_name = product_info.get("PRDLST_NM", "이름 정보 없음")
+    result.report_no = product_info.get("PRDLST_REPORT_NO", "번호 없음")
+
+    # 2. 제품 번호를 이용하여 (알러지 & 영양 정보) 가져오기
+    result.cache_hits[REPORT_NO] = cache.contains(REPORT_NO, result.report_no)
+    start = time.perf_counter()
+    detail_info = get_nutrition_info_by_report_no(result.report_no, api_key_detail)
+    result.record(STAGE_NUTRITION_API, time.perf_counter() - start)
+    if detail_info is None:
+        result.error = SCAN_NUTRITION_NOT_FOUND
+        return result
+
+    result.nutrient = detail_info.get("nutrient", {})
+    result.allergy = detail_info.get("allergy", "알레르기 정보 없음")
+    result.rawmtrl = detail_info.get("rawmtrl", "")
+
+    # 입력이 준비되는 즉시 알레르기 성분 검사와 제품 안내 음성 합성을 동시에 시작
+    # (allergy와 원재료(rawmtrl)를 등록된 알레르기 성분과 한 번에 비교)
+    risk_future = None
+    if result.has_allergy_info:
+        risk_future = executor.submit(
+            _run_timed, result, STAGE_ALLERGEN_MATCH, find_allergens, result.allergy, result.rawmtrl
+        )
+    # 새로 합성하는 제품 안내는 받는 즉시 스트리밍으로 재생
+    result.product_audio = executor.submit(
+        _run_timed, result, STAGE_PRODUCT_TTS, prepare_product_info, result.product_name, result.nutrient, stream
+    )
+    if player is not None:
+        player.play(result.product_audio, PRIORITY_PRODUCT)
+
+    # 고객 프로필은 등록된 성분과 관계없이 전체 어휘로 찾은 제품 비트셋과 비교
+    if profile is not None:
+        product_bits = get_product_bits(result.report_no, result.allergy, result.rawmtrl)
+        result.profile_conflicts = profile.conflicts(product_bits)
+
+    if risk_future is None:
+        return result
+
+    # 데이터베이스에 등록된 알레르기 성분과 비교
+    try:
+        result.allergens = risk_future.result()
+    except Exception as e:
+        result.allergen_error = e
+        return result
+
+    if not result.allergens:
+        return result
+
+    # 제품 안내가 재생되는 동안 모든 경고를 위험도별로 묶은 안내 하나를 준비하고,
+    # 가장 높은 위험도의 우선순위로 대기열에 추가 (고위험 경고는 재생 중인 제품 안내보다 먼저 재생됨)
+    result.allergen_audio = executor.submit(
+        _run_timed, result, STAGE_ALLERGEN_TTS, prepare_announcement, result.allergens
+    )
+    if player is not None:
+        player.play(result.allergen_audio, announcement_priority(plan_announcement(result.allergens)))
+
+    return result
+
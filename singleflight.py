@@ -0,0 +1,48 @@
+# singleflight.py
+import threading
+from concurrent.futures import Future
+
+import metrics
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 호출을 하나로 합칩니다.
+    먼저 들어온 호출만 실제로 실행하고, 실행 중에 같은 키로 들어온 호출은 그 결과(또는 예외)를 함께 받습니다.
+    실행이 끝나면 키를 지우므로 결과를 보관하지는 않습니다. (보관은 캐시가 담당)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # 키 -> 실행 중인 호출의 Future
+
+    def do(self, key, function, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            metrics.increment("singleflight_shared", flight=self.name)
+            return future.result()
+
+        try:
+            result = function(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        """
+        현재 실행 중인 호출 수
+        """
+        with self._lock:
+            return len(self._calls)
@@ -1,57 +1,147 @@
-import boto3
 import os
-from playsound import playsound
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from risk_levels import RiskLevel, normalize_risk_level
+from tts_cache import get_tts_cache, make_cache_key
+from db_utils import get_all_allergens_risk_levels
+from nutrient_parser import format_nutrient
+from singleflight import SingleFlight
 
 
 aws_access_key: str = os.getenv('AWS_ACCESS_KEY')
 aws_secret_key: str = os.getenv('AWS_SECRET_KEY')
+# 로컬 대역 서버(devtools/fake_services.py) 등 다른 Polly 주소를 사용할 때 지정
+polly_endpoint_url = os.getenv('POLLY_ENDPOINT_URL') or None
+
+# Polly 음성 설정 (캐시 키에 포함됨)
+VOICE_ID = 'Seoyeon'
+ENGINE = 'neural'
+OUTPUT_FORMAT = 'mp3'
+LANGUAGE_CODE = 'ko-KR'
+
+# 위험 그룹 (위험도 메시지 미리 합성에 사용)
+RISK_LEVELS = list(RiskLevel)
+
+_polly_client = None
+_polly_lock = threading.Lock()
+
+# 같은 문장을 동시에 합성하지 않도록 캐시 키별로 요청을 합침 (여러 계산대에서 같은 제품을 스캔한 경우)
+_speech_flight = SingleFlight("tts")
+
+
+def get_polly_client():
+    """
+    프로세스 전체에서 공유하는 Polly 클라이언트를 반환합니다. (boto3 클라이언트는 스레드 간 공유 가능)
+    """
+    global _polly_client
+    if _polly_client is None:
+        with _polly_lock:
+            if _polly_client is None:
+                # boto3는 처음 합성할 때 불러옴 (프로그램 시작 시간 단축)
+                import boto3
+
+                _polly_client = boto3.Session(
+                    aws_access_key_id=aws_access_key,
+                    aws_secret_access_key=aws_secret_key,
+                    region_name='us-east-1').client('polly', endpoint_url=polly_endpoint_url)
+    return _polly_client
+
+
+
+class SpeechStream:
+    """
+    Polly에서 받는 음성 스트림
+    순회하면 받은 조각을 바로 돌려주면서 모아 두었다가, 끝까지 받으면 캐시에 저장합니다.
+    하나의 재생 스레드에서만 사용합니다.
+    """
+
+    CHUNK_SIZE = 4096
+
+    def __init__(self, audio_stream, key, category):
+        self._audio_stream = audio_stream
+        self._chunks = []
+        self.key = key
+        self.category = category
+        self.path = None
+
+    def __iter__(self):
+        # 중간에 멈춘 경우에도 save()가 이어서 읽을 수 있도록 원본 스트림에서 조각 단위로 읽음
+        for chunk in self._audio_stream.iter_chunks(self.CHUNK_SIZE):
+            self._chunks.append(chunk)
+            yield chunk
+        self._store()
+
+    def _store(self):
+        if self.path is None:
+            self.path = get_tts_cache().put(self.key, b"".join(self._chunks), self.category, OUTPUT_FORMAT)
+
+    def save(self):
+        """
+        남은 데이터를 모두 받아 캐시에 저장하고 파일 경로를 반환합니다.
+        """
+        if self.path is None:
+            for chunk in self._audio_stream.iter_chunks(self.CHUNK_SIZE):
+                self._chunks.append(chunk)
+            self._store()
+        return self.path
+
+
+def prepare_speech(text, category, stream=False, text_type="text"):
+    """
+    음성 파일을 캐시에서 찾거나 새로 합성하고, 재생하지 않고 파일 경로만 반환합니다.
+    캐시 키는 (문장, 음성, 엔진, 포맷)에서 만들어지므로 문장이 바뀌면 새로 합성합니다.
+    stream=True이면 캐시에 없을 때 다 받을 때까지 기다리지 않고 SpeechStream을 반환합니다.
+    text_type="ssml"이면 text를 SSML(<speak>...</speak>)로 합성합니다.
+    """
+    cache = get_tts_cache()
+    key = make_cache_key(text, VOICE_ID, ENGINE, OUTPUT_FORMAT)
 
+    # 캐시된 파일이 있는지 확인
+    output = cache.get(key)
+    if output is not None:
+        metrics.debug(f"캐시된 음성 사용: {text}")
+        return output
 
+    # 스트림은 한 재생 스레드에서만 읽을 수 있으므로 합치지 않음
+    if stream:
+        return _synthesize(text, key, category, stream=True, text_type=text_type)
+    return _speech_flight.do(key, _synthesize, text, key, category, False, text_type)
 
-def text_to_speak_adv(audio_file_name, text, category):
-    # 카테고리별 캐시 디렉토리 설정
-    cache_dir = "sound_cache"
-    category_dir = os.path.join(cache_dir, category)
-    
-    # 디렉토리가 없으면 생성
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-    if not os.path.exists(category_dir):
-        os.makedirs(category_dir)
-    
-    # 캐시된 파일의 전체 경로
-    output = os.path.join(category_dir, audio_file_name)
-    
-    # 캐시된 파일이 있는지 확인
-    if os.path.exists(output):
-        print(f"캐시된 파일 {audio_file_name} 사용")
-        playsound(output)
-        return
-    
-    # 캐시된 파일이 없는 경우 API 호출
-    print(f"새로운 음성 파일 생성: {audio_file_name}")
-    polly_client = boto3.Session(
-        aws_access_key_id=aws_access_key,                     
-        aws_secret_access_key=aws_secret_key,
-        region_name='us-east-1').client('polly')
-
-    response = polly_client.synthesize_speech(
-        VoiceId='Seoyeon',
-        OutputFormat='mp3', 
-        Text = text,
-        Engine = 'neural',
-        LanguageCode='ko-KR'
-    )
-
-    # 새로운 파일 저장
-    with open(output, 'wb') as file:
-        file.write(response['AudioStream'].read())
-
-    playsound(output)
-
-
-
-def speak_product_info(barcode, product_name, nutrient):
+
+def _synthesize(text, key, category, stream=False, text_type="text"):
+    # 캐시된 파일이 없는 경우 API 호출 (stream=True이면 응답을 받기 시작할 때까지만 측정)
+    metrics.debug(f"새로운 음성 파일 생성: {text}")
+    with metrics.span("tts_synthesis", category=category):
+        response = get_polly_client().synthesize_speech(
+            VoiceId=VOICE_ID,
+            OutputFormat=OUTPUT_FORMAT,
+            Text = text,
+            TextType=text_type,
+            Engine = ENGINE,
+            LanguageCode=LANGUAGE_CODE
+        )
+
+        speech = SpeechStream(response['AudioStream'], key, category)
+        if stream:
+            return speech
+
+        # 새로운 파일 저장
+        return speech.save()
+
+
+def play_speech(path):
+    from playsound import playsound
+
+    playsound(path)
+
+
+def text_to_speak_adv(text, category):
+    play_speech(prepare_speech(text, category))
+
+
+
+def get_product_text(product_name, nutrient):
     # 기본 제품 정보 구성
     product_text = f"제품 이름은 {product_name}이고, "
 
@@ -61,69 +151,70 @@ def speak_product_info(barcode, product_name, nutrient):
     energy_kcal = nutrient.get('energy_kcal', None)
 
     if sodium is not None:
-        product_text += f"나트륨 {sodium}, "
+        product_text += f"나트륨 {format_nutrient('sodium', sodium)}, "
     if saturated_fat is not None:
-        product_text += f"포화지방 {saturated_fat}, "
+        product_text += f"포화지방 {format_nutrient('saturated_fat', saturated_fat)}, "
     if energy_kcal is not None:
-        product_text += f"열량 {energy_kcal} 입니다. "
+        product_text += f"열량 {format_nutrient('energy_kcal', energy_kcal)} 입니다. "
 
-    # product 디렉토리에 저장하고 재생
-    audio_file_name = f"{barcode}_product.mp3"
-    text_to_speak_adv(audio_file_name, product_text, "product")
+    return product_text
 
 
-def get_allergen_filename(allergen):
-    # 알레르겐 한글-영어 매핑
-    allergen_mapping = {
-        "우유": "milk",
-        "대두": "soybean",
-        "밀": "wheat",
-        "땅콩": "peanut",
-        "견과류": "nuts",
-        "갑각류": "crustacean",
-        "계란": "egg",
-        "생선": "fish",
-        "조개류": "shellfish",
-        # 필요한 매핑 추가
-    }
-    return allergen_mapping.get(allergen, f"allergen_{hash(allergen)}")
+def prepare_product_info(product_name, nutrient, stream=False):
+    """
+    제품 안내 음성 파일을 준비하고 재생할 파일 경로 목록을 반환합니다.
+    """
+    return [prepare_speech(get_product_text(product_name, nutrient), "product", stream)]
 
 
+def speak_product_info(product_name, nutrient):
+    for path in prepare_product_info(product_name, nutrient):
+        play_speech(path)
 
-def speak_allergen_info(allergen, risk_level):
 
-    # 알레르겐 파일명을 영어로 변환
-    allergen_filename = f"{get_allergen_filename(allergen)}.mp3"
-    
-    
-    # 알레르겐 음성 파일 생성/재생
-    text_to_speak_adv(allergen_filename, allergen, "allergy")
-    
-
-    # 위험도 메시지 파일명도 영어로
-    risk_filename_mapping = {
-        "High Risk Group": "high_risk.mp3",
-        "Risk Group": "risk.mp3",
-        "Caution Group": "caution.mp3"
-    }
-
-    # 위험도 메시지 음성 파일 생성/재생
-    risk_message = ""
-    if risk_level == "High Risk Group":
-        risk_message = "주의! 고위험 알레르기 성분이 포함되어 있습니다."
-    elif risk_level == "Risk Group":
-        risk_message = "주의! 위험 알레르기 성분이 포함되어 있습니다."
-    elif risk_level == "Caution Group":
-        risk_message = "주의! 주의가 필요한 알레르기 성분이 포함되어 있습니다."
+def get_risk_message(risk_level):
+    # 위험도 메시지
+    risk_level = normalize_risk_level(risk_level)
+    if risk_level == RiskLevel.HIGH_RISK:
+        return "주의! 고위험 알레르기 성분이 포함되어 있습니다."
+    elif risk_level == RiskLevel.RISK:
+        return "주의! 위험 알레르기 성분이 포함되어 있습니다."
+    elif risk_level == RiskLevel.CAUTION:
+        return "주의! 주의가 필요한 알레르기 성분이 포함되어 있습니다."
     else:
-        risk_message = "알 수 없는 위험 수준."
-    
-    risk_filename = risk_filename_mapping.get(risk_level, "unknown_risk.mp3")
-
-    text_to_speak_adv(risk_filename, risk_message, "risk_level")
-
-
-
-
+        return "알 수 없는 위험 수준."
 
 
+def speak_allergen_info(allergen, risk_level):
+    # 성분 이름과 위험도 메시지를 이어 붙인 음성 하나로 재생
+    from announcement import prepare_announcement
+
+    for path in prepare_announcement({allergen: risk_level}):
+        play_speech(path)
+
+
+def warm_up_tts_cache(max_workers=8):
+    """
+    등록된 모든 알레르기 성분 이름과 위험도 메시지 중 캐시에 없는 것을 미리 동시에 합성합니다.
+    반환: 새로 합성한 문장 수
+    """
+    phrases = [(allergen, "allergy") for allergen in get_all_allergens_risk_levels()]
+    phrases += [(get_risk_message(risk_level), "risk_level") for risk_level in RISK_LEVELS + [None]]
+
+    cache = get_tts_cache()
+    missing = [
+        (text, category) for text, category in phrases
+        if not cache.contains(make_cache_key(text, VOICE_ID, ENGINE, OUTPUT_FORMAT))
+    ]
+    if not missing:
+        return 0
+
+    print(f"음성 캐시 준비 중: {len(missing)}개 문장 합성")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(prepare_speech, text, category) for text, category in missing]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"음성 미리 합성 중 오류 발생: {e}")
+    return len(missing)
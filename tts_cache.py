@@ -0,0 +1,165 @@
+# tts_cache.py
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+
+import metrics
+from file_utils import atomic_write
+
+# 캐시 설정 (환경 변수로 변경 가능)
+CACHE_DIR = os.getenv('TTS_CACHE_DIR', 'sound_cache')
+CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', 200 * 1024 * 1024))  # 기본 200MB
+INDEX_FLUSH_INTERVAL = 5.0  # 접근 시간 갱신을 디스크에 반영하는 최소 간격 (초)
+
+
+def make_cache_key(text, voice, engine, output_format):
+    """
+    (문장, 음성, 엔진, 포맷)으로부터 실행마다 동일한 캐시 키를 만듭니다.
+    """
+    payload = json.dumps([text, voice, engine, output_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """
+    내용 기반 키로 음성 파일을 저장하는 디스크 캐시
+    index.json에 항목별 크기와 마지막 사용 시간을 기록하고, 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용하지 않은 파일부터 삭제합니다.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flushed_at = 0.0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+        atexit.register(self.flush)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        data = json.dumps(self._index, ensure_ascii=False).encode('utf-8')
+        atomic_write(self.index_path, data)
+        self._dirty = False
+        self._flushed_at = time.time()
+
+    def path_for(self, key, category, output_format):
+        return os.path.join(self.cache_dir, category, f"{key}.{output_format}")
+
+    def get(self, key):
+        """
+        캐시된 파일 경로를 반환합니다. 없으면 None을 반환합니다.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or not os.path.exists(os.path.join(self.cache_dir, entry["file"])):
+                if entry is not None:
+                    # 파일이 외부에서 삭제된 경우 색인에서도 제거
+                    del self._index[key]
+                    self._dirty = True
+                self.misses += 1
+                metrics.increment("cache_misses", cache="tts")
+                return None
+
+            entry["last_access"] = time.time()
+            self._dirty = True
+            self.hits += 1
+            metrics.increment("cache_hits", cache="tts")
+            if time.time() - self._flushed_at > INDEX_FLUSH_INTERVAL:
+                self._save_index()
+            return os.path.join(self.cache_dir, entry["file"])
+
+    def contains(self, key):
+        """
+        적중/실패 통계에 반영하지 않고 캐시에 있는지만 확인합니다.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            return entry is not None and os.path.exists(os.path.join(self.cache_dir, entry["file"]))
+
+    def put(self, key, data, category, output_format):
+        """
+        음성 데이터를 저장하고 파일 경로를 반환합니다.
+        """
+        path = self.path_for(key, category, output_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, data)
+
+        with self._lock:
+            self._index[key] = {
+                "file": os.path.relpath(path, self.cache_dir),
+                "size": len(data),
+                "category": category,
+                "last_access": time.time()
+            }
+            self._evict(keep=key)
+            self._save_index()
+        return path
+
+    def _evict(self, keep=None):
+        # 전체 크기가 상한을 넘으면 마지막 사용 시간이 오래된 항목부터 삭제
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            del self._index[key]
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def stats(self):
+        """
+        캐시 적중/실패 횟수와 현재 항목 수, 전체 크기를 반환합니다.
+        """
+        with self._lock:
+            entries = len(self._index)
+            total_bytes = sum(entry["size"] for entry in self._index.values())
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": total_bytes
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """
+    프로세스 전체에서 공유하는 음성 캐시 인스턴스를 반환합니다.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTSCache()
+    return _cache